@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 class Config:
@@ -11,6 +12,77 @@ class Config:
     PLANET_API_KEY = os.environ.get('PLANET_API_KEY')
     PLANET_BASE_URL = 'https://api.planet.com/data/v1'
     
+    # Pré-processamento da AOI antes das buscas
+    AOI_MAX_VERTICES = int(os.environ.get('AOI_MAX_VERTICES', 500))
+    AOI_TILE_AREA_KM2 = float(os.environ.get('AOI_TILE_AREA_KM2', 25000))  # AOIs maiores são divididas em blocos
+    
+    # Pool de conexões HTTP com a Planet (um cliente por processo)
+    PLANET_HTTP_POOL_CONNECTIONS = int(os.environ.get('PLANET_HTTP_POOL_CONNECTIONS', 10))  # hosts distintos
+    PLANET_HTTP_POOL_MAXSIZE = int(os.environ.get('PLANET_HTTP_POOL_MAXSIZE', 32))  # conexões por host
+    PLANET_CONNECT_TIMEOUT = float(os.environ.get('PLANET_CONNECT_TIMEOUT', 5))
+    PLANET_READ_TIMEOUT = float(os.environ.get('PLANET_READ_TIMEOUT', 60))
+    PLANET_DOWNLOAD_READ_TIMEOUT = float(os.environ.get('PLANET_DOWNLOAD_READ_TIMEOUT', 120))
+    
+    # Limitador de taxa por grupo de endpoints (requisições/segundo por processo)
+    PLANET_RATE_LIMITS = {
+        'search': float(os.environ.get('PLANET_RATE_LIMIT_SEARCH', 5)),
+        'data': float(os.environ.get('PLANET_RATE_LIMIT_DATA', 10)),
+        'basemaps': float(os.environ.get('PLANET_RATE_LIMIT_BASEMAPS', 10)),
+        'downloads': float(os.environ.get('PLANET_RATE_LIMIT_DOWNLOADS', 15)),
+    }
+    PLANET_MAX_RETRIES = int(os.environ.get('PLANET_MAX_RETRIES', 4))
+    
+    # Requisições simultâneas do cliente assíncrono em rotas de fan-out
+    PLANET_ASYNC_MAX_CONCURRENCY = int(os.environ.get('PLANET_ASYNC_MAX_CONCURRENCY', 16))
+    
+    # Busca em fan-out (janelas de data consultadas em paralelo)
+    PLANET_SEARCH_FANOUT_WORKERS = int(os.environ.get('PLANET_SEARCH_FANOUT_WORKERS', 8))
+    PLANET_SEARCH_SLICE_DAYS = int(os.environ.get('PLANET_SEARCH_SLICE_DAYS', 30))
+    
+    # Prévias de quads: maior lado da imagem (parâmetro `max_size`) e seu limite
+    PREVIEW_MAX_SIZE = int(os.environ.get('PREVIEW_MAX_SIZE', 1024))
+    PREVIEW_MAX_SIZE_LIMIT = int(os.environ.get('PREVIEW_MAX_SIZE_LIMIT', 4096))
+    
+    # Pool de processos de renderização (por worker do gunicorn; WEB_CONCURRENCY = nº de workers)
+    RENDER_POOL_WORKERS = int(os.environ.get('RENDER_POOL_WORKERS') or
+                              max(1, (os.cpu_count() or 1) // int(os.environ.get('WEB_CONCURRENCY', 4))))
+    RENDER_POOL_QUEUE = int(os.environ.get('RENDER_POOL_QUEUE', 16))  # trabalhos em espera antes de responder 503
+    RENDER_TIMEOUT = float(os.environ.get('RENDER_TIMEOUT', 60))
+    RENDER_RETRY_AFTER = int(os.environ.get('RENDER_RETRY_AFTER', 2))
+    
+    # Cache HTTP (ETag + Cache-Control) das respostas de leitura
+    PREVIEW_CACHE_MAX_AGE = int(os.environ.get('PREVIEW_CACHE_MAX_AGE', 24 * 3600))
+    METADATA_CACHE_TTL = int(os.environ.get('METADATA_CACHE_TTL', 3600))  # séries e tipos de item no servidor
+    METADATA_CACHE_MAX_AGE = int(os.environ.get('METADATA_CACHE_MAX_AGE', 3600))
+    EMBARGOS_CACHE_MAX_AGE = int(os.environ.get('EMBARGOS_CACHE_MAX_AGE', 300))
+    
+    # Pré-carregamento das prévias após POST /api/basemap/quads (payload `prefetch` sobrepõe o padrão)
+    PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', 'true').lower() == 'true'
+    PREFETCH_WORKERS = int(os.environ.get('PREFETCH_WORKERS', 2))  # renderizações simultâneas por worker
+    PREFETCH_MAX_PENDING = int(os.environ.get('PREFETCH_MAX_PENDING', 200))
+    PREFETCH_FORMAT = os.environ.get('PREFETCH_FORMAT', 'webp')  # codificação negociada pelos navegadores
+    
+    # Índice em memória dos mosaicos de cada série (mês -> mosaico)
+    MOSAIC_INDEX_TTL = int(os.environ.get('MOSAIC_INDEX_TTL', 3600))  # depois disso é atualizado em segundo plano
+    MOSAIC_INDEX_MISS_REFRESH = int(os.environ.get('MOSAIC_INDEX_MISS_REFRESH', 300))  # mês ausente reconstrói o índice
+    
+    # Quads de /api/basemap/quads calculados pela grade do mosaico (sem chamar a busca de quads da Planet)
+    QUAD_GRID_ENABLED = os.environ.get('QUAD_GRID_ENABLED', 'true').lower() == 'true'
+    
+    # Reaproveitamento espacial de buscas de quads na Planet (AOIs dentro de áreas já buscadas)
+    QUAD_SEARCH_CACHE_ENABLED = os.environ.get('QUAD_SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+    QUAD_SEARCH_CACHE_MOSAICS = int(os.environ.get('QUAD_SEARCH_CACHE_MOSAICS', 32))  # mosaicos em memória (LRU)
+    QUAD_SEARCH_CACHE_TTL = int(os.environ.get('QUAD_SEARCH_CACHE_TTL', 24 * 3600))
+    
+    # Tiles XYZ dos mosaicos (/api/basemap/tiles/<mosaic_id>/<z>/<x>/<y>.png)
+    TILE_MIN_ZOOM = int(os.environ.get('TILE_MIN_ZOOM', 9))
+    TILE_MAX_QUADS = int(os.environ.get('TILE_MAX_QUADS', 25))  # quads lidos por tile, no máximo
+    TILE_CACHE_MAX_AGE = int(os.environ.get('TILE_CACHE_MAX_AGE', 24 * 3600))  # Cache-Control no navegador
+    
+    # Composição de vários quads numa imagem (POST /api/basemap/composite)
+    COMPOSITE_MAX_SIZE = int(os.environ.get('COMPOSITE_MAX_SIZE', 2048))
+    COMPOSITE_MAX_QUADS = int(os.environ.get('COMPOSITE_MAX_QUADS', 100))
+    
     # Upload Configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
@@ -21,6 +93,50 @@ class Config:
     CACHE_DEFAULT_TIMEOUT = 600  # 10 minutos
     CACHE_KEY_PREFIX = 'planet_api_'
     
+    # Diretório dos caches em disco, compartilhado pelos workers do gunicorn
+    CACHE_DIR = os.environ.get('CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'planet_explorer_cache')
+    
+    # Cache persistente de buscas (SQLite, chave = hash do payload canônico)
+    SEARCH_CACHE_ENABLED = os.environ.get('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+    SEARCH_CACHE_PATH = os.path.join(CACHE_DIR, 'search_cache.db')
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 3600))  # 1 hora
+    SEARCH_CACHE_MAX_BYTES = int(os.environ.get('SEARCH_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    SEARCH_CACHE_MAX_FEATURES = int(os.environ.get('SEARCH_CACHE_MAX_FEATURES', 50000))
+    # Tamanho máximo (comprimido) de uma busca gravada no cache; também limita a memória por busca em andamento
+    SEARCH_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRY_BYTES', 8 * 1024 * 1024))
+    
+    # Cache de prévias renderizadas: LRU em memória por processo + disco compartilhado
+    PREVIEW_CACHE_DIR = os.path.join(CACHE_DIR, 'previews')
+    PREVIEW_CACHE_MAX_BYTES = int(os.environ.get('PREVIEW_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+    PREVIEW_MEMORY_CACHE_MAX_BYTES = int(os.environ.get('PREVIEW_MEMORY_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    
+    # Cache local dos quads originais (COG com overviews) para renderizar sem baixar de novo
+    SOURCE_CACHE_ENABLED = os.environ.get('SOURCE_CACHE_ENABLED', 'true').lower() == 'true'
+    SOURCE_CACHE_DIR = os.path.join(CACHE_DIR, 'quads')
+    SOURCE_CACHE_MAX_BYTES = int(os.environ.get('SOURCE_CACHE_MAX_BYTES', 5 * 1024 * 1024 * 1024))
+    SOURCE_CACHE_FETCH_WORKERS = int(os.environ.get('SOURCE_CACHE_FETCH_WORKERS', 2))
+    # O quad completo só é baixado depois de pedido SOURCE_CACHE_MIN_HITS vezes dentro da janela (segundos)
+    SOURCE_CACHE_MIN_HITS = int(os.environ.get('SOURCE_CACHE_MIN_HITS', 2))
+    SOURCE_CACHE_DEMAND_WINDOW = int(os.environ.get('SOURCE_CACHE_DEMAND_WINDOW', 1800))
+    
+    # Coalescência de trabalho idêntico em andamento (threads + flock entre workers)
+    SINGLE_FLIGHT_LOCK_DIR = os.path.join(CACHE_DIR, 'locks')
+    SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT', 90))  # espera máxima pelo líder
+    
+    # Marcadores de pré-carregamentos cancelados, vistos por todos os workers
+    PREFETCH_CANCEL_DIR = os.path.join(CACHE_DIR, 'prefetch_cancelled')
+    
+    # Busca incremental: reaproveita intervalos de data já buscados para a mesma AOI
+    DELTA_SEARCH_ENABLED = os.environ.get('DELTA_SEARCH_ENABLED', 'true').lower() == 'true'
+    DELTA_SEARCH_PATH = os.path.join(CACHE_DIR, 'delta_search.db')
+    DELTA_SEARCH_TTL = int(os.environ.get('DELTA_SEARCH_TTL', 6 * 3600))  # 6 horas
+    
+    # Resultados de busca paginados por cursor (GET /api/planet/search/<result_id>)
+    SEARCH_RESULTS_PATH = os.path.join(CACHE_DIR, 'search_results.db')
+    SEARCH_RESULTS_TTL = int(os.environ.get('SEARCH_RESULTS_TTL', 3600))
+    SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', 100))
+    SEARCH_MAX_PAGE_SIZE = int(os.environ.get('SEARCH_MAX_PAGE_SIZE', 1000))
+    
     # Performance Configuration
     JSON_SORT_KEYS = False  # Melhora performance do JSON
     JSONIFY_PRETTYPRINT_REGULAR = False  # Reduz overhead do JSON
@@ -5,8 +5,8 @@ from dotenv import load_dotenv
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
-# Configuração de logging otimizada
-log_dir = 'logs'
+# Configuração de logging otimizada (LOG_DIR permite gravar fora da árvore, ex.: nos testes)
+log_dir = os.environ.get('LOG_DIR', 'logs')
 if not os.path.exists(log_dir):
     os.makedirs(log_dir)
 
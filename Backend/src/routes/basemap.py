@@ -1,12 +1,29 @@
+import hashlib
+import json
 import logging
 import requests
-from flask import Blueprint, request, jsonify, Response, stream_with_context
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app, url_for
 from src.utils.planet_api import get_planet_client, APIError
-from src.utils.errors import handle_api_error
-import rasterio
-from PIL import Image
-import numpy as np
-import io
+from src.utils.planet_api_async import AsyncPlanetAPIClient, run_async
+from src.utils.errors import handle_api_error, ValidationError
+from src.utils.geometry import preprocess_request_aoi
+from src.utils.raster import render_tile, render_composite
+from src.utils.previews import preview_cache_key, render_preview
+from src.utils.prefetch import get_prefetcher, prefetch_quad_previews
+from src.utils.render_pool import get_render_pool
+from src.utils.preview_cache import get_preview_cache
+from src.utils.source_store import get_source_store
+from src.utils.single_flight import get_single_flight
+from src.utils.mosaic_index import get_mosaic_index
+from src.utils.quad_grid import QuadGrid, quad_links
+from src.utils.quad_search_cache import get_quad_search_cache
+from src.utils.tiles import is_valid_tile, tile_bounds, tile_polygon
+from src.utils.encoding import negotiate_image_encoding
+from src.utils.search_cache import canonical_geometry
+from src.utils.http_cache import (
+    RENDER_VERSION, make_etag, cache_control, cached_json_response, not_modified, with_validators
+)
 from src.app import cache
 
 basemap_bp = Blueprint('basemap_bp', __name__)
@@ -16,10 +33,13 @@ logger = logging.getLogger(__name__)
 def get_series_route():
     """Lista todas as séries de basemaps disponíveis para a chave de API."""
     try:
-        client = get_planet_client()
-        # Corrige a chamada para o novo nome do método
-        series_data = client.get_series()
-        return jsonify(series_data)
+        config = current_app.config
+        # Lista guardada com seu ETag: revalidações do navegador não chamam a Planet
+        return cached_json_response(
+            cache, 'basemap_series', config['METADATA_CACHE_TTL'],
+            lambda: get_planet_client().get_series(),
+            cache_control(config['METADATA_CACHE_MAX_AGE']),
+        )
     except APIError as e:
         logger.error(f"Erro na API da Planet ao listar séries: {e}")
         return jsonify(e.to_dict()), e.status_code
@@ -42,36 +62,36 @@ def get_mosaics_route():
         return jsonify({"error": "series_id é obrigatório"}), 400
     
     try:
-        mosaic_id = get_mosaic_id_from_cache_or_api(series_id, year, month)
-        if not mosaic_id:
+        mosaic = get_mosaic_for_month(series_id, year, month)
+        if not mosaic:
             return jsonify({"error": "Nenhum mosaico encontrado para a data e série selecionadas."}), 404
             
-        return jsonify({"mosaic_id": mosaic_id})
+        return jsonify({"mosaic_id": mosaic['id'], "mosaic": mosaic})
     except Exception as e:
         return handle_api_error(e)
 
-def get_mosaic_id_from_cache_or_api(series_id, year, month):
-    cache_key = f"mosaic_{series_id}_{year}_{month}"
-    cached_mosaic = cache.get(cache_key)
-    if cached_mosaic:
-        logging.info(f"Cache HIT para a chave: {cache_key}")
-        return cached_mosaic
+def get_mosaic_for_month(series_id, year, month):
+    """Mosaico da série no mês, consultado no índice de mosaicos da série (em memória)."""
+    try:
+        year, month = int(year), int(month)
+    except (TypeError, ValueError):
+        raise ValidationError("year e month devem ser números inteiros")
+    if not 1 <= month <= 12:
+        raise ValidationError("month deve estar entre 1 e 12")
 
-    logging.info(f"Cache MISS para a chave: {cache_key}. Buscando na API.")
-    client = get_planet_client()
-    mosaics = client.get_mosaics_for_series(series_id)
-    
-    target_name_part = f"{year}-{str(month).zfill(2)}"
-    
-    for mosaic in mosaics.get('mosaics', []):
-        if target_name_part in mosaic['name']:
-            mosaic_id = mosaic['id']
-            logging.info(f"Mosaico encontrado: {mosaic['name']} com ID: {mosaic_id}. Armazenando no cache.")
-            cache.set(cache_key, mosaic_id, timeout=3600) # Cache por 1 hora
-            return mosaic_id
-            
-    logging.warning(f"Nenhum mosaico encontrado para {series_id} em {year}-{month}")
-    return None
+    mosaic = get_mosaic_index().lookup(get_planet_client(), series_id, year, month)
+    if mosaic is None:
+        logging.warning(f"Nenhum mosaico encontrado para {series_id} em {year}-{month}")
+    return mosaic
+
+@basemap_bp.route('/series/<series_id>/months', methods=['GET'])
+def get_series_months_route(series_id):
+    """Meses disponíveis na série, cada um com o id e os metadados do seu mosaico."""
+    try:
+        months = get_mosaic_index().months(get_planet_client(), series_id)
+        return jsonify({"series_id": series_id, "months": months})
+    except Exception as e:
+        return handle_api_error(e)
 
 @basemap_bp.route('/quads', methods=['POST'])
 def search_quads_route():
@@ -85,7 +105,22 @@ def search_quads_route():
 
     try:
         client = get_planet_client()
-        quads = client.get_quads_for_mosaic(mosaic_id, geometry)
+        # AOIs detalhadas são simplificadas; AOIs muito grandes são divididas em blocos
+        geometry, tiles, aoi_report = preprocess_request_aoi(geometry)
+
+        # Os quads são calculados pela grade do mosaico; a busca na Planet só é
+        # usada quando a grade não pode ser determinada
+        quads = None
+        if data.get('local_grid', current_app.config['QUAD_GRID_ENABLED']):
+            quads = _grid_quads(client, series_id, mosaic_id, geometry)
+        quad_source = 'api' if quads is None else 'grid'
+        if quads is None:
+            quads = _search_quads(client, mosaic_id, geometry, tiles)
+
+        # Opcionalmente completa cada quad com os detalhes (links de download),
+        # buscados em paralelo pelo cliente assíncrono
+        if data.get('include_details') and quads:
+            quads = _with_quad_details(client, mosaic_id, quads)
 
         # Adiciona os dados necessários para o frontend
         for quad in quads:
@@ -93,11 +128,89 @@ def search_quads_route():
             quad['series_id'] = series_id
             quad['type'] = 'basemap_quad'
 
-        logging.info(f"Busca de quads concluída. Total de {len(quads)} quads encontrados.")
-        return jsonify(quads)
+        logging.info(f"Busca de quads concluída ({quad_source}). Total de {len(quads)} quads encontrados.")
+        response = jsonify(quads)
+        response.headers['X-Quad-Source'] = quad_source
+        if aoi_report:
+            response.headers['X-AOI-Report'] = json.dumps(aoi_report, separators=(',', ':'))
+
+        # Aquece o cache com as prévias que o mapa vai pedir, do centro da AOI para fora
+        if quads and data.get('prefetch', current_app.config['PREFETCH_ENABLED']):
+            prefetch_id, queued = prefetch_quad_previews(client, mosaic_id, quads, geometry)
+            response.headers['X-Prefetch-Id'] = prefetch_id
+            response.headers['X-Prefetch-Queued'] = str(queued)
+        return response
     except Exception as e:
         return handle_api_error(e)
 
+@basemap_bp.route('/prefetch/<prefetch_id>', methods=['DELETE'])
+def cancel_prefetch_route(prefetch_id):
+    """Cancela as prévias ainda não geradas de um pré-carregamento (id do cabeçalho X-Prefetch-Id)."""
+    cancelled = get_prefetcher().cancel(prefetch_id)
+    return jsonify({'prefetch_id': prefetch_id, 'cancelled': cancelled})
+
+def _grid_quads(client, series_id, mosaic_id, geometry):
+    """
+    Quads da AOI calculados localmente pela grade do mosaico, já com os links
+    de download montados a partir do id, ou None se não for possível.
+    """
+    try:
+        mosaic = get_mosaic_index().find(client, series_id, mosaic_id)
+    except APIError as e:
+        logger.warning(f"Índice da série {series_id} indisponível; buscando quads na Planet: {e}")
+        return None
+    grid = QuadGrid.from_mosaic(mosaic) if mosaic else None
+    if grid is None:
+        return None
+    quads = grid.quads_for_geometry(geometry)
+    if quads is None:
+        return None
+    for quad in quads:
+        quad['_links'] = quad_links(client.base_url, mosaic_id, quad['id'])
+    return quads
+
+def _search_quads(client, mosaic_id, geometry, tiles=None):
+    """
+    Busca os quads da AOI. Áreas já buscadas no mesmo mosaico são respondidas
+    pelo cache espacial de buscas, e só o restante da AOI vai para a Planet.
+    """
+    quad_cache = get_quad_search_cache()
+    if quad_cache is None:
+        return _fetch_quads(client, mosaic_id, tiles or [geometry])
+    return quad_cache.search(mosaic_id, geometry, lambda parts: _fetch_quads(client, mosaic_id, parts or tiles or [geometry]))
+
+def _fetch_quads(client, mosaic_id, geometries):
+    """Busca os quads de cada geometria na Planet; com várias, consulta em paralelo e remove duplicatas por id."""
+    if len(geometries) == 1:
+        return client.get_quads_for_mosaic(mosaic_id, geometries[0])
+
+    workers = min(len(geometries), current_app.config['PLANET_SEARCH_FANOUT_WORKERS'])
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='planet-quads') as executor:
+        results = list(executor.map(lambda geometry: client.get_quads_for_mosaic(mosaic_id, geometry), geometries))
+
+    quads = {}
+    for tile_quads in results:
+        for quad in tile_quads:
+            quads.setdefault(quad.get('id'), quad)
+    return list(quads.values())
+
+def _with_quad_details(client, mosaic_id, quads):
+    """Busca os detalhes de todos os quads concorrentemente a partir de um único worker."""
+    max_concurrency = current_app.config['PLANET_ASYNC_MAX_CONCURRENCY']
+
+    async def fetch():
+        async with AsyncPlanetAPIClient.from_client(client, max_concurrency=max_concurrency) as async_client:
+            return await async_client.gather_quad_details(mosaic_id, [quad['id'] for quad in quads])
+
+    detailed = []
+    for quad, details in zip(quads, run_async(fetch())):
+        if isinstance(details, Exception):
+            logger.warning(f"Falha ao buscar detalhes do quad {quad['id']}: {details}")
+            detailed.append(quad)
+        else:
+            detailed.append({**quad, **details})
+    return detailed
+
 @basemap_bp.route('/quad/<mosaic_id>/<quad_id>', methods=['GET'])
 def get_quad_details_route(mosaic_id, quad_id):
     """Busca os detalhes completos de um único quad para obter o link dos tiles."""
@@ -111,8 +224,10 @@ def get_quad_details_route(mosaic_id, quad_id):
 @basemap_bp.route('/quad/preview', methods=['GET'])
 def preview_quad():
     """
-    Busca a imagem de um quad, converte para PNG e a transmite como resposta.
-    Implementa cache manual para evitar problemas com o memoize em view functions.
+    Busca a imagem de um quad, converte para WebP/JPEG/PNG e a transmite como resposta.
+    As imagens ficam no cache de prévias (LRU em memória + disco compartilhado entre workers).
+    `max_size` limita o maior lado da imagem (padrão PREVIEW_MAX_SIZE); o formato
+    vem de `format`/`quality` ou do cabeçalho Accept.
     """
     mosaic_id = request.args.get('mosaic_id')
     quad_id = request.args.get('quad_id')
@@ -120,98 +235,279 @@ def preview_quad():
     if not mosaic_id or not quad_id:
         return jsonify({'error': 'Os parâmetros mosaic_id e quad_id são obrigatórios'}), 400
 
-    cache_key = f"quad_preview_{mosaic_id}_{quad_id}"
-    cached_png = cache.get(cache_key)
-    if cached_png:
+    max_size = request.args.get('max_size', type=int) or current_app.config['PREVIEW_MAX_SIZE']
+    max_size = min(max(max_size, 64), current_app.config['PREVIEW_MAX_SIZE_LIMIT'])
+    try:
+        encoding = negotiate_image_encoding(request.args, request.accept_mimetypes)
+    except ValidationError as e:
+        return handle_api_error(e)
+
+    # Os quads de um mosaico não mudam: a identidade da prévia basta como ETag,
+    # e a revalidação é respondida antes de consultar o cache ou a Planet
+    etag = make_etag('preview', RENDER_VERSION, mosaic_id, quad_id, max_size, encoding.cache_suffix)
+    max_age = current_app.config['PREVIEW_CACHE_MAX_AGE']
+    unchanged = _image_not_modified(etag, encoding, max_age)
+    if unchanged:
+        return unchanged
+
+    cache_key = preview_cache_key(mosaic_id, quad_id, max_size, encoding)
+    preview_cache = get_preview_cache()
+    cached_image = preview_cache.get(cache_key)
+    if cached_image:
         logger.info(f"Cache HIT para a chave: {cache_key}")
-        return Response(cached_png, mimetype='image/png')
+        return _image_response(cached_image, encoding, etag, max_age)
 
     logger.info(f"Cache MISS para a chave: {cache_key}. Gerando imagem.")
 
     try:
-        client = get_planet_client()
-        session = client.session
-
-        quad_info_url = f"{client.base_url}/basemaps/v1/mosaics/{mosaic_id}/quads/{quad_id}"
-        res = session.get(quad_info_url)
-        res.raise_for_status()
-        download_url = res.json()['_links'].get('download')
-
-        if not download_url:
-            return jsonify({'error': 'Link para download não encontrado.'}), 404
-
-        image_res = requests.get(download_url, auth=session.auth, stream=True)
-        image_res.raise_for_status()
-        
-        # Lê o conteúdo do TIFF em memória
-        tiff_bytes = image_res.content
-
-        with rasterio.open(io.BytesIO(tiff_bytes)) as src:
-            # Lê as 3 primeiras bandas (RGB) e ignora a quarta (Alpha/NIR) se existir
-            r, g, b = src.read((1, 2, 3))
-
-            # Função melhorada de normalização com ajuste de brilho e contraste
-            def enhance_band(band):
-                # Remove outliers extremos (1% e 99% percentis)
-                p1, p99 = np.percentile(band, [1, 99])
-                band_clipped = np.clip(band, p1, p99)
-                
-                # Normaliza para 0-255
-                band_min, band_max = band_clipped.min(), band_clipped.max()
-                if band_max == band_min:
-                    return np.zeros(band.shape, dtype=np.uint8)
-                
-                # Aplica uma curva de correção gamma para melhorar o contraste
-                normalized = ((band_clipped - band_min) / (band_max - band_min))
-                
-                # Aplica correção gamma (1.2 para deixar mais claro)
-                gamma = 1.2
-                corrected = np.power(normalized, 1/gamma)
-                
-                # Aumenta o brilho geral
-                brightness_boost = 1.1
-                corrected = np.clip(corrected * brightness_boost, 0, 1)
-                
-                return (corrected * 255).astype(np.uint8)
-
-            r_enhanced = enhance_band(r)
-            g_enhanced = enhance_band(g)
-            b_enhanced = enhance_band(b)
-
-            # Empilha as bandas para formar uma imagem RGB
-            rgb = np.dstack((r_enhanced, g_enhanced, b_enhanced))
-
-        # Converte o array numpy para uma imagem do Pillow
-        img = Image.fromarray(rgb, 'RGB')
-        
-        # Aplica ajustes adicionais na imagem final
-        from PIL import ImageEnhance
-        
-        # Aumenta o contraste
-        contrast_enhancer = ImageEnhance.Contrast(img)
-        img = contrast_enhancer.enhance(1.3)
-        
-        # Aumenta ligeiramente o brilho
-        brightness_enhancer = ImageEnhance.Brightness(img)
-        img = brightness_enhancer.enhance(1.1)
-        
-        # Aumenta a saturação para cores mais vibrantes
-        saturation_enhancer = ImageEnhance.Color(img)
-        img = saturation_enhancer.enhance(1.2)
-        
-        # Salva a imagem como PNG em um buffer de bytes
-        png_buffer = io.BytesIO()
-        img.save(png_buffer, format='PNG', optimize=True)
-        png_buffer.seek(0)
-        
-        png_bytes = png_buffer.getvalue()
-        cache.set(cache_key, png_bytes, timeout=3600)
-
-        return Response(png_bytes, mimetype='image/png')
+        # Leitura, realce de cor e codificação rodam no pool de processos de
+        # renderização; o worker do Flask só despacha o trabalho e devolve o resultado.
+        def produce():
+            image_bytes = render_preview(
+                get_planet_client(), mosaic_id, quad_id, max_size, encoding, get_render_pool(), get_source_store()
+            )
+            preview_cache.set(cache_key, image_bytes)
+            return image_bytes
+
+        # Pedidos simultâneos da mesma prévia (abas, componentes, outros workers) geram uma única renderização
+        image_bytes = get_single_flight().do(cache_key, produce, recheck=lambda: preview_cache.get(cache_key))
 
+        return _image_response(image_bytes, encoding, etag, max_age)
+
+    except APIError as e:
+        logger.error(f"Erro ao buscar/gerar preview do quad {quad_id}: {e}")
+        return handle_api_error(e)
     except requests.exceptions.HTTPError as e:
-        logger.error(f"Erro HTTP ao buscar preview do quad {quad_id}: {e.response.text}")
-        return jsonify({'error': f'Erro ao comunicar com a API da Planet: {e.response.status_code}'}), e.response.status_code
+        # Vindo do pool de renderização, a exceção chega sem o objeto `response`
+        status_code = e.response.status_code if e.response is not None else 502
+        logger.error(f"Erro HTTP ao buscar preview do quad {quad_id}: {e}")
+        return jsonify({'error': f'Erro ao comunicar com a API da Planet: {status_code}'}), status_code
     except Exception as e:
         logger.error(f"Erro inesperado ao buscar/converter preview do quad: {e}", exc_info=True)
-        return jsonify({'error': 'Erro interno do servidor'}), 500 
\ No newline at end of file
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+def _image_response(image_bytes, encoding, etag, max_age):
+    response = Response(image_bytes, mimetype=encoding.mimetype)
+    return with_validators(response, etag, cache_control(max_age), 'Accept' if encoding.negotiated else None)
+
+def _image_not_modified(etag, encoding, max_age):
+    return not_modified(etag, cache_control(max_age), 'Accept' if encoding.negotiated else None)
+
+@basemap_bp.route('/tiles/<mosaic_id>/<int:z>/<int:x>/<int:y>', methods=['GET'])
+@basemap_bp.route('/tiles/<mosaic_id>/<int:z>/<int:x>/<int:y>.<ext>', methods=['GET'])
+def get_tile(mosaic_id, z, x, y, ext=None):
+    """
+    Tile XYZ (256 px, com transparência exceto em JPEG) do mosaico, renderizado
+    a partir dos quads com o mesmo realce das prévias. Para uso em um TileLayer
+    do Leaflet. A extensão (.png, .webp, .jpg) fixa o formato; sem ela, vale
+    `format` ou o cabeçalho Accept.
+    """
+    config = current_app.config
+    if not is_valid_tile(z, x, y):
+        return jsonify({'error': 'Coordenadas de tile inválidas'}), 400
+    if z < config['TILE_MIN_ZOOM']:
+        return jsonify({'error': f"Tiles disponíveis a partir do zoom {config['TILE_MIN_ZOOM']}"}), 404
+
+    args = request.args.copy()
+    if ext:
+        args['format'] = ext
+    try:
+        encoding = negotiate_image_encoding(args, request.accept_mimetypes, alpha=True)
+    except ValidationError as e:
+        return handle_api_error(e)
+
+    etag = make_etag('tile', RENDER_VERSION, mosaic_id, z, x, y, encoding.cache_suffix)
+    unchanged = _image_not_modified(etag, encoding, config['TILE_CACHE_MAX_AGE'])
+    if unchanged:
+        return unchanged
+
+    cache_key = f"tile_{mosaic_id}_{z}_{x}_{y}_{encoding.cache_suffix}"
+    preview_cache = get_preview_cache()
+    image_bytes = preview_cache.get(cache_key)
+    if image_bytes is None:
+        try:
+            client = get_planet_client()
+            sources = _tile_sources(client, mosaic_id, z, x, y)
+            image_bytes = get_render_pool().run(
+                render_tile, tile_bounds(z, x, y), sources, client.api_key, encoding.format, encoding.quality
+            )
+            preview_cache.set(cache_key, image_bytes)
+        except APIError as e:
+            logger.error(f"Erro ao gerar o tile {z}/{x}/{y} do mosaico {mosaic_id}: {e}")
+            return handle_api_error(e)
+        except Exception as e:
+            logger.error(f"Erro inesperado ao gerar o tile {z}/{x}/{y}: {e}", exc_info=True)
+            return jsonify({'error': 'Erro interno do servidor'}), 500
+
+    return _image_response(image_bytes, encoding, etag, config['TILE_CACHE_MAX_AGE'])
+
+def _tile_sources(client, mosaic_id, z, x, y):
+    """Origens dos quads que cobrem o tile; a lista de quads por tile fica em cache."""
+    cache_key = f"tile_quads_{mosaic_id}_{z}_{x}_{y}"
+    quads = cache.get(cache_key)
+    if quads is None:
+        quads = [
+            {'id': quad['id'], 'download': quad.get('_links', {}).get('download')}
+            for quad in _search_quads(client, mosaic_id, tile_polygon(z, x, y))
+        ]
+        cache.set(cache_key, quads, timeout=3600)
+
+    max_quads = current_app.config['TILE_MAX_QUADS']
+    if len(quads) > max_quads:
+        raise ValidationError(f"O tile cobre {len(quads)} quads (máximo {max_quads}); use um zoom maior")
+
+    return _quad_sources(client, mosaic_id, quads)
+
+def _quad_sources(client, mosaic_id, quads):
+    """
+    Origem de leitura de cada quad ({'id', 'download'}): o caminho local (cache
+    de quads) quando existe, senão o link de download, lido por HTTP range; os
+    quads remotos pedidos de novo são baixados em segundo plano para as próximas leituras.
+    Os links que faltam são buscados de uma vez, em paralelo, e os tokens de
+    download de todos os quads remotos são reservados numa única espera.
+    """
+    source_store = get_source_store()
+    sources, remote, missing = [], [], []
+    for quad in quads:
+        local_path = source_store.get_path(mosaic_id, quad['id']) if source_store else None
+        if local_path:
+            sources.append(local_path)
+        elif quad['download']:
+            remote.append(quad)
+        else:
+            missing.append(quad)
+    if missing:
+        for quad in _with_quad_details(client, mosaic_id, missing):
+            download_url = quad.get('_links', {}).get('download')
+            if download_url:
+                remote.append({'id': quad['id'], 'download': download_url})
+
+    if remote:
+        client.rate_limiter.acquire('downloads', count=len(remote))
+    for quad in remote:
+        sources.append(quad['download'])
+        if source_store:
+            source_store.fetch_in_background(client, mosaic_id, quad['id'], quad['download'])
+    return sources
+
+@basemap_bp.route('/composite', methods=['POST'])
+def composite_route():
+    """
+    Gera numa única renderização o mosaico reduzido de vários quads, recortado
+    pela AOI. Payload: `mosaic_id` e a lista `quads` (ids ou objetos retornados
+    por /quads, dos quais só o id é usado) e/ou `geometry`; opcionais `max_size`, `format` e `quality`.
+    Retorna os limites e a URL da imagem, pronta para um ImageOverlay.
+    """
+    data = request.get_json(silent=True) or {}
+    mosaic_id = data.get('mosaic_id')
+    quads = data.get('quads')
+    geometry = data.get('geometry')
+    if not mosaic_id or not (quads or geometry):
+        return jsonify({"error": "mosaic_id e quads ou geometry são obrigatórios"}), 400
+
+    config = current_app.config
+    try:
+        try:
+            max_size = int(data.get('max_size') or config['COMPOSITE_MAX_SIZE'])
+        except (TypeError, ValueError):
+            raise ValidationError("max_size deve ser um número inteiro")
+        max_size = min(max(max_size, 64), config['PREVIEW_MAX_SIZE_LIMIT'])
+        args = request.args.copy()
+        for name in ('format', 'quality'):
+            if data.get(name) is not None:
+                args[name] = data[name]
+
+        encoding = negotiate_image_encoding(args, request.accept_mimetypes, alpha=True)
+        client = get_planet_client()
+
+        tiles, aoi_report = None, None
+        if geometry:
+            geometry, tiles, aoi_report = preprocess_request_aoi(geometry)
+        if quads:
+            if not isinstance(quads, list):
+                raise ValidationError("quads deve ser uma lista")
+            quad_refs = [_quad_ref(quad) for quad in quads]
+        else:
+            quad_refs = [
+                {'id': quad['id'], 'download': quad.get('_links', {}).get('download')}
+                for quad in _search_quads(client, mosaic_id, geometry, tiles)
+            ]
+        if not quad_refs:
+            return jsonify({'error': 'Nenhum quad encontrado para a área'}), 404
+        if len(quad_refs) > config['COMPOSITE_MAX_QUADS']:
+            raise ValidationError(f"A composição aceita no máximo {config['COMPOSITE_MAX_QUADS']} quads")
+
+        composite_id = _composite_id(mosaic_id, quad_refs, geometry, max_size, encoding)
+        preview_cache = get_preview_cache()
+        cached_meta = preview_cache.get(f"composite_meta_{composite_id}")
+        if cached_meta:
+            return jsonify(json.loads(cached_meta))
+
+        sources = _quad_sources(client, mosaic_id, quad_refs)
+        result = get_render_pool().run(
+            render_composite, sources, max_size, client.api_key, geometry, encoding.format, encoding.quality
+        )
+        if result is None:
+            return jsonify({'error': 'Os quads não têm dados dentro da área'}), 404
+        image_bytes, (west, south, east, north), width, height = result
+
+        meta = {
+            'composite_id': composite_id,
+            'image_url': url_for('.get_composite_image', composite_id=composite_id),
+            'bounds': [[south, west], [north, east]],  # ordem do Leaflet
+            'bbox': [west, south, east, north],
+            'width': width,
+            'height': height,
+            'quads': len(sources),
+            'mimetype': encoding.mimetype,
+        }
+        if aoi_report:
+            meta['aoi'] = aoi_report
+        preview_cache.set(f"composite_{composite_id}", image_bytes)
+        preview_cache.set(f"composite_meta_{composite_id}", json.dumps(meta).encode('utf-8'))
+        logger.info(f"Composição {composite_id} gerada com {len(sources)} quads ({width}x{height}).")
+        return jsonify(meta)
+    except APIError as e:
+        logger.error(f"Erro ao gerar composição do mosaico {mosaic_id}: {e}")
+        return handle_api_error(e)
+    except Exception as e:
+        logger.error(f"Erro inesperado ao gerar composição: {e}", exc_info=True)
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@basemap_bp.route('/composite/<composite_id>', methods=['GET'])
+def get_composite_image(composite_id):
+    """Imagem de uma composição gerada por POST /composite (enquanto estiver no cache)."""
+    # O id já é derivado de tudo que define a imagem
+    etag = make_etag('composite', RENDER_VERSION, composite_id)
+    max_age = current_app.config['TILE_CACHE_MAX_AGE']
+    unchanged = not_modified(etag, cache_control(max_age))
+    if unchanged:
+        return unchanged
+
+    preview_cache = get_preview_cache()
+    meta = preview_cache.get(f"composite_meta_{composite_id}")
+    image_bytes = preview_cache.get(f"composite_{composite_id}")
+    if meta is None or image_bytes is None:
+        return jsonify({'error': 'Composição não encontrada ou expirada; gere-a novamente'}), 404
+    response = Response(image_bytes, mimetype=json.loads(meta)['mimetype'])
+    return with_validators(response, etag, cache_control(max_age))
+
+def _quad_ref(quad):
+    """
+    Aceita o id do quad ou o objeto retornado por /quads. Só o id é usado: links
+    enviados pelo cliente são ignorados e o download é resolvido na Planet.
+    """
+    quad_id = quad.get('id') if isinstance(quad, dict) else quad
+    if not isinstance(quad_id, (str, int)) or isinstance(quad_id, bool) or not str(quad_id):
+        raise ValidationError("Cada quad deve ser um id ou um objeto com 'id'")
+    return {'id': str(quad_id), 'download': None}
+
+def _composite_id(mosaic_id, quad_refs, geometry, max_size, encoding):
+    key = {
+        'mosaic_id': mosaic_id,
+        'quads': sorted(quad['id'] for quad in quad_refs),
+        'geometry': canonical_geometry(geometry) if geometry else None,
+        'max_size': max_size,
+        'encoding': encoding.cache_suffix,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()[:32]
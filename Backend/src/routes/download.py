@@ -5,6 +5,7 @@ import logging
 from flask import Blueprint, request, jsonify, send_file, current_app
 from src.utils.errors import APIError, NotFoundError, ValidationError
 from src.utils.planet_api import get_planet_client
+from src.utils.planet_api_async import AsyncPlanetAPIClient, run_async
 
 download_bp = Blueprint('download', __name__)
 logger = logging.getLogger(__name__)
@@ -99,6 +100,63 @@ def check_asset_status(item_type, item_id, asset_type):
         logger.error(f"Unexpected error checking status: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@download_bp.route('/status', methods=['POST'])
+def check_assets_status_batch():
+    """
+    Verifica o status de vários assets numa única requisição.
+    Payload: {"assets": [{"item_type": "...", "item_id": "...", "asset_type": "..."}]}
+    As consultas à Planet são feitas concorrentemente pelo cliente assíncrono.
+    """
+    try:
+        data = request.get_json() or {}
+        requested = data.get('assets')
+        if not isinstance(requested, list) or not requested:
+            raise ValidationError("assets deve ser uma lista não vazia")
+        if not all(isinstance(entry, dict) and entry.get('item_type') and entry.get('item_id')
+                   and entry.get('asset_type') for entry in requested):
+            raise ValidationError("Cada asset precisa de item_type, item_id e asset_type")
+
+        items = list(dict.fromkeys((entry['item_type'], entry['item_id']) for entry in requested))
+        client = get_planet_client()
+
+        max_concurrency = current_app.config['PLANET_ASYNC_MAX_CONCURRENCY']
+
+        async def fetch():
+            async with AsyncPlanetAPIClient.from_client(client, max_concurrency=max_concurrency) as async_client:
+                return await async_client.gather_item_assets(items)
+
+        assets_by_item = dict(zip(items, run_async(fetch())))
+
+        statuses = []
+        for entry in requested:
+            key = (entry['item_type'], entry['item_id'])
+            result = {'item_type': key[0], 'item_id': key[1], 'asset_type': entry['asset_type']}
+            assets = assets_by_item[key]
+            if isinstance(assets, Exception):
+                result.update({'status': 'error', 'error': str(assets)})
+            elif entry['asset_type'] not in assets:
+                result.update({'status': 'unavailable'})
+            else:
+                asset = assets[entry['asset_type']]
+                result.update({
+                    'status': asset.get('status'),
+                    'download_url': asset.get('location'),
+                    'expires_at': asset.get('expires_at'),
+                })
+            statuses.append(result)
+
+        return jsonify({'assets': statuses})
+
+    except ValidationError as e:
+        logger.warning(f"Validation error in batch status check: {str(e)}")
+        return jsonify(e.to_dict()), e.status_code
+    except APIError as e:
+        logger.error(f"Error checking batch asset status: {str(e)}")
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        logger.error(f"Unexpected error checking batch status: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
 @download_bp.route('/download/<item_type>/<item_id>/<asset_type>', methods=['GET'])
 def download_asset(item_type, item_id, asset_type):
     """Download de um asset ativado"""
@@ -1,11 +1,22 @@
-from flask import Blueprint, send_file, abort
+from flask import Blueprint, send_file, abort, current_app
 import os
+from src.utils.http_cache import make_etag, cache_control, not_modified, with_validators
 
 embargos_bp = Blueprint('embargos_bp', __name__)
 
 @embargos_bp.route('/embargos', methods=['GET'])
 def get_embargos():
     geojson_path = os.path.join(os.path.dirname(__file__), '../static/embargos.geojson')
-    if not os.path.exists(geojson_path):
+    try:
+        stat = os.stat(geojson_path)
+    except FileNotFoundError:
         abort(404, description='Arquivo de embargos não encontrado.')
-    return send_file(geojson_path, mimetype='application/json') 
\ No newline at end of file
+
+    # O arquivo só muda num novo deploy: tamanho e data de modificação o identificam
+    etag = make_etag('embargos', stat.st_size, stat.st_mtime_ns)
+    policy = cache_control(current_app.config['EMBARGOS_CACHE_MAX_AGE'])
+    unchanged = not_modified(etag, policy)
+    if unchanged:
+        return unchanged
+    response = send_file(geojson_path, mimetype='application/json', etag=False, conditional=False)
+    return with_validators(response, etag, policy)
@@ -1,6 +1,10 @@
 from flask import Blueprint, jsonify
 import os
 import psutil
+from src.utils.preview_cache import get_preview_cache
+from src.utils.prefetch import get_prefetcher
+from src.utils.single_flight import get_single_flight
+from src.utils.quad_search_cache import get_quad_search_cache
 
 health_bp = Blueprint('health_bp', __name__)
 
@@ -41,4 +45,16 @@ def health_check():
             'status': 'error',
             'message': str(e),
             'timestamp': None
-        }), 500 
\ No newline at end of file
+        }), 500 
+
+@health_bp.route('/health/cache', methods=['GET'])
+def cache_stats():
+    """Caches de prévias e de buscas de quads, pré-carregamento e coalescência (contadores deste worker)."""
+    quad_cache = get_quad_search_cache()
+    return jsonify({
+        'preview_cache': get_preview_cache().stats(),
+        'prefetch': get_prefetcher().stats(),
+        'single_flight': get_single_flight().stats(),
+        'quad_search_cache': quad_cache.stats() if quad_cache else None,
+        'pid': os.getpid(),
+    }), 200
@@ -1,8 +1,21 @@
 import logging
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from src.utils.validators import validate_search_params
 from src.utils.errors import ValidationError, APIError, QuotaError, RateLimitError
 from src.utils.planet_api import get_planet_client, build_search_payload
+from src.utils.projection import parse_fields, make_projector, project_features
+from src.utils.result_store import get_result_store, build_page, decode_cursor
+from src.utils.delta_search import get_delta_search_store, decompose_search_payload
+from src.utils.search_cache import get_search_cache, search_cache_key
+from src.utils.single_flight import get_single_flight
+from src.utils.geometry import preprocess_request_aoi
+from src.utils.search_fanout import iter_fanout_search, iter_tiled_search
+from src.utils.search_stats import STATS_INTERVALS, compute_local_stats
+from src.utils.http_cache import cache_control, cached_json_response
+from src.utils.streaming import (
+    NDJSON_MIMETYPE, negotiate_search_mimetype, prime_iterator, iter_feature_collection, iter_ndjson
+)
+from src.app import cache
 
 planet_bp = Blueprint('planet', __name__)
 logger = logging.getLogger(__name__)
@@ -10,10 +23,13 @@ logger = logging.getLogger(__name__)
 @planet_bp.route('/item-types', methods=['GET'])
 def get_item_types_route():
     try:
-        client = get_planet_client()
-        # A função get_item_types() agora retorna a lista diretamente
-        item_types = client.get_item_types() 
-        return jsonify({'item_types': item_types})
+        config = current_app.config
+        # Lista guardada com seu ETag: revalidações do navegador não chamam a Planet
+        return cached_json_response(
+            cache, 'planet_item_types', config['METADATA_CACHE_TTL'],
+            lambda: {'item_types': get_planet_client().get_item_types()},
+            cache_control(config['METADATA_CACHE_MAX_AGE']),
+        )
     except (APIError, QuotaError, RateLimitError) as e:
         logger.error(f"Erro na API da Planet ao buscar tipos de item: {e}")
         return jsonify({"error": str(e)}), e.status_code
@@ -40,21 +56,54 @@ def search_items():
         if not validation['valid']:
             raise ValidationError("Parâmetros de busca inválidos", validation['errors'])
         
+        # Simplifica a AOI até o orçamento de vértices e, se for muito grande,
+        # a divide em blocos buscados em paralelo (`?tile=false` desativa os blocos)
+        tiles, aoi_report = None, None
+        if search_data.get('geometry'):
+            geometry, tiles, aoi_report = preprocess_request_aoi(
+                search_data['geometry'], allow_tiles=_arg_bool('tile', default=True)
+            )
+            search_data = {**search_data, 'geometry': geometry}
+
         # Construir payload para a API da Planet
         search_payload = build_search_payload(search_data)
         logger.debug(f"Search payload: {search_payload}")
         
-        # Fazer busca na API da Planet
-        client = get_planet_client()
-        features_list = client.search_items(search_payload)
-        
-        logger.info(f"Search completed. Found {len(features_list)} items after pagination.")
-        
-        # O frontend espera um objeto GeoJSON, então remontamos a estrutura
-        return jsonify({
-            'type': 'FeatureCollection',
-            'features': features_list
-        })
+        # Modo paginado: o resultado completo fica no servidor e só a primeira
+        # página é devolvida, junto com um cursor para as seguintes.
+        limit = _page_limit()
+        projector = _projector()
+        if limit is not None:
+            features, cache_hit = _search_features(search_payload, tiles)
+            result_store = get_result_store()
+            result_id, total = result_store.create(_log_search_total(features))
+            first_page, _ = result_store.page(result_id, 0, limit)
+            first_page = list(project_features(first_page, projector))
+            page = build_page(result_id, first_page, 0, total)
+            if aoi_report:
+                page['aoi'] = aoi_report
+            response = jsonify(page)
+            response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+            return response
+
+        # Fazer busca na API da Planet. A primeira página é buscada antes de
+        # abrir o stream para que erros da Planet ainda virem um status HTTP.
+        features, cache_hit = _search_features(search_payload, tiles)
+
+        # A projeção (fields/footprint_only) é aplicada feature a feature, antes da serialização
+        features = project_features(_log_search_total(features), projector)
+
+        mimetype = negotiate_search_mimetype(request.accept_mimetypes)
+        if mimetype == NDJSON_MIMETYPE:
+            body = iter_ndjson(features)
+        else:
+            body = iter_feature_collection(features, extra={'aoi': aoi_report} if aoi_report else None)
+
+        # O frontend espera um objeto GeoJSON; as páginas seguintes são buscadas
+        # enquanto as primeiras features já estão sendo enviadas ao cliente.
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+        return response
         
     except ValidationError as e:
         logger.warning(f"Validation error in search: {str(e)}")
@@ -66,6 +115,144 @@ def search_items():
         logger.error(f"Unexpected error in search: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@planet_bp.route('/search/<result_id>', methods=['GET'])
+def get_search_page(result_id):
+    """Retorna uma página de um resultado de busca armazenado (`?cursor=...&limit=...`)."""
+    try:
+        offset = decode_cursor(request.args.get('cursor'))
+        limit = _page_limit() or current_app.config['SEARCH_PAGE_SIZE']
+        page = get_result_store().page(result_id, offset, limit)
+        if page is None:
+            return jsonify({'error': 'Resultado de busca não encontrado ou expirado'}), 404
+        features, total = page
+        features = list(project_features(features, _projector()))
+        return jsonify(build_page(result_id, features, offset, total))
+    except ValidationError as e:
+        logger.warning(f"Validation error in search page: {str(e)}")
+        return jsonify(e.to_dict()), e.status_code
+    except Exception as e:
+        logger.error(f"Unexpected error reading search page: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+def _search_features(search_payload, tiles=None):
+    """
+    Retorna (iterador de features, cache_hit). Sem cache, a busca na Planet é
+    iniciada e a primeira página já é consumida, para que erros apareçam aqui.
+    """
+    search_cache = get_search_cache()
+    cache_key = search_cache_key(search_payload)
+    cached_features = search_cache.get(cache_key) if search_cache else None
+    if cached_features is not None:
+        logger.info(f"Cache HIT para a busca {cache_key}")
+        return iter(cached_features), True
+
+    if search_cache:
+        # Uma busca idêntica já em andamento neste worker: espera ela terminar e
+        # gravar o cache em vez de repetir toda a paginação na Planet
+        single_flight = get_single_flight()
+        if single_flight.wait(cache_key) is not None:
+            cached_features = search_cache.get(cache_key)
+            if cached_features is not None:
+                logger.info(f"Busca {cache_key} aproveitada de uma requisição simultânea")
+                return iter(cached_features), True
+        flight = single_flight.lead(cache_key)
+
+    client = get_planet_client()
+    features = _iter_search_features(client, search_payload, tiles)
+    if search_cache:
+        config = current_app.config
+        features = search_cache.fill_through(
+            cache_key, features, config['SEARCH_CACHE_MAX_FEATURES'], config['SEARCH_CACHE_MAX_ENTRY_BYTES']
+        )
+        if flight is not None:
+            features = single_flight.release_after(flight, features)
+    return prime_iterator(features), False
+
+def _page_limit():
+    """Tamanho de página pedido em `?limit=`, limitado a SEARCH_MAX_PAGE_SIZE (None se ausente)."""
+    limit = request.args.get('limit')
+    if limit is None:
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValidationError("limit deve ser um número inteiro")
+    if limit < 1:
+        raise ValidationError("limit deve ser maior que zero")
+    return min(limit, current_app.config['SEARCH_MAX_PAGE_SIZE'])
+
+def _projector():
+    """Projeção pedida via `?fields=id,acquired,...` e/ou `?footprint_only=true`."""
+    return make_projector(parse_fields(request.args.get('fields')), _arg_bool('footprint_only'))
+
+def _arg_bool(name, default=False):
+    """Lê um parâmetro booleano da query string ('1', 'true', 'yes')."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def _iter_search_features(client, search_payload, tiles=None):
+    """
+    Busca incremental: quando a AOI/tipos de item já foram buscados, só os
+    intervalos de data ainda não cobertos vão para a Planet (`?delta=false` desativa).
+    """
+    strategy = _search_strategy()
+    delta_store = get_delta_search_store() if _arg_bool('delta', default=True) else None
+    parts = decompose_search_payload(search_payload) if delta_store else None
+    if parts is None:
+        return _iter_planet_search(client, search_payload, strategy, tiles)
+    return delta_store.iter_search(
+        search_payload, lambda payload: _iter_planet_search(client, payload, strategy, tiles), parts=parts
+    )
+
+def _search_strategy():
+    """
+    Opções de busca da requisição (`?fanout=true&slice_days=30&split_item_types=true`)
+    resolvidas na thread da requisição: a busca por blocos roda em threads de um
+    pool, sem contexto de requisição nem de aplicação.
+    """
+    config = current_app.config
+    return {
+        'fanout': _arg_bool('fanout'),
+        'slice_days': request.args.get('slice_days', type=int) or config['PLANET_SEARCH_SLICE_DAYS'],
+        'split_item_types': _arg_bool('split_item_types'),
+        'max_workers': config['PLANET_SEARCH_FANOUT_WORKERS'],
+    }
+
+def _iter_planet_search(client, search_payload, strategy, tiles=None):
+    """
+    Escolhe a estratégia de busca: paginação sequencial (padrão) ou fan-out por
+    janelas de data em paralelo. AOIs divididas em blocos têm cada bloco buscado
+    em paralelo com a mesma estratégia. Não acessa `request` nem `current_app`.
+    """
+    if tiles:
+        return iter_tiled_search(
+            lambda payload: _iter_planet_search(client, payload, strategy),
+            search_payload,
+            tiles,
+            max_workers=strategy['max_workers'],
+        )
+
+    if not strategy['fanout']:
+        return client.iter_search_items(search_payload)
+
+    return iter_fanout_search(
+        client,
+        search_payload,
+        slice_days=strategy['slice_days'],
+        max_workers=strategy['max_workers'],
+        split_item_types=strategy['split_item_types'],
+    )
+
+def _log_search_total(features):
+    """Repassa as features da busca e registra o total ao final do streaming."""
+    count = 0
+    for feature in features:
+        count += 1
+        yield feature
+    logger.info(f"Search completed. Streamed {count} items after pagination.")
+
 @planet_bp.route('/item/<item_type>/<item_id>/assets', methods=['GET'])
 def get_item_assets(item_type, item_id):
     """Obtém assets de um item específico"""
@@ -166,45 +353,70 @@ def get_search_stats():
         if not validation['valid']:
             raise ValidationError("Parâmetros de busca inválidos", validation['errors'])
         
-        # Construir payload para estatísticas
-        stats_payload = {
-            "item_types": search_data.get('item_types', ["PSScene"]),
-            "interval": "day"
-        }
-        
-        # Adicionar filtros se fornecidos
+        interval = search_data.get('interval', 'day')
+        if interval not in STATS_INTERVALS:
+            raise ValidationError(f"interval deve ser um de: {', '.join(STATS_INTERVALS)}")
+
+        # Mesma simplificação da busca (sem blocos: a Stats API aceita a AOI inteira),
+        # para que a chave de cache coincida com a da busca correspondente
+        if search_data.get('geometry'):
+            geometry, _, _ = preprocess_request_aoi(search_data['geometry'], allow_tiles=False)
+            search_data = {**search_data, 'geometry': geometry}
+
+        max_cloud_fraction = None
+        if search_data.get('max_cloud_cover') is not None:
+            max_cloud_fraction = float(search_data['max_cloud_cover']) / 100.0
+
+        # Se a mesma busca já está em cache, as estatísticas são calculadas
+        # localmente sobre as propriedades das features, sem ir à Planet.
+        search_cache = get_search_cache()
+        if search_cache and all(search_data.get(key) for key in ('start_date', 'end_date', 'geometry', 'item_types')):
+            cached_features = search_cache.get(search_cache_key(build_search_payload(search_data)))
+            if cached_features is not None:
+                logger.info("Estatísticas calculadas localmente a partir da busca em cache.")
+                return jsonify(compute_local_stats(cached_features, interval, max_cloud_fraction))
+
+        # Caso contrário, usa a Stats API da Planet com todos os filtros combinados (AND)
+        filters = []
         if search_data.get('start_date') and search_data.get('end_date'):
-            date_filter = {
+            filters.append({
                 "type": "DateRangeFilter",
                 "field_name": "acquired",
                 "config": {
                     "gte": search_data['start_date'],
                     "lte": search_data['end_date']
                 }
-            }
-            stats_payload["filter"] = date_filter
-        
-        if search_data.get('max_cloud_cover') is not None:
-            cloud_filter = {
+            })
+        if max_cloud_fraction is not None:
+            filters.append({
                 "type": "RangeFilter",
                 "field_name": "cloud_cover",
                 "config": {
-                    "gte": 0,
-                    "lte": search_data['max_cloud_cover'] / 100.0
+                    "lte": max_cloud_fraction
                 }
-            }
-            stats_payload["filter"] = cloud_filter
-        
+            })
         if search_data.get('geometry'):
-            geometry_filter = {
+            filters.append({
                 "type": "GeometryFilter",
                 "field_name": "geometry",
                 "config": search_data['geometry']
-            }
-            stats_payload["filter"] = geometry_filter
-        
-        client = get_planet_client()
-        result = client.get_stats(stats_payload)
+            })
+
+        stats_payload = {
+            "item_types": search_data.get('item_types', ["PSScene"]),
+            "interval": interval,
+            "filter": {"type": "AndFilter", "config": filters}
+        }
+
+        stats_key = search_cache_key(stats_payload, namespace='stats')
+        result = search_cache.get(stats_key) if search_cache else None
+        if result is None:
+            client = get_planet_client()
+            result = client.get_stats(stats_payload)
+            if search_cache:
+                search_cache.set(stats_key, result)
+        else:
+            logger.info(f"Cache HIT para as estatísticas {stats_key}")
         
         return jsonify(result)
         
@@ -0,0 +1,281 @@
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from src.utils.search_cache import canonical_geometry
+from src.utils.search_fanout import find_filter, parse_planet_datetime, format_planet_datetime
+from src.utils.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Lacunas menores que isso (em segundos) não justificam uma nova busca na Planet
+MIN_GAP_SECONDS = 1.0
+INSERT_BATCH_SIZE = 250
+READ_BATCH_SIZE = 500
+
+
+def decompose_search_payload(search_payload):
+    """
+    Extrai (região, início, fim, nuvens máx.) de um payload de `build_search_payload`.
+    A região identifica a AOI canônica mais os tipos de item. Retorna None se o
+    payload tiver filtros que a busca incremental não sabe reaplicar localmente.
+    """
+    search_filter = search_payload.get('filter') or {}
+    children = search_filter.get('config', []) if search_filter.get('type') == 'AndFilter' else [search_filter]
+
+    date_filter = cloud_filter = geometry_filter = None
+    for child in children:
+        child_type, field_name = child.get('type'), child.get('field_name')
+        if child_type == 'DateRangeFilter' and field_name == 'acquired' and date_filter is None:
+            date_filter = child
+        elif child_type == 'RangeFilter' and field_name == 'cloud_cover' and cloud_filter is None:
+            cloud_filter = child
+        elif child_type == 'GeometryFilter' and geometry_filter is None:
+            geometry_filter = child
+        else:
+            return None
+
+    if date_filter is None or geometry_filter is None:
+        return None
+    date_config = date_filter.get('config', {})
+    if set(date_config) != {'gte', 'lte'}:
+        return None
+    cloud_config = (cloud_filter or {}).get('config', {})
+    if set(cloud_config) - {'gte', 'lte'} or float(cloud_config.get('gte', 0)) > 0:
+        return None
+
+    region_source = {
+        'geometry': canonical_geometry(geometry_filter['config']),
+        'item_types': sorted(search_payload.get('item_types', [])),
+    }
+    region = hashlib.sha256(json.dumps(region_source, sort_keys=True).encode('utf-8')).hexdigest()
+    return {
+        'region': region,
+        'start': parse_planet_datetime(date_config['gte']).timestamp(),
+        'end': parse_planet_datetime(date_config['lte']).timestamp(),
+        'max_cloud': float(cloud_config.get('lte', 1.0)),
+    }
+
+
+def subtract_intervals(start, end, covered):
+    """Retorna os trechos de [start, end] não cobertos pelos intervalos fechados em `covered`."""
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in sorted(covered):
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start - cursor > MIN_GAP_SECONDS:
+            gaps.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if end - cursor > MIN_GAP_SECONDS:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def split_intervals(start, end, gaps):
+    """Divide [start, end] em trechos (início, fim, é_lacuna), do mais recente para o mais antigo."""
+    segments = []
+    cursor = start
+    for gap_start, gap_end in gaps:
+        if gap_start > cursor:
+            segments.append((cursor, gap_start, False))
+        segments.append((gap_start, gap_end, True))
+        cursor = gap_end
+    if end > cursor:
+        segments.append((cursor, end, False))
+    return segments[::-1]
+
+
+class DeltaSearchStore(SQLiteStore):
+    """
+    Guarda, por região (AOI + tipos de item), os intervalos de data já buscados
+    na Planet e as features retornadas. Uma nova busca só consulta a Planet nos
+    trechos ainda não cobertos; o restante é servido localmente, filtrado por
+    data e cobertura de nuvens. Intervalos buscados com limite de nuvens maior
+    também cobrem buscas mais restritivas.
+    """
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS delta_coverage (
+            region TEXT NOT NULL,
+            start REAL NOT NULL,
+            end REAL NOT NULL,
+            max_cloud REAL NOT NULL,
+            fetched_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_delta_coverage_region ON delta_coverage (region)",
+        """CREATE TABLE IF NOT EXISTS delta_features (
+            region TEXT NOT NULL,
+            id TEXT NOT NULL,
+            acquired REAL NOT NULL,
+            cloud_cover REAL,
+            value BLOB NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (region, id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_delta_features_acquired ON delta_features (region, acquired)",
+    )
+
+    def __init__(self, path, ttl=6 * 3600):
+        super().__init__(path)
+        self.ttl = ttl
+
+    def _expire(self, conn, now):
+        conn.execute("DELETE FROM delta_coverage WHERE fetched_at < ?", (now - self.ttl,))
+        conn.execute("DELETE FROM delta_features WHERE fetched_at < ?", (now - self.ttl,))
+
+    def uncovered_intervals(self, region, start, end, max_cloud):
+        now = time.time()
+        with self.connection() as conn:
+            self._expire(conn, now)
+            rows = conn.execute(
+                "SELECT start, end FROM delta_coverage WHERE region = ? AND max_cloud >= ? AND end >= ? AND start <= ?",
+                (region, max_cloud, start, end),
+            ).fetchall()
+        return subtract_intervals(start, end, rows)
+
+    def _feature_row(self, region, feature, now):
+        """Linha de `delta_features` da feature, ou None se faltar id ou data de aquisição."""
+        properties = feature.get('properties') or {}
+        if not feature.get('id') or not properties.get('acquired'):
+            return None
+        return (
+            region,
+            feature['id'],
+            parse_planet_datetime(properties['acquired']).timestamp(),
+            properties.get('cloud_cover'),
+            zlib.compress(json.dumps(feature, separators=(',', ':')).encode('utf-8')),
+            now,
+        )
+
+    def _insert(self, batch):
+        with self.connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO delta_features (region, id, acquired, cloud_cover, value, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+        return len(batch)
+
+    def _mark_covered(self, region, start, end, max_cloud):
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT INTO delta_coverage (region, start, end, max_cloud, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (region, start, end, max_cloud, time.time()),
+            )
+
+    def iter_stored(self, region, start, end, max_cloud):
+        """
+        Tuplas (id, acquired, feature) das features armazenadas da região,
+        filtradas localmente, da mais recente para a mais antiga. A leitura é feita em lotes de READ_BATCH_SIZE
+        (paginação por chave), sem manter cursor ou transação abertos entre os yields.
+        """
+        base = (
+            "SELECT id, acquired, value FROM delta_features WHERE region = ? AND acquired >= ? AND acquired <= ? "
+            "AND (cloud_cover IS NULL OR cloud_cover <= ?)"
+        )
+        params = (region, start, end, max_cloud)
+        after = ()
+        while True:
+            sql = base + (" AND (acquired < ? OR (acquired = ? AND id < ?))" if after else "")
+            rows = self.query(sql + " ORDER BY acquired DESC, id DESC LIMIT ?", params + after + (READ_BATCH_SIZE,))
+            for feature_id, acquired, value in rows:
+                yield feature_id, acquired, json.loads(zlib.decompress(value))
+            if len(rows) < READ_BATCH_SIZE:
+                return
+            last_id, last_acquired = rows[-1][0], rows[-1][1]
+            after = (last_acquired, last_acquired, last_id)
+
+    def _iter_gap(self, region, gap_payload, gap_start, gap_end, max_cloud, fetch):
+        """
+        Repassa as features da lacuna à medida que a Planet as devolve,
+        gravando-as em lotes. O intervalo só é marcado como coberto se a busca
+        da lacuna terminar sem erro e sem ser interrompida pelo consumidor.
+        """
+        now = time.time()
+        batch = []
+        stored = 0
+        for feature in fetch(gap_payload):
+            row = self._feature_row(region, feature, now)
+            if row is None:
+                continue
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                stored += self._insert(batch)
+                batch = []
+            yield row[1], row[2], feature
+        if batch:
+            stored += self._insert(batch)
+        self._mark_covered(region, gap_start, gap_end, max_cloud)
+        logger.debug(f"Intervalo {gap_start}-{gap_end} da região {region[:12]} buscado: {stored} features armazenadas.")
+
+    def iter_search(self, search_payload, fetch, parts=None):
+        """
+        Executa a busca incremental: `fetch(payload)` é chamado apenas para as
+        lacunas de data (e pode ser a paginação sequencial ou o fan-out). Os
+        trechos são percorridos do mais recente para o mais antigo, alternando
+        entre as features armazenadas e as lacunas, que são repassadas em stream.
+        """
+        parts = parts or decompose_search_payload(search_payload)
+        region, start, end, max_cloud = parts['region'], parts['start'], parts['end'], parts['max_cloud']
+
+        gaps = self.uncovered_intervals(region, start, end, max_cloud)
+        if gaps:
+            logger.info(f"Busca incremental: {len(gaps)} intervalo(s) novo(s) a buscar na Planet para a região {region[:12]}.")
+        else:
+            logger.info(f"Busca incremental: intervalo totalmente coberto localmente para a região {region[:12]}.")
+
+        # Uma cena adquirida exatamente na fronteira entre trechos aparece nos
+        # dois; só os ids dessas fronteiras são lembrados para não repeti-la
+        boundaries = {edge for gap in gaps for edge in gap}
+        boundary_ids = set()
+
+        for segment_start, segment_end, is_gap in split_intervals(start, end, gaps):
+            if is_gap:
+                gap_payload = copy.deepcopy(search_payload)
+                date_filter = find_filter(gap_payload['filter'], 'DateRangeFilter', 'acquired')
+                date_filter['config'] = {
+                    'gte': format_planet_datetime(_from_timestamp(segment_start)),
+                    'lte': format_planet_datetime(_from_timestamp(segment_end)),
+                }
+                features = self._iter_gap(region, gap_payload, segment_start, segment_end, max_cloud, fetch)
+            else:
+                features = self.iter_stored(region, segment_start, segment_end, max_cloud)
+            for feature_id, acquired, feature in features:
+                if acquired in boundaries:
+                    if feature_id in boundary_ids:
+                        continue
+                    boundary_ids.add(feature_id)
+                yield feature
+
+
+def _from_timestamp(value):
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+_delta_store = None
+_delta_store_lock = threading.Lock()
+
+
+def get_delta_search_store():
+    """Retorna o armazenamento de busca incremental do processo (ou None se desabilitado)."""
+    global _delta_store
+    if not current_app.config.get('DELTA_SEARCH_ENABLED', True):
+        return None
+    if _delta_store is None:
+        with _delta_store_lock:
+            if _delta_store is None:
+                _delta_store = DeltaSearchStore(
+                    current_app.config['DELTA_SEARCH_PATH'],
+                    ttl=current_app.config['DELTA_SEARCH_TTL'],
+                )
+    return _delta_store
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class DiskStore:
+    """
+    Armazenamento em disco endereçado pelo hash da chave, compartilhado pelos
+    workers do gunicorn. Escritas são atômicas (arquivo temporário + rename),
+    então um leitor nunca vê um arquivo pela metade. A cota `max_bytes` é
+    mantida removendo os arquivos acessados há mais tempo (mtime é atualizado a
+    cada leitura).
+    """
+
+    # Fração da cota escrita por este processo antes de reavaliar o uso do diretório
+    SCAN_EVERY_FRACTION = 0.05
+    # Após uma limpeza o uso fica abaixo desta fração da cota
+    LOW_WATERMARK = 0.9
+
+    def __init__(self, directory, max_bytes, suffix=''):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._written_since_scan = None  # None força a verificação na primeira escrita
+        self.evictions = 0
+
+    def path_for(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + self.suffix)
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def get(self, key):
+        """Retorna o conteúdo armazenado em `key`, ou None."""
+        path = self.path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self._touch(path)
+        return data
+
+    def get_path(self, key):
+        """Retorna o caminho do arquivo de `key` (marcando o acesso), ou None se não existir."""
+        path = self.path_for(key)
+        return path if self._touch(path) else None
+
+    def __contains__(self, key):
+        return os.path.exists(self.path_for(key))
+
+    def set(self, key, data):
+        """Grava `data` em `key` de forma atômica."""
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        return self.put_file(key, write)
+
+    def put_file(self, key, produce):
+        """
+        Grava o arquivo de `key` chamando `produce(caminho_temporario)`, que deve
+        escrever o conteúdo nesse caminho (no mesmo diretório do destino); só
+        então ele substitui o destino. Retorna o caminho final.
+        """
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix=self.suffix)
+        os.close(fd)
+        try:
+            produce(tmp_path)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self._account(size)
+        return path
+
+    def _account(self, size):
+        with self._lock:
+            if self._written_since_scan is not None:
+                self._written_since_scan += size
+                if self._written_since_scan < self.max_bytes * self.SCAN_EVERY_FRACTION:
+                    return
+            self._written_since_scan = 0
+        self.enforce_quota()
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith('.tmp-'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def usage(self):
+        """Retorna (arquivos, bytes) atualmente no diretório."""
+        count = total = 0
+        for _, size, _ in self._entries():
+            count += 1
+            total += size
+        return count, total
+
+    def enforce_quota(self):
+        """Remove os arquivos menos usados recentemente até o uso ficar abaixo da cota."""
+        entries = list(self._entries())
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+
+        target = self.max_bytes * self.LOW_WATERMARK
+        removed = 0
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # outro worker removeu antes
+            total -= size
+            removed += 1
+        with self._lock:
+            self.evictions += removed
+        logger.info(f"{removed} arquivos removidos de {self.directory} para respeitar a cota.")
+        return removed
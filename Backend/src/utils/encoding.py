@@ -0,0 +1,78 @@
+import io
+from collections import namedtuple
+
+from PIL import Image
+
+from src.utils.errors import ValidationError
+
+# Formato -> (nome no Pillow, mimetype), em ordem de preferência do servidor
+IMAGE_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png'),
+}
+FORMAT_ALIASES = {'jpg': 'jpeg'}
+
+DEFAULT_QUALITY = {'webp': 80, 'jpeg': 85}
+
+# Codificação rápida: sem `optimize` no PNG/JPEG e método intermediário no WebP
+PNG_COMPRESS_LEVEL = 1
+WEBP_METHOD = 2
+
+
+class ImageEncoding(namedtuple('ImageEncoding', ['format', 'quality', 'negotiated'])):
+    """Formato/qualidade escolhidos para uma imagem; `negotiated` indica que veio do Accept."""
+
+    @property
+    def mimetype(self):
+        return IMAGE_FORMATS[self.format][1]
+
+    @property
+    def cache_suffix(self):
+        """Parte da chave de cache: a mesma imagem em codificações diferentes é guardada separadamente."""
+        return f"{self.format}{self.quality or ''}"
+
+
+def negotiate_image_encoding(args, accept_mimetypes, alpha=False):
+    """
+    Escolhe a codificação pelos parâmetros `format`/`quality` ou, sem `format`,
+    pelo cabeçalho Accept: WebP se o cliente o anuncia explicitamente (todos os
+    navegadores atuais), senão JPEG (ou PNG, se a imagem tiver transparência)
+    quando anunciado, e PNG como padrão.
+    """
+    requested = args.get('format')
+    if requested:
+        image_format = FORMAT_ALIASES.get(requested.lower(), requested.lower())
+        if image_format not in IMAGE_FORMATS:
+            raise ValidationError(f"format deve ser um de: {', '.join(IMAGE_FORMATS)}")
+        negotiated = False
+    else:
+        offered = {mimetype for mimetype, _ in accept_mimetypes}
+        candidates = ['webp', 'png'] if alpha else ['webp', 'jpeg']
+        image_format = next((name for name in candidates if IMAGE_FORMATS[name][1] in offered), 'png')
+        negotiated = True
+
+    quality = None
+    if image_format in DEFAULT_QUALITY:
+        quality = args.get('quality', type=int) or DEFAULT_QUALITY[image_format]
+        if not 1 <= quality <= 100:
+            raise ValidationError("quality deve estar entre 1 e 100")
+    return ImageEncoding(image_format, quality, negotiated)
+
+
+def encode_image(image, image_format='png', quality=None):
+    """Codifica a imagem uint8 (altura, largura, 3 ou 4 canais) no formato pedido."""
+    pil_image = Image.fromarray(image)
+    options = {}
+    if image_format == 'png':
+        options['compress_level'] = PNG_COMPRESS_LEVEL
+    elif image_format == 'webp':
+        options.update(quality=quality or DEFAULT_QUALITY['webp'], method=WEBP_METHOD)
+    elif image_format == 'jpeg':
+        if pil_image.mode == 'RGBA':
+            pil_image = pil_image.convert('RGB')  # JPEG não tem transparência
+        options['quality'] = quality or DEFAULT_QUALITY['jpeg']
+
+    buffer = io.BytesIO()
+    pil_image.save(buffer, format=IMAGE_FORMATS[image_format][0], **options)
+    return buffer.getvalue()
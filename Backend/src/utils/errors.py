@@ -43,7 +43,19 @@ class QuotaError(APIError):
 
 class RateLimitError(APIError):
     """Exceção para erros de limite de requisições (HTTP 429)."""
-    def __init__(self, message="Limite de requisições à API da Planet excedido. Tente novamente mais tarde.", status_code=429):
+    def __init__(self, message="Limite de requisições à API da Planet excedido. Tente novamente mais tarde.", status_code=429, retry_after=None):
+        super().__init__(message, status_code)
+        self.retry_after = retry_after
+
+class ServiceUnavailableError(APIError):
+    """Serviço temporariamente sobrecarregado (HTTP 503); o cliente deve tentar de novo."""
+    def __init__(self, message="Servidor ocupado. Tente novamente em instantes.", status_code=503, retry_after=None):
+        super().__init__(message, status_code)
+        self.retry_after = retry_after
+
+class GatewayTimeoutError(APIError):
+    """Processamento excedeu o tempo limite (HTTP 504)."""
+    def __init__(self, message="O processamento excedeu o tempo limite.", status_code=504):
         super().__init__(message, status_code)
 
 def error_response(status_code, message=None):
@@ -81,6 +93,8 @@ def handle_api_error(error):
     """Handler para a classe APIError"""
     response = jsonify(error.to_dict())
     response.status_code = error.status_code
+    if getattr(error, 'retry_after', None):
+        response.headers['Retry-After'] = str(int(error.retry_after + 0.5))
     return response
 
 def handle_validation_error(error):
@@ -0,0 +1,146 @@
+import logging
+import math
+
+import shapely
+from flask import current_app
+from pyproj import Geod
+from shapely.geometry import shape, mapping, box
+
+logger = logging.getLogger(__name__)
+
+_GEOD = Geod(ellps='WGS84')
+
+# Número máximo de iterações da busca binária pela tolerância de simplificação
+MAX_SIMPLIFY_ITERATIONS = 24
+MAX_TILES = 16
+
+
+def count_vertices(geometry):
+    """Número total de vértices (todos os anéis/partes) de uma geometria shapely."""
+    return int(shapely.get_num_coordinates(geometry))
+
+
+def geodesic_area_km2(geometry):
+    """Área geodésica (WGS84) em km²."""
+    area, _ = _GEOD.geometry_area_perimeter(geometry)
+    return abs(area) / 1e6
+
+
+def simplify_to_budget(geometry, max_vertices):
+    """
+    Simplifica preservando a topologia até caber em `max_vertices` vértices.
+    A tolerância é escolhida por busca binária, para ser a menor que respeita o
+    limite (e portanto a que menos altera a área). Retorna (geometria, tolerância).
+    """
+    if count_vertices(geometry) <= max_vertices:
+        return geometry, 0.0
+
+    min_x, min_y, max_x, max_y = geometry.bounds
+    low, high = 0.0, max(max_x - min_x, max_y - min_y) or 1e-6
+    best = None
+    for _ in range(MAX_SIMPLIFY_ITERATIONS):
+        tolerance = (low + high) / 2
+        candidate = geometry.simplify(tolerance, preserve_topology=True)
+        if not candidate.is_empty and count_vertices(candidate) <= max_vertices:
+            best = (candidate, tolerance)
+            high = tolerance
+        else:
+            low = tolerance
+
+    if best is None:
+        # Mesmo a maior tolerância não coube no orçamento (ex.: milhares de partes):
+        # usa o fecho convexo, que sempre tem poucos vértices e contém a AOI original.
+        hull = geometry.convex_hull
+        if count_vertices(hull) > max_vertices:
+            hull = geometry.envelope
+        return hull, high
+    return best
+
+
+def split_into_tiles(geometry, max_tile_area_km2, max_tiles=MAX_TILES):
+    """
+    Divide uma AOI grande numa grade regular de blocos (recortados pela AOI),
+    cada um com aproximadamente `max_tile_area_km2`. Retorna a lista de
+    geometrias não vazias.
+    """
+    area = geodesic_area_km2(geometry)
+    tile_count = min(max_tiles, math.ceil(area / max_tile_area_km2))
+    if tile_count <= 1:
+        return [geometry]
+
+    columns = math.ceil(math.sqrt(tile_count))
+    rows = math.ceil(tile_count / columns)
+    min_x, min_y, max_x, max_y = geometry.bounds
+    width = (max_x - min_x) / columns
+    height = (max_y - min_y) / rows
+
+    tiles = []
+    for column in range(columns):
+        for row in range(rows):
+            cell = box(min_x + column * width, min_y + row * height,
+                       min_x + (column + 1) * width, min_y + (row + 1) * height)
+            tile = _polygonal_part(geometry.intersection(cell))
+            if tile is not None:
+                tiles.append(tile)
+    return tiles
+
+
+def _polygonal_part(geometry):
+    """Descarta linhas/pontos que sobram do recorte (bordas compartilhadas com a grade)."""
+    if geometry.geom_type == 'GeometryCollection':
+        polygons = [part for part in geometry.geoms if part.geom_type in ('Polygon', 'MultiPolygon')]
+        geometry = shapely.union_all(polygons) if polygons else None
+    if geometry is None or geometry.is_empty or geometry.area == 0:
+        return None
+    return geometry
+
+
+def preprocess_aoi(geometry_geojson, max_vertices, tile_area_km2=None):
+    """
+    Prepara a AOI antes de enviá-la à Planet: simplifica até o orçamento de
+    vértices e, se `tile_area_km2` for informado e a AOI for maior que isso, a
+    divide em blocos. Retorna (geometria GeoJSON, blocos GeoJSON ou None, relatório).
+    Geometrias não poligonais são devolvidas sem alteração.
+    """
+    geometry = shape(geometry_geojson)
+    if geometry.geom_type not in ('Polygon', 'MultiPolygon') or geometry.is_empty:
+        return geometry_geojson, None, None
+
+    if not geometry.is_valid:
+        geometry = shapely.make_valid(geometry)
+        if geometry.geom_type not in ('Polygon', 'MultiPolygon'):
+            return geometry_geojson, None, None
+
+    original_vertices = count_vertices(geometry)
+    original_area = geodesic_area_km2(geometry)
+    simplified, tolerance = simplify_to_budget(geometry, max_vertices)
+
+    changed_area = geodesic_area_km2(geometry.symmetric_difference(simplified)) if tolerance else 0.0
+    report = {
+        'original_vertices': original_vertices,
+        'vertices': count_vertices(simplified),
+        'tolerance_degrees': tolerance,
+        'area_km2': round(original_area, 3),
+        'area_changed_km2': round(changed_area, 3),
+        'area_changed_ratio': round(changed_area / original_area, 6) if original_area else 0.0,
+        'tiles': 1,
+    }
+
+    tiles = None
+    if tile_area_km2 and original_area > tile_area_km2:
+        tile_geometries = split_into_tiles(simplified, tile_area_km2)
+        if len(tile_geometries) > 1:
+            tiles = [mapping(tile) for tile in tile_geometries]
+            report['tiles'] = len(tiles)
+
+    if tolerance:
+        logger.info(f"AOI simplificada de {original_vertices} para {report['vertices']} vértices "
+                    f"(área alterada: {report['area_changed_ratio']:.4%}).")
+    return mapping(simplified), tiles, report
+
+
+def preprocess_request_aoi(geometry_geojson, allow_tiles=True):
+    """Aplica `preprocess_aoi` com os limites da configuração (AOI_MAX_VERTICES, AOI_TILE_AREA_KM2)."""
+    config = current_app.config
+    tile_area = config['AOI_TILE_AREA_KM2'] if allow_tiles else None
+    return preprocess_aoi(geometry_geojson, config['AOI_MAX_VERTICES'], tile_area)
@@ -0,0 +1,63 @@
+import hashlib
+
+from flask import Response, current_app, request
+
+# Incluída nos ETags de imagens renderizadas: mudar o realce ou a codificação
+# exige incrementá-la para que os navegadores não reutilizem imagens antigas
+RENDER_VERSION = '1'
+
+
+def make_etag(*parts):
+    """ETag forte (sem aspas) derivado da identidade do recurso, ex.: (mosaic_id, quad_id, tamanho)."""
+    identity = '\x1f'.join(str(part) for part in parts)
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32]
+
+
+def content_etag(data):
+    """ETag forte (sem aspas) a partir do conteúdo da resposta."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def cache_control(max_age, public=True):
+    return f"{'public' if public else 'private'}, max-age={max_age}"
+
+
+def not_modified(etag, cache_control_value, vary=None):
+    """
+    Resposta 304 se o If-None-Match da requisição corresponde a `etag`, senão
+    None. Deve ser chamada antes de qualquer trabalho (cache, Planet,
+    renderização), pois só depende da identidade do recurso.
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    return with_validators(response, etag, cache_control_value, vary)
+
+
+def with_validators(response, etag, cache_control_value, vary=None):
+    """Adiciona ETag, Cache-Control e, opcionalmente, Vary à resposta."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control_value
+    if vary:
+        response.vary.add(vary)
+    return response
+
+
+def cached_json_response(cache, cache_key, timeout, produce, cache_control_value):
+    """
+    Resposta JSON com ETag do conteúdo. O corpo serializado e seu ETag ficam
+    em `cache` por `timeout` segundos, então uma revalidação (If-None-Match)
+    é respondida com 304 sem chamar `produce` nem a Planet.
+    """
+    cached = cache.get(cache_key)
+    if cached is None:
+        body = current_app.json.dumps(produce())
+        cached = (content_etag(body), body)
+        cache.set(cache_key, cached, timeout=timeout)
+    etag, body = cached
+    response = not_modified(etag, cache_control_value)
+    if response is None:
+        response = with_validators(Response(body, mimetype='application/json'), etag, cache_control_value)
+    return response
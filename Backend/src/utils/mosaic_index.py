@@ -0,0 +1,159 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from src.utils.single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+# "global_monthly_2024_05_mosaic", "planet_medres_normalized_analytic_2024-05_mosaic"
+MONTH_IN_NAME = re.compile(r'(\d{4})[-_](\d{2})(?!\d)')
+
+
+def mosaic_month(mosaic):
+    """Mês (AAAA-MM) do mosaico: pelo nome, como a busca antiga, ou pela primeira data de aquisição."""
+    match = MONTH_IN_NAME.search(mosaic.get('name', ''))
+    if match:
+        return f"{match.group(1)}-{match.group(2)}"
+    first_acquired = mosaic.get('first_acquired')
+    return first_acquired[:7] if first_acquired else None
+
+
+def summarize_mosaic(mosaic):
+    """Campos do mosaico usados pelo backend e pelo frontend."""
+    grid = mosaic.get('grid') or {}
+    return {
+        'id': mosaic['id'],
+        'name': mosaic.get('name'),
+        'month': mosaic_month(mosaic),
+        'first_acquired': mosaic.get('first_acquired'),
+        'last_acquired': mosaic.get('last_acquired'),
+        'bbox': mosaic.get('bbox'),
+        'level': mosaic.get('level'),
+        'quad_size': grid.get('quad_size'),
+        'resolution': grid.get('resolution'),
+        'coordinate_system': mosaic.get('coordinate_system'),
+    }
+
+
+class SeriesIndex:
+    """Mosaicos de uma série indexados por mês."""
+
+    def __init__(self, series_id, mosaics):
+        self.series_id = series_id
+        self.built_at = time.time()
+        self.by_month = {}
+        self.by_id = {}
+        for mosaic in mosaics:
+            summary = summarize_mosaic(mosaic)
+            self.by_id[summary['id']] = summary
+            # Com mais de um mosaico no mês vale o primeiro, como na busca por nome
+            if summary['month']:
+                self.by_month.setdefault(summary['month'], summary)
+
+    @property
+    def age(self):
+        return time.time() - self.built_at
+
+    def months(self):
+        return [self.by_month[month] for month in sorted(self.by_month)]
+
+
+class MosaicIndex:
+    """
+    Índice em memória dos mosaicos de cada série: todas as páginas de
+    mosaicos são buscadas uma vez e indexadas por mês, então a busca do
+    mosaico de um mês é uma consulta a um dicionário. Depois de `ttl`
+    segundos o índice continua sendo usado enquanto é reconstruído em segundo
+    plano. Um mês ausente força uma reconstrução (no máximo a cada
+    `miss_refresh_interval` segundos), para encontrar mosaicos recém-publicados.
+    """
+
+    def __init__(self, single_flight, ttl, miss_refresh_interval):
+        self.single_flight = single_flight
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._series = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mosaic-index')
+
+    def _build(self, client, series_id):
+        mosaics = client.get_mosaics_for_series(series_id).get('mosaics', [])
+        index = SeriesIndex(series_id, mosaics)
+        with self._lock:
+            self._series[series_id] = index
+        logger.info(f"Índice da série {series_id} construído: {len(mosaics)} mosaicos, {len(index.by_month)} meses.")
+        return index
+
+    def build(self, client, series_id):
+        """(Re)constrói o índice da série; chamadas simultâneas fazem uma única busca."""
+        return self.single_flight.do(
+            f"mosaic_index_{series_id}", lambda: self._build(client, series_id), shared=False
+        )
+
+    def _refresh_in_background(self, client, series_id):
+        with self._lock:
+            if series_id in self._refreshing:
+                return
+            self._refreshing.add(series_id)
+
+        def run():
+            try:
+                self._build(client, series_id)
+            except Exception as e:
+                logger.warning(f"Falha ao atualizar o índice da série {series_id}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(series_id)
+
+        self._executor.submit(run)
+
+    def get(self, client, series_id):
+        """Índice da série, construído na primeira consulta e atualizado em segundo plano quando expira."""
+        with self._lock:
+            index = self._series.get(series_id)
+        if index is None:
+            return self.build(client, series_id)
+        if index.age > self.ttl:
+            self._refresh_in_background(client, series_id)
+        return index
+
+    def lookup(self, client, series_id, year, month):
+        """Resumo do mosaico da série no mês, ou None."""
+        key = f"{int(year):04d}-{int(month):02d}"
+        index = self.get(client, series_id)
+        mosaic = index.by_month.get(key)
+        if mosaic is None and index.age > self.miss_refresh_interval:
+            mosaic = self.build(client, series_id).by_month.get(key)
+        return mosaic
+
+    def months(self, client, series_id):
+        return self.get(client, series_id).months()
+
+    def find(self, client, series_id, mosaic_id):
+        """Resumo de um mosaico da série pelo id, ou None."""
+        return self.get(client, series_id).by_id.get(mosaic_id)
+
+
+_mosaic_index = None
+_mosaic_index_lock = threading.Lock()
+
+
+def get_mosaic_index():
+    """Retorna o índice de mosaicos do processo."""
+    global _mosaic_index
+    if _mosaic_index is None:
+        with _mosaic_index_lock:
+            if _mosaic_index is None:
+                config = current_app.config
+                _mosaic_index = MosaicIndex(
+                    get_single_flight(),
+                    ttl=config['MOSAIC_INDEX_TTL'],
+                    miss_refresh_interval=config['MOSAIC_INDEX_MISS_REFRESH'],
+                )
+    return _mosaic_index
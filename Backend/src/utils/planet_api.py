@@ -1,79 +1,113 @@
 import os
 import logging
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
-from flask import g
+from flask import current_app
 from datetime import datetime
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 import time
+# As exceções são as mesmas tratadas pelos handlers registrados em main.py
+from src.utils.errors import APIError, QuotaError, RateLimitError
+from src.utils.rate_limit import AdaptiveRateLimiter, parse_retry_after, backoff_delay
+
+# Status transitórios que justificam uma nova tentativa
+RETRYABLE_STATUS = {429, 502, 503, 504}
 
 # --- Configuração do Logger ---
 logger = logging.getLogger(__name__)
 
-# --- Classes de Erro Customizadas ---
-class APIError(Exception):
-    """Exceção base para erros da API da Planet."""
-    def __init__(self, message, status_code=500):
-        super().__init__(message)
-        self.message = message
-        self.status_code = status_code
-    
-    def to_dict(self):
-        return {'error': self.message, 'status_code': self.status_code}
-
-class QuotaError(APIError):
-    """Exceção para erros de cota excedida."""
-    pass
-
-class RateLimitError(APIError):
-    """Exceção para erros de limite de taxa."""
-    pass
-
 # --- Cliente da API da Planet ---
 class PlanetAPIClient:
     """Um cliente para interagir com as APIs da Planet."""
 
-    def __init__(self, api_key):
+    def __init__(self, api_key, pool_connections=10, pool_maxsize=32,
+                 connect_timeout=5, read_timeout=60, download_read_timeout=120,
+                 rate_limiter=None, max_retries=4):
         if not api_key:
             raise ValueError("A chave da API da Planet (PLANET_API_KEY) não foi configurada.")
         self.api_key = api_key
         self.base_url = "https://api.planet.com"
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.download_timeout = (connect_timeout, download_read_timeout)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.max_retries = max_retries
         self.session = self._create_session()
 
     def _create_session(self):
-        """Cria e configura uma sessão de requisições com a chave da API."""
+        """
+        Cria e configura uma sessão de requisições com a chave da API.
+        O HTTPAdapter mantém um pool de conexões keep-alive por host
+        (`pool_connections` hosts, até `pool_maxsize` conexões cada), reaproveitado
+        por todas as requisições do processo.
+        """
         session = requests.Session()
         session.auth = (self.api_key, '')
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
         return session
 
-    def _request(self, method, url, **kwargs):
-        """Método unificado para fazer requisições e tratar erros comuns."""
-        try:
-            response = self.session.request(method, url, **kwargs)
-            
+    def _request(self, method, url, endpoint=None, retry_status=(), **kwargs):
+        """
+        Método unificado para fazer requisições e tratar erros comuns.
+        Cada chamada passa pelo limitador de taxa do grupo de endpoints
+        (search, basemaps, downloads, data). Respostas 429/5xx transitórias e
+        falhas de conexão são repetidas com backoff exponencial e jitter,
+        respeitando o Retry-After enviado pela Planet. `retry_status` acrescenta
+        status repetidos só nesta chamada (ex.: 404 de um resultado recém-criado).
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        endpoint = endpoint or self.rate_limiter.classify(url)
+        retryable = RETRYABLE_STATUS.union(retry_status)
+
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(endpoint)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt < self.max_retries:
+                    delay = backoff_delay(attempt)
+                    logger.warning(f"Falha de comunicação com a Planet ({e}). Nova tentativa em {delay:.1f}s.")
+                    time.sleep(delay)
+                    continue
+                logger.error(f"Erro de comunicação com a API da Planet: {e}")
+                raise APIError(f"Erro de comunicação com a API da Planet: {e}")
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Erro de comunicação com a API da Planet: {e}")
+                raise APIError(f"Erro de comunicação com a API da Planet: {e}")
+
+            if response.status_code in retryable:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if response.status_code == 429:
+                    self.rate_limiter.on_throttle(endpoint, retry_after)
+                if attempt < self.max_retries:
+                    delay = backoff_delay(attempt, retry_after)
+                    logger.warning(f"Planet respondeu {response.status_code} em '{endpoint}'. "
+                                   f"Nova tentativa {attempt + 1}/{self.max_retries} em {delay:.1f}s.")
+                    response.close()
+                    time.sleep(delay)
+                    continue
+                if response.status_code == 429:
+                    raise RateLimitError("Limite de requisições da API da Planet atingido.",
+                                         status_code=429, retry_after=retry_after)
+            else:
+                self.rate_limiter.on_success(endpoint)
+
             if response.status_code == 403:
                 raise QuotaError("Cota da API da Planet excedida ou permissão negada.", status_code=403)
-            if response.status_code == 429:
-                raise RateLimitError("Limite de requisições da API da Planet atingido.", status_code=429)
-            
-            response.raise_for_status()
-            
-            # Algumas respostas (como download) podem não ter corpo JSON
-            if response.content:
-                try:
-                    logger.debug(f"Resposta JSON recebida. Status: {response.status_code}")
-                    return response
-                except ValueError:
-                    logger.warning(f"Resposta não era JSON válido. Status: {response.status_code}")
-                    return response # Retorna a resposta original
-            return response
 
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"Erro HTTP na API da Planet: {e.response.text}")
-            raise APIError(f"Erro na API da Planet: {e.response.text}", status_code=e.response.status_code)
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro de comunicação com a API da Planet: {e}")
-            raise APIError(f"Erro de comunicação com a API da Planet: {e}")
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                logger.error(f"Erro HTTP na API da Planet: {e.response.text}")
+                raise APIError(f"Erro na API da Planet: {e.response.text}", status_code=e.response.status_code)
+
+            logger.debug(f"Resposta recebida da Planet. Status: {response.status_code}")
+            return response
 
     def get_item_types(self):
         """Busca os tipos de item disponíveis na API de dados."""
@@ -85,31 +119,52 @@ class PlanetAPIClient:
             logger.error(f"Erro ao buscar item types: {e}")
             raise APIError(f"Erro ao buscar os tipos de item da Planet: {e}")
 
-    def search_items(self, search_payload):
-        """Realiza uma busca paginada por itens na Planet API."""
-        all_features = []
+    def iter_search_pages(self, search_payload):
+        """
+        Percorre a paginação da quick-search sob demanda, produzindo a lista de
+        features de cada página assim que ela chega. A próxima página só é
+        requisitada quando o consumidor pede mais itens.
+        """
         search_url = f"{self.base_url}/data/v1/quick-search"
         current_payload = search_payload
 
         while search_url:
             try:
-                res = self.session.post(search_url, json=current_payload)
-                res.raise_for_status()
+                if current_payload is not None:
+                    res = self._request('POST', search_url, json=current_payload)
+                else:
+                    # Os links '_next' apontam para a busca já criada e são lidos via GET
+                    res = self._request('GET', search_url)
                 page = res.json()
-                
-                if 'features' in page and page['features']:
-                    all_features.extend(page['features'])
-                
-                search_url = page.get('_links', {}).get('_next')
-                current_payload = None 
-
-            except requests.exceptions.RequestException as e:
-                raise APIError(f"Erro de conexão com a API da Planet: {e}")
+            except APIError:
+                raise
+            except ValueError as e:
+                raise APIError(f"Resposta inválida da busca de itens da Planet: {e}")
             except Exception as e:
                 raise APIError(f"Erro inesperado durante a busca de itens: {e}")
-        
-        return all_features
+
+            features = page.get('features') or []
+            if features:
+                yield features
+
+            search_url = page.get('_links', {}).get('_next')
+            current_payload = None
+
+    def iter_search_items(self, search_payload):
+        """Gerador de features da busca, página por página, sem acumular o resultado."""
+        for features in self.iter_search_pages(search_payload):
+            yield from features
+
+    def search_items(self, search_payload):
+        """Realiza uma busca paginada por itens na Planet API e retorna todas as features."""
+        return list(self.iter_search_items(search_payload))
     
+    def get_stats(self, stats_payload):
+        """Consulta a Stats API (contagem de itens por intervalo de tempo)."""
+        url = f"{self.base_url}/data/v1/stats"
+        response = self._request('POST', url, json=stats_payload)
+        return response.json()
+
     def get_series(self):
         """Busca todas as séries de basemaps disponíveis."""
         url = f"{self.base_url}/basemaps/v1/series"
@@ -119,12 +174,18 @@ class PlanetAPIClient:
         return response.json()
 
     def get_mosaics_for_series(self, series_id):
-        """Busca todos os mosaicos para uma determinada série de basemap."""
+        """Busca todos os mosaicos para uma determinada série de basemap, percorrendo todas as páginas."""
         url = f"{self.base_url}/basemaps/v1/series/{series_id}/mosaics"
         params = {'api_key': self.api_key}
-        logger.debug(f"Fazendo requisição GET para {url} com params: {params}")
-        response = self._request('GET', url, params=params)
-        return response.json()
+        mosaics = []
+        while url:
+            logger.debug(f"Fazendo requisição GET para {url}")
+            page = self._request('GET', url, params=params).json()
+            mosaics.extend(page.get('mosaics', []))
+            # O link '_next' já traz os parâmetros da consulta
+            url = page.get('_links', {}).get('_next')
+            params = None
+        return {'mosaics': mosaics}
     
     def get_quads_for_mosaic(self, mosaic_id, geometry):
         """Busca quads em um mosaico de forma assíncrona, lidando com paginação."""
@@ -133,7 +194,7 @@ class PlanetAPIClient:
         
         logger.info("Iniciando busca de quads assíncrona (Etapa 1: POST)")
         # A geometria deve ser enviada como JSON no corpo da requisição
-        response = self.session.post(search_url, params=params, json=geometry, allow_redirects=False)
+        response = self._request('POST', search_url, params=params, json=geometry, allow_redirects=False)
 
         if response.status_code != 302:
             raise APIError(f"Esperava-se um redirecionamento (302), mas o status foi {response.status_code}. Resposta: {response.text}", response.status_code)
@@ -144,16 +205,13 @@ class PlanetAPIClient:
         items = []
         page_url = redirect_url
 
+        # O resultado da busca pode ainda não estar disponível logo após o POST:
+        # só a primeira página (o destino do redirecionamento) repete o 404
+        retry_status = (404,)
         while page_url:
-            for _ in range(3): # Tenta algumas vezes antes de desistir
-                page_response = self._request('GET', page_url)
-                if page_response.status_code == 200:
-                    break
-                logger.warning(f"Recebido status {page_response.status_code} para a URL de quads. Tentando novamente em 2 segundos...")
-                time.sleep(2)
-            else:
-                raise APIError(f"Não foi possível obter os resultados dos quads da URL: {page_url}", 500)
-            
+            page_response = self._request('GET', page_url, retry_status=retry_status)
+            retry_status = ()
+
             def add_api_key_to_url(url, key):
                 parsed_url = urlparse(url)
                 query_params = parse_qs(parsed_url.query)
@@ -199,6 +257,18 @@ class PlanetAPIClient:
             logger.error(f"Falha ao baixar thumbnail do quad {quad_id}.")
             raise
 
+    def download(self, url, stream=True, **kwargs):
+        """
+        Baixa um arquivo (GeoTIFF de quad ou asset ativado) pela mesma sessão,
+        reaproveitando as conexões do pool e com timeout de leitura próprio para downloads.
+        """
+        kwargs.setdefault('timeout', self.download_timeout)
+        return self._request('GET', url, stream=stream, **kwargs)
+
+    def download_asset(self, download_url):
+        """Inicia o download em streaming de um asset ativado."""
+        return self.download(download_url)
+
     def get_quad_details(self, mosaic_id, quad_id):
         """Busca os detalhes completos de um quad."""
         url = f"{self.base_url}/basemaps/v1/mosaics/{mosaic_id}/quads/{quad_id}"
@@ -206,6 +276,29 @@ class PlanetAPIClient:
         response = self._request('GET', url)
         return response.json()
 
+    def get_item_details(self, item_type, item_id):
+        """Busca os metadados de um item da Data API."""
+        url = f"{self.base_url}/data/v1/item-types/{item_type}/items/{item_id}"
+        response = self._request('GET', url)
+        return response.json()
+
+    def get_item_assets(self, item_type, item_id):
+        """Lista os assets de um item, com status de ativação e links."""
+        url = f"{self.base_url}/data/v1/item-types/{item_type}/items/{item_id}/assets"
+        response = self._request('GET', url)
+        return response.json()
+
+    def activate_asset(self, item_type, item_id, asset_type):
+        """Solicita a ativação de um asset usando o link 'activate' informado pela Planet."""
+        assets = self.get_item_assets(item_type, item_id)
+        if asset_type not in assets:
+            raise APIError(f"Tipo de asset {asset_type} não disponível", status_code=404)
+        activate_url = assets[asset_type].get('_links', {}).get('activate')
+        if not activate_url:
+            raise APIError(f"Asset {asset_type} não possui link de ativação", status_code=400)
+        response = self._request('POST', activate_url)
+        return {'status_code': response.status_code}
+
 def build_search_payload(search_data):
     """Constrói o payload para a API de busca da Planet a partir de dados de formulário."""
     
@@ -249,13 +342,31 @@ def build_search_payload(search_data):
     return search_payload
 
 # --- Gerenciamento de Instância Global ---
+_planet_client = None
+_planet_client_lock = threading.Lock()
+
 def get_planet_client():
     """
-    Obtém uma instância do cliente da API Planet, criando uma se não existir no contexto da requisição.
+    Obtém o cliente da API Planet do processo. Uma única instância (e um único
+    pool de conexões) é compartilhada por todas as requisições e threads do
+    worker, para que as conexões keep-alive com a Planet sejam reaproveitadas.
     """
-    if 'planet_client' not in g:
-        api_key = os.getenv('PLANET_API_KEY')
-        if not api_key:
-            raise ValueError("A chave da API da Planet não foi configurada na variável de ambiente PLANET_API_KEY.")
-        g.planet_client = PlanetAPIClient(api_key=api_key)
-    return g.planet_client 
\ No newline at end of file
+    global _planet_client
+    if _planet_client is None:
+        with _planet_client_lock:
+            if _planet_client is None:
+                api_key = os.getenv('PLANET_API_KEY')
+                if not api_key:
+                    raise ValueError("A chave da API da Planet não foi configurada na variável de ambiente PLANET_API_KEY.")
+                config = current_app.config
+                _planet_client = PlanetAPIClient(
+                    api_key=api_key,
+                    pool_connections=config.get('PLANET_HTTP_POOL_CONNECTIONS', 10),
+                    pool_maxsize=config.get('PLANET_HTTP_POOL_MAXSIZE', 32),
+                    connect_timeout=config.get('PLANET_CONNECT_TIMEOUT', 5),
+                    read_timeout=config.get('PLANET_READ_TIMEOUT', 60),
+                    download_read_timeout=config.get('PLANET_DOWNLOAD_READ_TIMEOUT', 120),
+                    rate_limiter=AdaptiveRateLimiter(config.get('PLANET_RATE_LIMITS')),
+                    max_retries=config.get('PLANET_MAX_RETRIES', 4),
+                )
+    return _planet_client
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+import aiohttp
+
+from src.utils.errors import APIError, QuotaError, RateLimitError
+from src.utils.planet_api import RETRYABLE_STATUS
+from src.utils.rate_limit import AdaptiveRateLimiter, parse_retry_after, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+
+def _add_api_key_to_url(url, key):
+    parsed_url = urlparse(url)
+    query_params = parse_qs(parsed_url.query)
+    if 'api_key' not in query_params:
+        query_params['api_key'] = [key]
+        parsed_url = parsed_url._replace(query=urlencode(query_params, doseq=True))
+    return urlunparse(parsed_url)
+
+
+class AsyncPlanetAPIClient:
+    """
+    Variante asyncio do PlanetAPIClient, com a mesma superfície de métodos.
+    Pensada para fluxos com muitas chamadas pequenas (detalhes de vários quads,
+    status de vários assets): no máximo `max_concurrency` requisições ficam em
+    voo ao mesmo tempo, e todas passam pelo mesmo limitador de taxa do cliente
+    síncrono do processo.
+
+    Uso:
+        async with AsyncPlanetAPIClient.from_client(get_planet_client()) as client:
+            details = await client.gather_quad_details(mosaic_id, quad_ids)
+    """
+
+    def __init__(self, api_key, max_concurrency=16, rate_limiter=None, max_retries=4,
+                 connect_timeout=5, read_timeout=60):
+        if not api_key:
+            raise ValueError("A chave da API da Planet (PLANET_API_KEY) não foi configurada.")
+        self.api_key = api_key
+        self.base_url = "https://api.planet.com"
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self._semaphore = None
+        self.session = None
+
+    @classmethod
+    def from_client(cls, client, max_concurrency=16):
+        """Cria um cliente assíncrono com a mesma chave, timeouts e limitador do cliente síncrono."""
+        connect_timeout, read_timeout = client.timeout
+        return cls(
+            client.api_key,
+            max_concurrency=max_concurrency,
+            rate_limiter=client.rate_limiter,
+            max_retries=client.max_retries,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+        )
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.session = aiohttp.ClientSession(
+            auth=aiohttp.BasicAuth(self.api_key, ''),
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            timeout=self.timeout,
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        self.session = None
+
+    async def _request(self, method, url, endpoint=None, allow_redirects=True, retry_status=(), **kwargs):
+        """
+        Equivalente assíncrono de PlanetAPIClient._request, com as mesmas novas
+        tentativas (429/5xx e `retry_status`, backoff e Retry-After). Retorna uma
+        tupla (status, headers, json) já lida, para que a conexão volte logo ao pool.
+        """
+        endpoint = endpoint or self.rate_limiter.classify(url)
+        retryable = RETRYABLE_STATUS.union(retry_status)
+
+        for attempt in range(self.max_retries + 1):
+            delay = self.rate_limiter.reserve(endpoint)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                async with self._semaphore:
+                    async with self.session.request(method, url, allow_redirects=allow_redirects, **kwargs) as response:
+                        status = response.status
+                        headers = response.headers
+                        body = await response.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt < self.max_retries:
+                    delay = backoff_delay(attempt)
+                    logger.warning(f"Falha de comunicação com a Planet ({e}). Nova tentativa em {delay:.1f}s.")
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error(f"Erro de comunicação com a API da Planet: {e}")
+                raise APIError(f"Erro de comunicação com a API da Planet: {e}")
+
+            if status in retryable:
+                retry_after = parse_retry_after(headers.get('Retry-After'))
+                if status == 429:
+                    self.rate_limiter.on_throttle(endpoint, retry_after)
+                if attempt < self.max_retries:
+                    delay = backoff_delay(attempt, retry_after)
+                    logger.warning(f"Planet respondeu {status} em '{endpoint}'. "
+                                   f"Nova tentativa {attempt + 1}/{self.max_retries} em {delay:.1f}s.")
+                    await asyncio.sleep(delay)
+                    continue
+                if status == 429:
+                    raise RateLimitError("Limite de requisições da API da Planet atingido.",
+                                         status_code=429, retry_after=retry_after)
+            else:
+                self.rate_limiter.on_success(endpoint)
+
+            if status == 403:
+                raise QuotaError("Cota da API da Planet excedida ou permissão negada.", status_code=403)
+            if status >= 400:
+                text = body.decode('utf-8', errors='replace')
+                logger.error(f"Erro HTTP na API da Planet: {text}")
+                raise APIError(f"Erro na API da Planet: {text}", status_code=status)
+
+            data = None
+            if body and 'json' in headers.get('Content-Type', ''):
+                data = json.loads(body)
+            return status, headers, data
+
+    async def _get_json(self, url, **kwargs):
+        _, _, data = await self._request('GET', url, **kwargs)
+        return data
+
+    # --- Data API ---
+
+    async def get_item_types(self):
+        data = await self._get_json(f"{self.base_url}/data/v1/item-types")
+        return data.get('item_types', [])
+
+    async def iter_search_pages(self, search_payload):
+        """Gerador assíncrono com a lista de features de cada página da quick-search."""
+        _, _, page = await self._request('POST', f"{self.base_url}/data/v1/quick-search", json=search_payload)
+        while page:
+            features = page.get('features') or []
+            if features:
+                yield features
+            next_url = page.get('_links', {}).get('_next')
+            page = await self._get_json(next_url) if next_url else None
+
+    async def search_items(self, search_payload):
+        features = []
+        async for page in self.iter_search_pages(search_payload):
+            features.extend(page)
+        return features
+
+    async def get_stats(self, stats_payload):
+        _, _, data = await self._request('POST', f"{self.base_url}/data/v1/stats", json=stats_payload)
+        return data
+
+    async def get_item_details(self, item_type, item_id):
+        return await self._get_json(f"{self.base_url}/data/v1/item-types/{item_type}/items/{item_id}")
+
+    async def get_item_assets(self, item_type, item_id):
+        return await self._get_json(f"{self.base_url}/data/v1/item-types/{item_type}/items/{item_id}/assets")
+
+    async def activate_asset(self, item_type, item_id, asset_type):
+        assets = await self.get_item_assets(item_type, item_id)
+        if asset_type not in assets:
+            raise APIError(f"Tipo de asset {asset_type} não disponível", status_code=404)
+        activate_url = assets[asset_type].get('_links', {}).get('activate')
+        if not activate_url:
+            raise APIError(f"Asset {asset_type} não possui link de ativação", status_code=400)
+        status, _, _ = await self._request('POST', activate_url)
+        return {'status_code': status}
+
+    # --- Basemaps API ---
+
+    async def get_series(self):
+        return await self._get_json(f"{self.base_url}/basemaps/v1/series", params={'api_key': self.api_key})
+
+    async def get_mosaics_for_series(self, series_id):
+        """Todos os mosaicos da série, percorrendo as páginas (`_links._next`) como o cliente síncrono."""
+        mosaics = []
+        page_url = f"{self.base_url}/basemaps/v1/series/{series_id}/mosaics"
+        params = {'api_key': self.api_key}
+        while page_url:
+            page_data = await self._get_json(page_url, params=params) or {}
+            mosaics.extend(page_data.get('mosaics', []))
+            # O link '_next' já traz os parâmetros da consulta
+            next_link = page_data.get('_links', {}).get('_next')
+            page_url = _add_api_key_to_url(next_link, self.api_key) if next_link else None
+            params = None
+        return {'mosaics': mosaics}
+
+    async def get_quads_for_mosaic(self, mosaic_id, geometry):
+        """Mesmo fluxo POST → 302 → GET paginado do cliente síncrono."""
+        search_url = f"{self.base_url}/basemaps/v1/mosaics/{mosaic_id}/quads/search"
+        status, headers, _ = await self._request('POST', search_url, params={'api_key': self.api_key},
+                                                 json=geometry, allow_redirects=False)
+        if status != 302:
+            raise APIError(f"Esperava-se um redirecionamento (302), mas o status foi {status}.", status)
+
+        items = []
+        page_url = headers['Location']
+        # Como no cliente síncrono, só o destino do redirecionamento repete o 404
+        retry_status = (404,)
+        while page_url:
+            page_data = await self._get_json(page_url, retry_status=retry_status) or {}
+            retry_status = ()
+            items.extend(page_data.get('items', []))
+            next_link = page_data.get('_links', {}).get('_next')
+            page_url = _add_api_key_to_url(next_link, self.api_key) if next_link else None
+        return items
+
+    async def get_quad_details(self, mosaic_id, quad_id):
+        return await self._get_json(f"{self.base_url}/basemaps/v1/mosaics/{mosaic_id}/quads/{quad_id}")
+
+    # --- Fan-out ---
+
+    async def gather_quad_details(self, mosaic_id, quad_ids):
+        """Detalhes de vários quads em paralelo; falhas individuais viram a exceção correspondente na lista."""
+        return await asyncio.gather(
+            *(self.get_quad_details(mosaic_id, quad_id) for quad_id in quad_ids), return_exceptions=True
+        )
+
+    async def gather_item_assets(self, items):
+        """Assets de vários itens `(item_type, item_id)` em paralelo."""
+        return await asyncio.gather(
+            *(self.get_item_assets(item_type, item_id) for item_type, item_id in items), return_exceptions=True
+        )
+
+
+def run_async(coroutine):
+    """Executa uma corrotina a partir de uma view síncrona do Flask (sem loop ativo na thread)."""
+    return asyncio.run(coroutine)
@@ -0,0 +1,295 @@
+import heapq
+import itertools
+import logging
+import math
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+from flask import current_app
+from shapely.geometry import shape
+
+from src.utils.encoding import ImageEncoding, DEFAULT_QUALITY
+from src.utils.errors import ServiceUnavailableError
+from src.utils.previews import preview_cache_key, render_preview
+from src.utils.preview_cache import get_preview_cache
+from src.utils.render_pool import get_render_pool
+from src.utils.single_flight import get_single_flight
+from src.utils.source_store import get_source_store
+
+logger = logging.getLogger(__name__)
+
+BATCH_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+# Marcadores de cancelamento mais antigos que isso são removidos
+CANCEL_MARKER_TTL = 3600
+
+
+def quad_distance(quad, center):
+    """Distância aproximada (graus, com correção da longitude pela latitude) do centro do quad a `center`."""
+    bbox = quad.get('bbox')
+    if not bbox or len(bbox) < 4:
+        return math.inf
+    lon = (bbox[0] + bbox[2]) / 2
+    lat = (bbox[1] + bbox[3]) / 2
+    return math.hypot((lon - center[0]) * math.cos(math.radians(center[1])), lat - center[1])
+
+
+class PreviewPrefetcher:
+    """
+    Aquece o cache de prévias logo após uma busca de quads: as prévias dos quads
+    retornados são renderizadas em segundo plano, do centro da AOI para as
+    bordas, para que os overlays pedidos em seguida pelo mapa já estejam prontos.
+
+    Cada chamada de `submit` forma um lote com id próprio, que pode ser
+    cancelado (ex.: o usuário fez outra busca). O cancelamento também é gravado
+    como um arquivo marcador em `cancel_dir`, visível para todos os workers:
+    o DELETE pode chegar a um worker diferente do que enfileirou o lote. Um
+    quad já em cache ou já na fila não é enfileirado de novo. As renderizações
+    usam o mesmo pool das requisições; quando ele está cheio, o trabalho volta
+    para a fila só depois de `retry_delay` segundos, deixando a vez para as
+    requisições interativas sem bloquear a thread.
+    """
+
+    def __init__(self, workers, max_pending, retry_delay=1.0, max_attempts=3, cancel_dir=None):
+        self.max_pending = max_pending
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.cancel_dir = cancel_dir
+        self._queue = queue.PriorityQueue()
+        self._delayed = []  # heap de (não antes de, sequência, prioridade, trabalho)
+        self._sequence = itertools.count()
+        self._pending = {}  # chave de cache -> id do lote que a enfileirou
+        self._batches = {}  # id do lote -> chaves ainda não processadas
+        self._lock = threading.Lock()
+        self._counters = {'queued': 0, 'rendered': 0, 'skipped': 0, 'cancelled': 0, 'failed': 0, 'deferred': 0}
+        if self.cancel_dir:
+            os.makedirs(self.cancel_dir, exist_ok=True)
+        for index in range(workers):
+            threading.Thread(target=self._worker, name=f'preview-prefetch-{index}', daemon=True).start()
+
+    def submit(self, client, mosaic_id, quads, center, max_size, encoding, preview_cache, render_pool,
+               single_flight, source_store=None):
+        """
+        Enfileira as prévias de `quads` ordenadas pela distância a `center`
+        (lon, lat). Retorna (id do lote, quantidade enfileirada).
+        """
+        batch_id = uuid.uuid4().hex
+        queued = 0
+        with self._lock:
+            keys = set()
+            for quad in sorted(quads, key=lambda quad: quad_distance(quad, center)):
+                if len(self._pending) >= self.max_pending:
+                    break
+                key = preview_cache_key(mosaic_id, quad['id'], max_size, encoding)
+                if key in self._pending or key in preview_cache:
+                    self._counters['skipped'] += 1
+                    continue
+                job = {
+                    'batch_id': batch_id,
+                    'key': key,
+                    'client': client,
+                    'mosaic_id': mosaic_id,
+                    'quad_id': quad['id'],
+                    'download_url': quad.get('_links', {}).get('download'),
+                    'max_size': max_size,
+                    'encoding': encoding,
+                    'preview_cache': preview_cache,
+                    'render_pool': render_pool,
+                    'single_flight': single_flight,
+                    'source_store': source_store,
+                    'attempt': 1,
+                }
+                self._pending[key] = batch_id
+                keys.add(key)
+                self._queue.put((len(keys), next(self._sequence), job))
+                queued += 1
+            if keys:
+                self._batches[batch_id] = keys
+            self._counters['queued'] += queued
+        if queued:
+            logger.info(f"Pré-carregamento {batch_id}: {queued} prévias do mosaico {mosaic_id} enfileiradas.")
+        return batch_id, queued
+
+    def cancel(self, batch_id):
+        """
+        Cancela o lote em todos os workers e descarta as prévias dele que ainda
+        não começaram neste. Retorna quantas foram descartadas neste worker.
+        """
+        if not BATCH_ID_PATTERN.fullmatch(batch_id):
+            return 0
+        self._mark_cancelled(batch_id)
+        return self._drop(batch_id)
+
+    def _drop(self, batch_id):
+        with self._lock:
+            keys = self._batches.pop(batch_id, set())
+            for key in keys:
+                if self._pending.get(key) == batch_id:
+                    del self._pending[key]
+            self._counters['cancelled'] += len(keys)
+        if keys:
+            logger.info(f"Pré-carregamento {batch_id} cancelado ({len(keys)} prévias descartadas).")
+        return len(keys)
+
+    def _marker_path(self, batch_id):
+        return os.path.join(self.cancel_dir, batch_id)
+
+    def _mark_cancelled(self, batch_id):
+        if not self.cancel_dir:
+            return
+        try:
+            with open(self._marker_path(batch_id), 'w'):
+                pass
+            self._remove_old_markers()
+        except OSError as e:
+            logger.warning(f"Não foi possível registrar o cancelamento do pré-carregamento {batch_id}: {e}")
+
+    def _remove_old_markers(self):
+        cutoff = time.time() - CANCEL_MARKER_TTL
+        with os.scandir(self.cancel_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def _is_cancelled(self, batch_id):
+        return bool(self.cancel_dir) and os.path.exists(self._marker_path(batch_id))
+
+    def _take(self, job):
+        """Marca o trabalho como em execução; False se o lote foi cancelado (neste ou em outro worker)."""
+        if self._is_cancelled(job['batch_id']):
+            self._drop(job['batch_id'])
+            return False
+        with self._lock:
+            return job['key'] in self._batches.get(job['batch_id'], ())
+
+    def _finish(self, job):
+        with self._lock:
+            keys = self._batches.get(job['batch_id'])
+            if keys is not None:
+                keys.discard(job['key'])
+                if not keys:
+                    del self._batches[job['batch_id']]
+            if self._pending.get(job['key']) == job['batch_id']:
+                del self._pending[job['key']]
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _defer(self, priority, job):
+        """Devolve o trabalho à fila depois de `retry_delay` segundos, sem ocupar a thread."""
+        with self._lock:
+            heapq.heappush(self._delayed, (time.monotonic() + self.retry_delay, next(self._sequence), priority, job))
+            self._counters['deferred'] += 1
+
+    def _release_delayed(self):
+        """Move para a fila os trabalhos adiados cujo prazo já passou; retorna a espera até o próximo (ou None)."""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, priority, job = heapq.heappop(self._delayed)
+                ready.append((priority, job))
+            next_delay = self._delayed[0][0] - now if self._delayed else None
+        for priority, job in ready:
+            self._queue.put((priority, next(self._sequence), job))
+        return next_delay
+
+    def _worker(self):
+        while True:
+            try:
+                priority, _, job = self._queue.get(timeout=self._release_delayed())
+            except queue.Empty:
+                continue
+            try:
+                if self._take(job):
+                    self._run(priority, job)
+            except Exception as e:
+                logger.error(f"Erro inesperado no pré-carregamento do quad {job['quad_id']}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, priority, job):
+        preview_cache = job['preview_cache']
+        if job['key'] in preview_cache:
+            self._count('skipped')
+            self._finish(job)
+            return
+
+        def produce():
+            image_bytes = render_preview(
+                job['client'], job['mosaic_id'], job['quad_id'], job['max_size'], job['encoding'],
+                job['render_pool'], job['source_store'], job['download_url'], record_demand=False,
+            )
+            preview_cache.set(job['key'], image_bytes)
+            return image_bytes
+
+        try:
+            # Mesma coalescência da rota: se o mapa pedir a prévia agora, espera esta renderização
+            job['single_flight'].do(job['key'], produce, recheck=lambda: preview_cache.get(job['key']))
+        except ServiceUnavailableError:
+            # Pool cheio com requisições interativas: volta para a fila na mesma posição depois de `retry_delay`
+            if job['attempt'] < self.max_attempts:
+                job['attempt'] += 1
+                self._defer(priority, job)
+                return
+            self._count('failed')
+        except Exception as e:
+            logger.warning(f"Falha no pré-carregamento da prévia do quad {job['quad_id']}: {e}")
+            self._count('failed')
+        else:
+            self._count('rendered')
+        self._finish(job)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'pending': len(self._pending),
+                'batches': len(self._batches),
+                'delayed': len(self._delayed),
+            }
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """Retorna o pré-carregador de prévias do processo."""
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                config = current_app.config
+                _prefetcher = PreviewPrefetcher(
+                    workers=config['PREFETCH_WORKERS'],
+                    max_pending=config['PREFETCH_MAX_PENDING'],
+                    retry_delay=config['RENDER_RETRY_AFTER'],
+                    cancel_dir=config['PREFETCH_CANCEL_DIR'],
+                )
+    return _prefetcher
+
+
+def prefetch_quad_previews(client, mosaic_id, quads, geometry):
+    """
+    Enfileira as prévias dos quads de uma busca no tamanho e codificação que o
+    mapa pede por padrão (PREVIEW_MAX_SIZE, PREFETCH_FORMAT). Retorna
+    (id do lote, quantidade enfileirada).
+    """
+    config = current_app.config
+    image_format = config['PREFETCH_FORMAT']
+    # O mapa não envia `format`: a codificação vem do Accept, então o padrão
+    # deve coincidir com a negociada para os navegadores (WebP)
+    encoding = ImageEncoding(image_format, DEFAULT_QUALITY.get(image_format), True)
+    centroid = shape(geometry).centroid
+    return get_prefetcher().submit(
+        client, mosaic_id, quads, (centroid.x, centroid.y), config['PREVIEW_MAX_SIZE'], encoding,
+        get_preview_cache(), get_render_pool(), get_single_flight(), get_source_store(),
+    )
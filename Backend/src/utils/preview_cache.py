@@ -0,0 +1,122 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+from src.utils.disk_store import DiskStore
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryLRU:
+    """LRU em memória limitado pelo total de bytes dos valores."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+
+class TieredCache:
+    """
+    Cache em dois níveis: LRU pequeno em memória (por processo) na frente de um
+    `DiskStore` compartilhado por todos os workers e que sobrevive a reinícios.
+    Um acerto no disco é promovido para a memória.
+    """
+
+    def __init__(self, memory, disk):
+        self.memory = memory
+        self.disk = disk
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count('memory_hits')
+            return value
+        value = self.disk.get(key)
+        if value is not None:
+            self._count('disk_hits')
+            self.memory.set(key, value)
+            return value
+        self._count('misses')
+        return None
+
+    def set(self, key, value):
+        self.disk.set(key, value)
+        self.memory.set(key, value)
+
+    def __contains__(self, key):
+        """Verifica a presença sem contar acerto/falta nem alterar a ordem do LRU."""
+        return key in self.memory or key in self.disk
+
+    def stats(self):
+        """Contadores deste processo e ocupação atual dos dois níveis."""
+        with self._lock:
+            counters = dict(self._counters)
+        files, disk_bytes = self.disk.usage()
+        return {
+            **counters,
+            'memory_evictions': self.memory.evictions,
+            'disk_evictions': self.disk.evictions,
+            'memory_items': len(self.memory),
+            'memory_bytes': self.memory.size,
+            'memory_max_bytes': self.memory.max_bytes,
+            'disk_items': files,
+            'disk_bytes': disk_bytes,
+            'disk_max_bytes': self.disk.max_bytes,
+        }
+
+
+_preview_cache = None
+_preview_cache_lock = threading.Lock()
+
+
+def get_preview_cache():
+    """Retorna o cache de prévias renderizadas do processo."""
+    global _preview_cache
+    if _preview_cache is None:
+        with _preview_cache_lock:
+            if _preview_cache is None:
+                config = current_app.config
+                _preview_cache = TieredCache(
+                    MemoryLRU(config['PREVIEW_MEMORY_CACHE_MAX_BYTES']),
+                    DiskStore(config['PREVIEW_CACHE_DIR'], config['PREVIEW_CACHE_MAX_BYTES']),
+                )
+    return _preview_cache
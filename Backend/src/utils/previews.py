@@ -0,0 +1,73 @@
+import logging
+import os
+import tempfile
+
+from rasterio.errors import RasterioIOError
+
+from src.utils.errors import NotFoundError
+from src.utils.raster import render_quad_preview
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def preview_cache_key(mosaic_id, quad_id, max_size, encoding):
+    return f"quad_preview_{mosaic_id}_{quad_id}_{max_size}_{encoding.cache_suffix}"
+
+
+def render_preview(client, mosaic_id, quad_id, max_size, encoding, render_pool, source_store=None, download_url=None,
+                   record_demand=True):
+    """
+    Renderiza a prévia do quad no pool de renderização. Com o quad já em disco
+    como COG não há chamada à Planet; senão lê só a overview necessária por HTTP
+    range (/vsicurl/) e registra a demanda pelo quad, que é guardado completo
+    em segundo plano quando volta a ser pedido. `download_url` evita buscar os
+    detalhes do quad quando o link já é conhecido (ex.: vindo da busca de
+    quads); `record_demand=False` (pré-carregamento) não conta como demanda.
+    """
+    local_path = source_store.get_path(mosaic_id, quad_id) if source_store else None
+    if local_path:
+        return render_pool.run(render_quad_preview, local_path, max_size, None, encoding.format, encoding.quality)
+
+    if not download_url:
+        quad_info = client.get_quad_details(mosaic_id, quad_id)
+        download_url = quad_info.get('_links', {}).get('download')
+    if not download_url:
+        raise NotFoundError('Link para download não encontrado.')
+
+    client.rate_limiter.acquire('downloads')
+    try:
+        image_bytes = render_pool.run(
+            render_quad_preview, download_url, max_size, client.api_key, encoding.format, encoding.quality
+        )
+    except RasterioIOError as e:
+        logger.warning(f"Leitura por intervalos do quad {quad_id} falhou ({e}); baixando o GeoTIFF completo.")
+        return _render_downloaded(client, mosaic_id, quad_id, max_size, encoding, render_pool, source_store, download_url)
+    if source_store and record_demand:
+        source_store.fetch_in_background(client, mosaic_id, quad_id, download_url)
+    return image_bytes
+
+
+def _render_downloaded(client, mosaic_id, quad_id, max_size, encoding, render_pool, source_store, download_url):
+    """
+    Baixa o quad inteiro pelo cliente da Planet (limitador de taxa, novas
+    tentativas e pool de conexões) e renderiza a prévia a partir do disco. Com
+    o cache de quads ativo, o download já fica guardado para as próximas prévias.
+    """
+    if source_store:
+        local_path = source_store.get_or_fetch(client, mosaic_id, quad_id, download_url)
+        return render_pool.run(render_quad_preview, local_path, max_size, None, encoding.format, encoding.quality)
+
+    fd, download_path = tempfile.mkstemp(prefix='quad-', suffix='.tif')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            response = client.download(download_url)
+            try:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+            finally:
+                response.close()
+        return render_pool.run(render_quad_preview, download_path, max_size, None, encoding.format, encoding.quality)
+    finally:
+        os.remove(download_path)
@@ -0,0 +1,66 @@
+from src.utils.errors import ValidationError
+
+# Campos que ficam no nível da feature; os demais nomes são procurados em `properties`
+TOP_LEVEL_FIELDS = {'id', 'geometry'}
+
+# Atalhos para links usados pela interface
+LINK_FIELDS = {'thumbnail': 'thumbnail'}
+
+MAX_FIELDS = 50
+
+
+def parse_fields(value):
+    """Converte `fields=id,acquired,cloud_cover` numa lista de nomes (None se ausente)."""
+    if value is None:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    if not fields:
+        raise ValidationError("fields deve conter ao menos um campo")
+    if len(fields) > MAX_FIELDS:
+        raise ValidationError(f"fields aceita no máximo {MAX_FIELDS} campos")
+    return fields
+
+
+def make_projector(fields=None, footprint_only=False):
+    """
+    Retorna uma função que reduz cada feature aos campos pedidos, ou None se
+    nenhuma projeção foi solicitada. `footprint_only` mantém só id e geometria
+    (e os campos de `fields`, se informados). O resultado continua sendo uma
+    Feature GeoJSON válida.
+    """
+    if fields is None and not footprint_only:
+        return None
+
+    fields = list(fields or [])
+    if footprint_only:
+        fields = ['id', 'geometry'] + [name for name in fields if name not in ('id', 'geometry')]
+
+    top_level = [name for name in fields if name in TOP_LEVEL_FIELDS]
+    links = [(name, LINK_FIELDS[name]) for name in fields if name in LINK_FIELDS]
+    properties = [name for name in fields if name not in TOP_LEVEL_FIELDS and name not in LINK_FIELDS]
+
+    def project(feature):
+        projected = {'type': 'Feature'}
+        for name in top_level:
+            if name in feature:
+                projected[name] = feature[name]
+        if 'geometry' not in projected:
+            projected['geometry'] = None
+
+        source_properties = feature.get('properties') or {}
+        projected_properties = {name: source_properties[name] for name in properties if name in source_properties}
+        source_links = feature.get('_links') or {}
+        for name, link in links:
+            if link in source_links:
+                projected_properties[name] = source_links[link]
+        projected['properties'] = projected_properties
+        return projected
+
+    return project
+
+
+def project_features(features, projector):
+    """Aplica a projeção de forma preguiçosa (compatível com o streaming)."""
+    if projector is None:
+        return features
+    return (projector(feature) for feature in features)
@@ -0,0 +1,108 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+import shapely
+from shapely.geometry import shape, box
+
+from src.utils.tiles import MERCATOR_HALF_WORLD
+
+EARTH_RADIUS = 6378137.0
+MAX_MERCATOR_LAT = 85.0511287798066
+# Acima disso a AOI cobre quads demais para calcular localmente; a busca vai para a API
+MAX_CANDIDATE_QUADS = 250000
+# Diferença relativa aceita entre a resolução publicada e a de uma grade 2^n
+GRID_TOLERANCE = 0.01
+
+
+def _to_mercator(coords):
+    """Converte um array (n, 2) de lon/lat em graus para metros em EPSG:3857."""
+    lon = np.radians(coords[:, 0])
+    lat = np.radians(np.clip(coords[:, 1], -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    return np.column_stack([EARTH_RADIUS * lon, EARTH_RADIUS * np.log(np.tan(np.pi / 4 + lat / 2))])
+
+
+def _to_degrees_lon(x):
+    return np.degrees(x / EARTH_RADIUS)
+
+
+def _to_degrees_lat(y):
+    return np.degrees(np.arctan(np.sinh(y / EARTH_RADIUS)))
+
+
+def quad_links(base_url, mosaic_id, quad_id):
+    """
+    Links de um quad no formato da busca de quads da Planet. Não levam a chave
+    de API: o backend se autentica ao ler o link, e `percent_covered` (que a
+    grade não conhece) vem dos detalhes do quad quando pedidos.
+    """
+    quad_url = f"{base_url}/basemaps/v1/mosaics/{mosaic_id}/quads/{quad_id}"
+    return {'_self': quad_url, 'download': f"{quad_url}/full", 'thumbnail': f"{quad_url}/thumb"}
+
+
+class QuadGrid(namedtuple('QuadGrid', ['quads_per_side', 'bbox'])):
+    """
+    Grade fixa de quads de um mosaico em Web Mercator. Os quads de um mosaico
+    são blocos de `quad_size` pixels na resolução do seu nível, numerados
+    `x-y` a partir do canto sudoeste do mundo (coluna para leste, linha para
+    norte), então os quads de uma AOI podem ser calculados sem a API.
+    """
+
+    @classmethod
+    def from_mosaic(cls, mosaic):
+        """Grade a partir dos metadados do mosaico (índice de mosaicos), ou None se não houver dados suficientes."""
+        if mosaic.get('coordinate_system') not in (None, 'EPSG:3857'):
+            return None
+        resolution, quad_size = mosaic.get('resolution'), mosaic.get('quad_size')
+        if not resolution or not quad_size:
+            return None
+        # A resolução publicada pode vir arredondada; a grade divide o mundo em 2^n quads
+        exact = 2 * MERCATOR_HALF_WORLD / (resolution * quad_size)
+        quads_per_side = 2 ** max(round(math.log2(exact)), 0)
+        if abs(exact / quads_per_side - 1) > GRID_TOLERANCE:
+            return None
+        return cls(quads_per_side, mosaic.get('bbox'))
+
+    @property
+    def quad_extent(self):
+        return 2 * MERCATOR_HALF_WORLD / self.quads_per_side
+
+    def quads_for_geometry(self, geometry_geojson, max_candidates=MAX_CANDIDATE_QUADS):
+        """
+        Quads ({'id', 'bbox'}) que intersectam a geometria GeoJSON (WGS84),
+        limitada à extensão do mosaico. Retorna None se a AOI cobrir quads
+        demais para o cálculo local.
+        """
+        geometry = shape(geometry_geojson)
+        if self.bbox:
+            geometry = geometry.intersection(box(*self.bbox))
+        if geometry.is_empty:
+            return []
+        geometry = shapely.transform(geometry, _to_mercator)
+
+        extent = self.quad_extent
+        min_x, min_y, max_x, max_y = geometry.bounds
+        x0, y0 = (np.floor((np.array([min_x, min_y]) + MERCATOR_HALF_WORLD) / extent)).astype(int)
+        x1, y1 = (np.floor((np.array([max_x, max_y]) + MERCATOR_HALF_WORLD) / extent)).astype(int)
+        last = self.quads_per_side - 1
+        x0, x1 = max(x0, 0), min(x1, last)
+        y0, y1 = max(y0, 0), min(y1, last)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > max_candidates:
+            return None
+
+        # Todos os quads do retângulo envolvente, testados de uma vez contra a geometria exata
+        xs, ys = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1))
+        xs, ys = xs.ravel(), ys.ravel()
+        west = xs * extent - MERCATOR_HALF_WORLD
+        south = ys * extent - MERCATOR_HALF_WORLD
+        boxes = shapely.box(west, south, west + extent, south + extent)
+        shapely.prepare(geometry)
+        hits = shapely.intersects(geometry, boxes) & ~shapely.touches(geometry, boxes)
+
+        xs, ys, west, south = xs[hits], ys[hits], west[hits], south[hits]
+        lon_w, lon_e = _to_degrees_lon(west), _to_degrees_lon(west + extent)
+        lat_s, lat_n = _to_degrees_lat(south), _to_degrees_lat(south + extent)
+        return [
+            {'id': f"{x}-{y}", 'bbox': [float(w), float(s), float(e), float(n)]}
+            for x, y, w, s, e, n in zip(xs.tolist(), ys.tolist(), lon_w, lat_s, lon_e, lat_n)
+        ]
@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import shapely
+from flask import current_app
+from shapely.geometry import shape, mapping, box
+from shapely.strtree import STRtree
+
+from src.utils.geometry import count_vertices
+
+logger = logging.getLogger(__name__)
+
+# Folga (graus) aplicada à área já buscada, para que diferenças de ponto
+# flutuante entre AOIs quase iguais não gerem lascas a buscar
+COVERAGE_EPSILON = 1e-9
+# Restos menores que esta fração da AOI são ignorados
+MIN_REMAINDER_FRACTION = 1e-6
+# Acima disso a área coberta é recomeçada, para a diferença continuar barata
+MAX_COVERED_VERTICES = 5000
+
+
+class MosaicQuads:
+    """Quads já conhecidos de um mosaico e a área (união das AOIs) em que a busca foi completa."""
+
+    def __init__(self):
+        self.covered = None
+        self.quads = {}
+        self.created_at = time.time()
+        self._tree = None
+        self._tree_quads = None
+
+    def add(self, aoi, quads):
+        for quad in quads:
+            self.quads.setdefault(quad['id'], quad)
+        covered = aoi if self.covered is None else self.covered.union(aoi)
+        if count_vertices(covered) > MAX_COVERED_VERTICES:
+            covered = aoi
+        self.covered = covered
+        self._tree = None
+
+    def remainder(self, aoi):
+        """Parte da AOI fora da área já buscada (vazia se estiver toda coberta)."""
+        if self.covered is None:
+            return aoi
+        remainder = aoi.difference(self.covered.buffer(COVERAGE_EPSILON))
+        if remainder.is_empty or remainder.area <= aoi.area * MIN_REMAINDER_FRACTION:
+            return None
+        return remainder
+
+    def query(self, aoi):
+        """Quads cujas bbox intersectam a AOI, filtrados pela STRtree das bbox."""
+        if self._tree is None:
+            self._tree_quads = list(self.quads.values())
+            self._tree = STRtree([box(*quad['bbox'][:4]) for quad in self._tree_quads])
+        return [self._tree_quads[index] for index in self._tree.query(aoi, predicate='intersects')]
+
+
+class QuadSearchCache:
+    """
+    Reaproveitamento espacial de buscas de quads: para cada mosaico guarda os
+    quads retornados e a união das AOIs buscadas. Uma nova AOI dentro dessa
+    área é respondida localmente (consulta à STRtree das bbox dos quads); se
+    ela só em parte estiver coberta, apenas o resto vai para a Planet. Os
+    quads de um mosaico publicado não mudam, então `ttl` só limita a idade
+    das entradas; no máximo `max_mosaics` mosaicos ficam em memória (LRU).
+    """
+
+    def __init__(self, max_mosaics, ttl):
+        self.max_mosaics = max_mosaics
+        self.ttl = ttl
+        self._mosaics = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'local': 0, 'partial': 0, 'misses': 0}
+
+    def _entry(self, mosaic_id):
+        entry = self._mosaics.get(mosaic_id)
+        if entry is not None and time.time() - entry.created_at > self.ttl:
+            del self._mosaics[mosaic_id]
+            entry = None
+        if entry is None:
+            entry = self._mosaics[mosaic_id] = MosaicQuads()
+            while len(self._mosaics) > self.max_mosaics:
+                self._mosaics.popitem(last=False)
+        self._mosaics.move_to_end(mosaic_id)
+        return entry
+
+    def search(self, mosaic_id, geometry_geojson, fetch):
+        """
+        Quads do mosaico que intersectam a AOI. `fetch(partes)` recebe a lista
+        de polígonos GeoJSON ainda não buscados (None para a AOI inteira) e
+        retorna os quads deles.
+        """
+        aoi = shape(geometry_geojson)
+        if not aoi.is_valid:
+            aoi = shapely.make_valid(aoi)
+        with self._lock:
+            entry = self._entry(mosaic_id)
+            remainder = entry.remainder(aoi)
+            if remainder is None:
+                self._counters['local'] += 1
+                return entry.query(aoi)
+            self._counters['partial' if remainder is not aoi else 'misses'] += 1
+
+        if remainder is aoi:
+            quads = fetch(None)
+        else:
+            logger.info(f"AOI parcialmente coberta por buscas anteriores do mosaico {mosaic_id}; buscando só o restante.")
+            parts = [mapping(part) for part in shapely.get_parts(remainder) if part.geom_type == 'Polygon']
+            quads = fetch(parts) if parts else []
+
+        with self._lock:
+            entry = self._entry(mosaic_id)
+            if all(quad.get('bbox') for quad in quads):
+                entry.add(aoi, quads)
+                return entry.query(aoi)
+            # Sem bbox os quads não podem ser filtrados localmente: a área não é marcada como buscada
+            found = {quad['id']: quad for quad in entry.query(aoi)} if entry.quads else {}
+            for quad in quads:
+                found.setdefault(quad['id'], quad)
+            return list(found.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'mosaics': len(self._mosaics),
+                'quads': sum(len(entry.quads) for entry in self._mosaics.values()),
+            }
+
+
+_quad_search_cache = None
+_quad_search_cache_lock = threading.Lock()
+
+
+def get_quad_search_cache():
+    """Retorna o cache espacial de buscas de quads do processo, ou None se estiver desativado."""
+    global _quad_search_cache
+    if not current_app.config['QUAD_SEARCH_CACHE_ENABLED']:
+        return None
+    if _quad_search_cache is None:
+        with _quad_search_cache_lock:
+            if _quad_search_cache is None:
+                config = current_app.config
+                _quad_search_cache = QuadSearchCache(
+                    config['QUAD_SEARCH_CACHE_MOSAICS'], ttl=config['QUAD_SEARCH_CACHE_TTL']
+                )
+    return _quad_search_cache
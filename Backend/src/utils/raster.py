@@ -0,0 +1,395 @@
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import numpy as np
+import rasterio
+import rasterio.shutil
+import rasterio.transform
+from rasterio.enums import Resampling
+from rasterio.errors import RasterioIOError
+from rasterio.vrt import WarpedVRT
+from rasterio.features import geometry_mask
+from rasterio.warp import transform_bounds, transform_geom
+from rasterio.windows import from_bounds
+from shapely.geometry import shape
+
+from src.utils.encoding import encode_image
+
+logger = logging.getLogger(__name__)
+
+# Opções do GDAL para ler o GeoTIFF remoto por intervalos de bytes (/vsicurl/)
+VSICURL_OPTIONS = {
+    'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',  # não tenta listar o "diretório" remoto
+    'GDAL_INGESTED_BYTES_AT_OPEN': 32768,  # cabeçalho e IFDs numa única requisição
+    'GDAL_HTTP_MERGE_CONSECUTIVE_RANGES': 'YES',
+    'GDAL_HTTP_MULTIPLEX': 'YES',
+    'GDAL_HTTP_VERSION': 2,
+    'VSI_CACHE': 'TRUE',
+}
+
+RGB_BANDS = (1, 2, 3)
+
+WEB_MERCATOR_EPSG = 3857
+TILE_SIZE = 256
+# Lado da overview do quad usada para as estatísticas de cor dos tiles
+QUAD_STATS_SIZE = 256
+
+
+def preview_shape(height, width, max_size):
+    """Dimensões (altura, largura) reduzidas para que o maior lado caiba em `max_size`."""
+    scale = max(height, width) / max_size
+    if scale <= 1:
+        return height, width
+    return max(1, round(height / scale)), max(1, round(width / scale))
+
+
+def read_rgb(src, max_size):
+    """
+    Lê as bandas RGB já reduzidas para `max_size`. Com `out_shape` menor que o
+    raster, o GDAL usa a overview interna mais próxima e só decodifica os blocos
+    dela, em vez da resolução completa.
+    """
+    height, width = preview_shape(src.height, src.width, max_size)
+    return src.read(RGB_BANDS, out_shape=(len(RGB_BANDS), height, width), resampling=Resampling.average)
+
+
+def is_planet_url(url):
+    """True para URLs https de um host da Planet, os únicos que podem receber a chave da API."""
+    parsed = urlparse(url)
+    host = parsed.hostname or ''
+    return parsed.scheme == 'https' and (host == 'planet.com' or host.endswith('.planet.com'))
+
+
+@contextmanager
+def open_raster(url, api_key=None):
+    """
+    Abre um caminho local ou, via `/vsicurl/` (leitura por intervalos de bytes),
+    uma URL. A chave da API só é enviada a hosts da Planet.
+    """
+    if not url.startswith(('http://', 'https://')):
+        with rasterio.open(url) as src:
+            yield src
+        return
+
+    options = dict(VSICURL_OPTIONS)
+    if api_key and is_planet_url(url):
+        options.update(GDAL_HTTP_AUTH='BASIC', GDAL_HTTP_USERPWD=f'{api_key}:')
+    with rasterio.Env(**options):
+        with rasterio.open(f'/vsicurl/{url}') as src:
+            yield src
+
+
+def read_rgb_preview(url, max_size, api_key=None, fallback=None):
+    """
+    Lê a prévia RGB de um GeoTIFF remoto via `/vsicurl/`, transferindo apenas os
+    intervalos de bytes necessários (cabeçalho e blocos da overview escolhida).
+    Se a leitura remota falhar e `fallback` for informado, ele deve retornar os
+    bytes do arquivo inteiro, que então é lido em memória com a mesma redução.
+    `url` também pode ser o caminho de um arquivo local (cache de quads).
+    Retorna um array (3, altura, largura) no tipo original das bandas.
+    """
+    try:
+        with open_raster(url, api_key) as src:
+            return read_rgb(src, max_size)
+    except RasterioIOError as e:
+        if fallback is None:
+            raise
+        logger.warning(f"Leitura por intervalos falhou ({e}); baixando o GeoTIFF completo.")
+
+    with rasterio.MemoryFile(fallback()) as memfile:
+        with memfile.open() as src:
+            return read_rgb(src, max_size)
+
+
+# Ajustes de cor das prévias (mesmos valores do enhance_band e dos ImageEnhance anteriores)
+PREVIEW_PERCENTILES = (1, 99)
+PREVIEW_GAMMA = 1.2
+PREVIEW_BAND_BRIGHTNESS = 1.1
+PREVIEW_CONTRAST = 1.3
+PREVIEW_BRIGHTNESS = 1.1
+PREVIEW_SATURATION = 1.2
+
+# Pesos do cinza (ITU-R 601), os mesmos da conversão "L" do Pillow
+GRAY_WEIGHTS = (0.299, 0.587, 0.114)
+
+# Pixels amostrados por banda para os percentis (amostragem em grade regular)
+PERCENTILE_SAMPLE_PIXELS = 1 << 18
+
+# Níveis da LUT para bandas que não são inteiros sem sinal (ex.: float)
+FALLBACK_LUT_LEVELS = 4096
+
+
+def sample_stride(shape, sample_pixels=PERCENTILE_SAMPLE_PIXELS):
+    """Passo da amostragem para que cerca de `sample_pixels` pixels sejam considerados."""
+    return max(1, int(math.sqrt(shape[0] * shape[1] / sample_pixels)))
+
+
+def histogram_percentiles(histogram, percentiles):
+    """Percentis (posto inferior) a partir de um histograma de valores inteiros."""
+    cdf = np.cumsum(histogram)
+    total = cdf[-1]
+    if total == 0:
+        return [0 for _ in percentiles]
+    return [int(np.searchsorted(cdf, p / 100 * (total - 1), side='right')) for p in percentiles]
+
+
+def _band_lut_input(band, stride, reference=None):
+    """
+    Prepara a banda para indexar uma LUT. Retorna (índices, valor de cada
+    entrada da LUT, histograma amostrado dos índices, percentil baixo, alto).
+    Com `reference`, percentis e histograma vêm dela (ex.: o quad inteiro numa
+    overview) em vez da própria banda.
+    """
+    sample = (band if reference is None else reference)[::stride, ::stride]
+    if band.dtype.kind == 'u' and band.dtype.itemsize <= 2:
+        # uint8/uint16: a própria banda indexa a LUT e o histograma dá os percentis
+        histogram = np.bincount(sample.ravel(), minlength=np.iinfo(band.dtype).max + 1)
+        low, high = histogram_percentiles(histogram, PREVIEW_PERCENTILES)
+        return band, np.arange(histogram.size, dtype=np.float64), histogram, low, high
+
+    # Demais tipos: quantiza o intervalo entre os percentis em níveis fixos
+    low, high = np.percentile(sample, PREVIEW_PERCENTILES)
+    levels = FALLBACK_LUT_LEVELS
+    step = (high - low) / (levels - 1)
+
+    def quantize(values):
+        return np.clip((values - low) / step if step else np.zeros(values.shape), 0, levels - 1).astype(np.uint16)
+
+    histogram = np.bincount(quantize(sample).ravel(), minlength=levels)
+    return quantize(band), low + np.arange(levels) * step, histogram, low, high
+
+
+def _tone_curve(values, low, high):
+    """Recorte nos percentis, normalização, gama e brilho por banda, em 0–255."""
+    if high <= low:
+        return np.zeros(values.shape)
+    normalized = np.clip((values - low) / (high - low), 0, 1)
+    corrected = np.clip(np.power(normalized, 1 / PREVIEW_GAMMA) * PREVIEW_BAND_BRIGHTNESS, 0, 1)
+    return np.floor(corrected * 255)
+
+
+def saturate(channels, factor):
+    """
+    Equivalente ao ImageEnhance.Color: afasta cada pixel do seu cinza por
+    `factor`. Usa aritmética inteira de ponto fixo (1/64) em int16 sobre as
+    bandas separadas e escreve direto na imagem (altura, largura, 3) uint8.
+    """
+    weight = round(factor * 64)
+    red, green, blue = (channel.astype(np.uint16) for channel in channels)
+    gray = ((red * 77 + green * 150 + blue * 29 + 128) >> 8).view(np.int16) * (weight - 64)
+
+    rgb = np.empty(channels[0].shape + (3,), dtype=np.uint8)
+    for i, channel in enumerate((red, green, blue)):
+        value = (channel.view(np.int16) * weight - gray + 32) >> 6
+        np.clip(value, 0, 255, out=value)
+        rgb[..., i] = value
+    return rgb
+
+
+def enhance_rgb(bands, stride=None, reference=None):
+    """
+    Converte as bandas (3, altura, largura) numa imagem RGB uint8 realçada.
+    `reference` (bandas de outra leitura do mesmo raster) fornece as
+    estatísticas, para que recortes de um quad tenham a mesma cor que o todo.
+
+    Os percentis vêm de histogramas (sobre uma amostra em grade) em vez de
+    ordenar cada banda. Recorte, normalização, gama, brilho, contraste (em
+    torno da média do cinza, calculada pelos histogramas) e brilho final são
+    compostos numa LUT por banda, aplicada com uma única indexação; a
+    saturação é o único passo que combina as três bandas.
+    """
+    stats_bands = bands if reference is None else reference
+    stride = stride or sample_stride(stats_bands[0].shape)
+    inputs = [
+        _band_lut_input(band, stride, None if reference is None else reference[i])
+        for i, band in enumerate(bands)
+    ]
+
+    tones = []
+    gray_mean = 0.0
+    for (_, values, histogram, low, high), weight in zip(inputs, GRAY_WEIGHTS):
+        tone = _tone_curve(values, low, high)
+        tones.append(tone)
+        total = histogram.sum()
+        if total:
+            gray_mean += weight * float(histogram @ tone) / total
+    gray_mean = int(gray_mean + 0.5)
+
+    channels = []
+    for (index, *_), tone in zip(inputs, tones):
+        lut = np.clip(gray_mean + PREVIEW_CONTRAST * (tone - gray_mean), 0, 255)
+        lut = np.clip(lut * PREVIEW_BRIGHTNESS, 0, 255).round().astype(np.uint8)
+        channels.append(np.take(lut, index))
+
+    return saturate(channels, PREVIEW_SATURATION)
+
+
+def convert_to_cog(src_path, dst_path):
+    """Regrava um GeoTIFF como COG (blocos de 512, DEFLATE e overviews internas)."""
+    with rasterio.open(src_path) as src:
+        rasterio.shutil.copy(
+            src, dst_path, driver='COG',
+            COMPRESS='DEFLATE', PREDICTOR='YES', BLOCKSIZE=512, OVERVIEWS='AUTO', NUM_THREADS=1,
+        )
+
+
+def render_quad_preview(url, max_size, api_key=None, image_format='png', quality=None):
+    """
+    Pipeline completo da prévia de um quad: leitura reduzida, realce de cor e
+    codificação (`image_format`/`quality`, ver `encode_image`). `url` é o link de download ou o caminho do quad no cache local.
+    Executado nos processos do pool de renderização, por isso recebe e
+    retorna apenas valores serializáveis. Se a leitura por intervalos falhar,
+    o `RasterioIOError` chega a quem chamou, que baixa o quad pelo cliente da
+    Planet e renderiza a partir do disco.
+    """
+    bands = read_rgb_preview(url, max_size, api_key=api_key)
+    return encode_image(enhance_rgb(bands), image_format, quality)
+
+
+@contextmanager
+def open_mercator(url, api_key=None):
+    """Abre o raster em EPSG:3857 (reprojetando sob demanda se ele estiver em outro CRS)."""
+    with open_raster(url, api_key) as dataset:
+        if dataset.crs and dataset.crs.to_epsg() != WEB_MERCATOR_EPSG:
+            with WarpedVRT(dataset, crs=f'EPSG:{WEB_MERCATOR_EPSG}', resampling=Resampling.bilinear) as vrt:
+                yield vrt
+        else:
+            yield dataset
+
+
+def _target_window(src, bounds, width, height):
+    """
+    Interseção do quad com a imagem de saída (`bounds` em EPSG:3857, `width` x
+    `height` pixels): retorna (janela no quad, fatia de linhas, fatia de colunas
+    na saída) ou None se não houver sobreposição.
+    """
+    west, south, east, north = bounds
+    x_resolution = (east - west) / width
+    y_resolution = (north - south) / height
+    quad_west, quad_south, quad_east, quad_north = src.bounds
+    left, right = max(west, quad_west), min(east, quad_east)
+    bottom, top = max(south, quad_south), min(north, quad_north)
+
+    col_start, col_stop = round((left - west) / x_resolution), round((right - west) / x_resolution)
+    row_start, row_stop = round((north - top) / y_resolution), round((north - bottom) / y_resolution)
+    if col_stop <= col_start or row_stop <= row_start:
+        return None
+    window = from_bounds(left, bottom, right, top, transform=src.transform)
+    return window, slice(row_start, row_stop), slice(col_start, col_stop)
+
+
+def _read_window(src, placement):
+    """Lê as bandas RGB e a máscara de dados válidos da janela, já no tamanho de saída."""
+    window, rows, cols = placement
+    shape = (rows.stop - rows.start, cols.stop - cols.start)
+    bands = src.read(RGB_BANDS, window=window, out_shape=(len(RGB_BANDS),) + shape,
+                     resampling=Resampling.average)
+    valid = src.dataset_mask(window=window, out_shape=shape, resampling=Resampling.nearest) > 0
+    return bands, valid
+
+
+def render_tile(bounds, sources, api_key=None, image_format='png', quality=None, tile_size=TILE_SIZE):
+    """
+    Renderiza um tile XYZ (`bounds` em EPSG:3857) a partir dos quads em
+    `sources` (caminhos locais ou URLs). Cada quad contribui só com a janela que
+    cobre o tile, lida já na resolução do tile (o GDAL usa a overview adequada
+    em zooms baixos), com o mesmo realce das prévias calculado sobre o quad
+    inteiro, para não haver emendas entre tiles. Áreas sem dados ficam
+    transparentes (exceto em JPEG). Executado no pool de renderização; retorna
+    a imagem codificada.
+    """
+    rgba = np.zeros((tile_size, tile_size, 4), dtype=np.uint8)
+    for source in sources:
+        with open_mercator(source, api_key) as src:
+            placement = _target_window(src, bounds, tile_size, tile_size)
+            if placement is None:
+                continue
+            bands, valid = _read_window(src, placement)
+            rgb = enhance_rgb(bands, reference=read_rgb(src, QUAD_STATS_SIZE))
+
+            region = rgba[placement[1], placement[2]]
+            region[..., :3][valid] = rgb[valid]
+            region[..., 3][valid] = 255
+    return encode_image(rgba, image_format, quality)
+
+
+def _source_bounds(source, api_key):
+    with open_mercator(source, api_key) as src:
+        return tuple(src.bounds)
+
+
+def _read_composite_part(source, api_key, bounds, width, height):
+    with open_mercator(source, api_key) as src:
+        placement = _target_window(src, bounds, width, height)
+        if placement is None:
+            return None
+        return placement[1:], _read_window(src, placement)
+
+
+def render_composite(sources, max_size, api_key=None, geometry=None,
+                     image_format='png', quality=None, max_workers=8):
+    """
+    Mosaico de vários quads numa única imagem reduzida (maior lado `max_size`),
+    recortada pela AOI (`geometry` GeoJSON em WGS84), se informada. Os quads
+    são lidos em paralelo, cada um só na janela e resolução necessárias, e o
+    realce usa um único conjunto de estatísticas (dos pixels válidos de todo o
+    mosaico), sem diferenças de cor entre quads. Executado no pool de
+    renderização; retorna (imagem, limites [oeste, sul, leste, norte] em WGS84,
+    largura, altura), ou None se nenhum quad tiver dados na área.
+
+    As extensões dos quads também são lidas em paralelo; a segunda abertura de
+    cada quad remoto reaproveita o cabeçalho já guardado no cache de blocos do
+    /vsicurl/ do processo.
+    """
+    if not sources:
+        return None
+    workers = max(1, min(max_workers, len(sources)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        extents = list(executor.map(lambda source: _source_bounds(source, api_key), sources))
+    west, south = min(e[0] for e in extents), min(e[1] for e in extents)
+    east, north = max(e[2] for e in extents), max(e[3] for e in extents)
+
+    aoi = None
+    if geometry is not None:
+        aoi = transform_geom('EPSG:4326', f'EPSG:{WEB_MERCATOR_EPSG}', geometry)
+        aoi_west, aoi_south, aoi_east, aoi_north = shape(aoi).bounds
+        west, south = max(west, aoi_west), max(south, aoi_south)
+        east, north = min(east, aoi_east), min(north, aoi_north)
+        if east <= west or north <= south:
+            return None
+
+    bounds = (west, south, east, north)
+    height, width = preview_shape(north - south, east - west, max_size)
+    height, width = max(1, int(height)), max(1, int(width))
+
+    canvas = None
+    valid = np.zeros((height, width), dtype=bool)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        parts = executor.map(lambda source: _read_composite_part(source, api_key, bounds, width, height), sources)
+        for part in parts:
+            if part is None:
+                continue
+            (rows, cols), (bands, part_valid) = part
+            if canvas is None:
+                canvas = np.zeros((len(RGB_BANDS), height, width), dtype=bands.dtype)
+            canvas[:, rows, cols][:, part_valid] = bands[:, part_valid]
+            valid[rows, cols] |= part_valid
+
+    if aoi is not None:
+        transform = rasterio.transform.from_bounds(west, south, east, north, width, height)
+        valid &= geometry_mask([aoi], out_shape=(height, width), transform=transform, invert=True)
+    if canvas is None or not valid.any():
+        return None
+
+    # Estatísticas de cor só dos pixels válidos, como uma "banda" (1, n) por canal
+    reference = canvas[:, valid][:, np.newaxis, :]
+    rgba = np.zeros((height, width, 4), dtype=np.uint8)
+    rgba[..., :3] = enhance_rgb(canvas, reference=reference)
+    rgba[..., 3] = np.where(valid, 255, 0)
+    rgba[~valid, :3] = 0
+
+    lonlat_bounds = transform_bounds(f'EPSG:{WEB_MERCATOR_EPSG}', 'EPSG:4326', *bounds)
+    return encode_image(rgba, image_format, quality), list(lonlat_bounds), width, height
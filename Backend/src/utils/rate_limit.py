@@ -0,0 +1,130 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# Orçamentos padrão (requisições/segundo) por grupo de endpoints da Planet
+DEFAULT_RATE_LIMITS = {
+    'search': 5.0,
+    'data': 10.0,
+    'basemaps': 10.0,
+    'downloads': 15.0,
+}
+
+
+class TokenBucket:
+    """
+    Token bucket com taxa adaptativa (AIMD): cada sucesso aumenta a taxa
+    aditivamente até o teto configurado e cada 429 a reduz multiplicativamente,
+    de modo que o throughput se estabiliza logo abaixo do limite real da Planet.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=0.5, increase=0.1, decrease=0.7):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def reserve(self, count=1):
+        """
+        Reserva `count` tokens e retorna quantos segundos o chamador deve esperar
+        antes de usá-los. Não bloqueia, para poder ser usado também com asyncio.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= count
+            delay = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(delay, self.blocked_until - now)
+
+    def acquire(self, count=1):
+        delay = self.reserve(count)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+class AdaptiveRateLimiter:
+    """Conjunto de token buckets por grupo de endpoints, compartilhado pelo processo."""
+
+    def __init__(self, limits=None):
+        limits = {**DEFAULT_RATE_LIMITS, **(limits or {})}
+        self.buckets = {endpoint: TokenBucket(rate) for endpoint, rate in limits.items()}
+
+    @staticmethod
+    def classify(url):
+        """Identifica o grupo de orçamento de uma URL da Planet."""
+        parsed = urlparse(url)
+        path = parsed.path
+        if parsed.hostname and parsed.hostname != 'api.planet.com':
+            return 'downloads'
+        if path.startswith('/data/v1/quick-search') or path.startswith('/data/v1/searches') \
+                or path.startswith('/data/v1/stats'):
+            return 'search'
+        if path.endswith('/full') or path.endswith('/download'):
+            return 'downloads'
+        if path.startswith('/basemaps/'):
+            return 'basemaps'
+        return 'data'
+
+    def bucket(self, endpoint):
+        return self.buckets.get(endpoint) or self.buckets['data']
+
+    def reserve(self, endpoint):
+        return self.bucket(endpoint).reserve()
+
+    def acquire(self, endpoint, count=1):
+        return self.bucket(endpoint).acquire(count)
+
+    def on_success(self, endpoint):
+        self.bucket(endpoint).on_success()
+
+    def on_throttle(self, endpoint, retry_after=None):
+        self.bucket(endpoint).on_throttle(retry_after)
+
+
+def parse_retry_after(value):
+    """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None, base=0.5, cap=30.0):
+    """Backoff exponencial com jitter completo; respeita o Retry-After quando informado."""
+    if retry_after is not None:
+        return min(cap, retry_after) + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
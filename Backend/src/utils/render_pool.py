@@ -0,0 +1,103 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+
+from src.utils.errors import ServiceUnavailableError, GatewayTimeoutError, InternalServerError
+
+logger = logging.getLogger(__name__)
+
+
+def _mp_context():
+    """forkserver evita herdar locks de threads do worker do gunicorn; no Windows só há spawn."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class RenderPool:
+    """
+    Pool de processos para renderização de rasters (decodificação do TIFF,
+    realce com NumPy e codificação da imagem), fora dos workers do Flask.
+
+    No máximo `max_workers + max_queue` trabalhos ficam em execução ou na fila;
+    acima disso a requisição é recusada na hora com 503 e `Retry-After`, em vez
+    de acumular espera. Cada trabalho tem um tempo limite de `timeout` segundos.
+    """
+
+    def __init__(self, max_workers, max_queue, timeout, retry_after=2):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_mp_context())
+                logger.info(f"Pool de renderização iniciado com {self.max_workers} processos.")
+            return self._executor
+
+    def _reset(self, executor):
+        """Descarta um pool quebrado (ex.: processo morto pelo GDAL) para que o próximo trabalho crie outro."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn, *args):
+        """Executa `fn(*args)` num processo do pool e retorna o resultado."""
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Fila de renderização cheia; recusando o trabalho.")
+            raise ServiceUnavailableError(
+                "Muitas imagens sendo geradas no momento. Tente novamente em instantes.",
+                retry_after=self.retry_after,
+            )
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset(executor)
+            raise InternalServerError("Falha no pool de renderização.")
+        except Exception:
+            self._slots.release()
+            raise
+        # A vaga só é liberada quando o trabalho termina (ou é cancelado na fila),
+        # mesmo que a requisição desista antes por tempo limite
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.warning(f"Renderização excedeu {self.timeout}s.")
+            raise GatewayTimeoutError("A geração da imagem excedeu o tempo limite.")
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise InternalServerError("Falha no pool de renderização.")
+
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool():
+    """Retorna o pool de renderização do processo (criado sob demanda, após o fork do gunicorn)."""
+    global _render_pool
+    if _render_pool is None:
+        with _render_pool_lock:
+            if _render_pool is None:
+                config = current_app.config
+                _render_pool = RenderPool(
+                    max_workers=config['RENDER_POOL_WORKERS'],
+                    max_queue=config['RENDER_POOL_QUEUE'],
+                    timeout=config['RENDER_TIMEOUT'],
+                    retry_after=config['RENDER_RETRY_AFTER'],
+                )
+    return _render_pool
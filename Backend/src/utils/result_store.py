@@ -0,0 +1,164 @@
+import base64
+import json
+import logging
+import secrets
+import threading
+import time
+import zlib
+
+from flask import current_app
+
+from src.utils.errors import ValidationError
+from src.utils.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+INSERT_BATCH_SIZE = 500
+# `total` de um resultado ainda sendo gravado
+INCOMPLETE = -1
+
+
+def encode_cursor(offset):
+    """Cursor opaco para a próxima página (o cliente não deve interpretar o conteúdo)."""
+    raw = json.dumps({'o': offset}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        offset = int(json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))['o'])
+    except (ValueError, KeyError, TypeError):
+        raise ValidationError("Cursor de paginação inválido")
+    if offset < 0:
+        raise ValidationError("Cursor de paginação inválido")
+    return offset
+
+
+class SearchResultStore(SQLiteStore):
+    """
+    Guarda o resultado completo de uma busca sob um `result_id`, feature por
+    feature, para que o cliente leia uma página por vez. Compartilhado pelos
+    workers; resultados expiram após `ttl` segundos.
+    """
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS search_results (
+            result_id TEXT PRIMARY KEY,
+            total INTEGER NOT NULL,
+            created_at REAL NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS search_result_features (
+            result_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            value BLOB NOT NULL,
+            PRIMARY KEY (result_id, seq)
+        )""",
+    )
+
+    def __init__(self, path, ttl=3600):
+        super().__init__(path)
+        self.ttl = ttl
+
+    def create(self, features):
+        """
+        Armazena as features (em lotes, sem materializar a lista) e retorna
+        (result_id, total). O registro do resultado é criado antes das features,
+        como incompleto, para que elas nunca fiquem sem um `created_at` que as
+        faça expirar; se a gravação falhar, o que já foi gravado é removido.
+        """
+        self._expire()
+        result_id = secrets.token_urlsafe(12)
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT INTO search_results (result_id, total, created_at) VALUES (?, ?, ?)",
+                (result_id, INCOMPLETE, time.time()),
+            )
+        try:
+            batch = []
+            total = 0
+            for feature in features:
+                batch.append((result_id, total, zlib.compress(json.dumps(feature, separators=(',', ':')).encode('utf-8'))))
+                total += 1
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    self._insert(batch)
+                    batch = []
+            if batch:
+                self._insert(batch)
+            with self.connection() as conn:
+                conn.execute("UPDATE search_results SET total = ? WHERE result_id = ?", (total, result_id))
+        except BaseException:
+            self._delete(result_id)
+            raise
+        return result_id, total
+
+    def _insert(self, batch):
+        with self.connection() as conn:
+            conn.executemany(
+                "INSERT INTO search_result_features (result_id, seq, value) VALUES (?, ?, ?)", batch
+            )
+
+    def _delete(self, result_id):
+        try:
+            with self.connection() as conn:
+                conn.execute("DELETE FROM search_result_features WHERE result_id = ?", (result_id,))
+                conn.execute("DELETE FROM search_results WHERE result_id = ?", (result_id,))
+        except Exception as e:
+            logger.warning(f"Falha ao remover o resultado de busca incompleto {result_id}: {e}")
+
+    def page(self, result_id, offset, limit):
+        """Retorna (features, total) da página pedida, ou None se o resultado não existir/expirou."""
+        rows = self.query("SELECT total, created_at FROM search_results WHERE result_id = ?", (result_id,))
+        if not rows:
+            return None
+        total, created_at = rows[0]
+        if total == INCOMPLETE or time.time() - created_at > self.ttl:
+            return None
+        rows = self.query(
+            "SELECT value FROM search_result_features WHERE result_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+            (result_id, offset, limit),
+        )
+        return [json.loads(zlib.decompress(value)) for (value,) in rows], total
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        with self.connection() as conn:
+            conn.execute(
+                "DELETE FROM search_result_features WHERE result_id IN "
+                "(SELECT result_id FROM search_results WHERE created_at < ?)",
+                (cutoff,),
+            )
+            expired = conn.execute("DELETE FROM search_results WHERE created_at < ?", (cutoff,)).rowcount
+        if expired:
+            logger.info(f"{expired} resultados de busca paginada expirados removidos.")
+
+
+def build_page(result_id, features, offset, total):
+    """Monta a resposta paginada (FeatureCollection + metadados do cursor)."""
+    next_offset = offset + len(features)
+    return {
+        'type': 'FeatureCollection',
+        'features': features,
+        'result_id': result_id,
+        'total': total,
+        'next_cursor': encode_cursor(next_offset) if next_offset < total else None,
+    }
+
+
+_result_store = None
+_result_store_lock = threading.Lock()
+
+
+def get_result_store():
+    """Retorna o armazenamento de resultados paginados do processo."""
+    global _result_store
+    if _result_store is None:
+        with _result_store_lock:
+            if _result_store is None:
+                _result_store = SearchResultStore(
+                    current_app.config['SEARCH_RESULTS_PATH'],
+                    ttl=current_app.config['SEARCH_RESULTS_TTL'],
+                )
+    return _result_store
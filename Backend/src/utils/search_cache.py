@@ -0,0 +1,244 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import zlib
+
+from flask import current_app
+
+from src.utils.search_fanout import parse_planet_datetime, format_planet_datetime
+from src.utils.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Casas decimais mantidas nas coordenadas (~11 cm no equador)
+COORDINATE_PRECISION = 6
+# Intervalo mínimo (segundos) entre atualizações de `accessed_at` de uma entrada,
+# para que acertos frequentes não abram uma transação de escrita a cada leitura
+TOUCH_INTERVAL = 60
+
+
+# --- Canonicalização do payload de busca ---
+
+def _round_position(position, precision):
+    return [round(float(value), precision) for value in position[:2]]
+
+
+def _signed_area(ring):
+    area = 0.0
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        area += x1 * y2 - x2 * y1
+    return area / 2.0
+
+
+def _canonical_ring(ring, precision, clockwise):
+    """Arredonda, remove vértices repetidos, força a orientação e começa pelo menor vértice."""
+    points = []
+    for position in ring:
+        point = _round_position(position, precision)
+        if not points or point != points[-1]:
+            points.append(point)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    if not points:
+        return []
+    if (_signed_area(points) < 0) != clockwise:
+        points.reverse()
+    start = points.index(min(points))
+    points = points[start:] + points[:start]
+    return points + [points[0]]
+
+
+def _canonical_polygon(rings, precision):
+    if not rings:
+        return []
+    exterior = _canonical_ring(rings[0], precision, clockwise=False)
+    holes = sorted(_canonical_ring(ring, precision, clockwise=True) for ring in rings[1:])
+    return [exterior] + holes
+
+
+def _round_nested(coordinates, precision):
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        return _round_position(coordinates, precision)
+    return [_round_nested(child, precision) for child in coordinates]
+
+
+def canonical_geometry(geometry, precision=COORDINATE_PRECISION):
+    """
+    Normaliza uma geometria GeoJSON para comparação: coordenadas arredondadas,
+    anéis externos no sentido anti-horário (RFC 7946), buracos no horário e cada
+    anel iniciando pelo menor vértice, de modo que o mesmo polígono desenhado em
+    outra ordem gere a mesma chave.
+    """
+    geometry_type = geometry.get('type')
+    coordinates = geometry.get('coordinates', [])
+    if geometry_type == 'Polygon':
+        coordinates = _canonical_polygon(coordinates, precision)
+    elif geometry_type == 'MultiPolygon':
+        coordinates = sorted(_canonical_polygon(polygon, precision) for polygon in coordinates)
+    elif geometry_type == 'GeometryCollection':
+        return {
+            'type': geometry_type,
+            'geometries': [canonical_geometry(child, precision) for child in geometry.get('geometries', [])],
+        }
+    else:
+        coordinates = _round_nested(coordinates, precision)
+    return {'type': geometry_type, 'coordinates': coordinates}
+
+
+def _canonical_filter(search_filter):
+    filter_type = search_filter.get('type')
+    config = search_filter.get('config')
+
+    if filter_type in ('AndFilter', 'OrFilter'):
+        children = [_canonical_filter(child) for child in config or []]
+        config = sorted(children, key=lambda child: json.dumps(child, sort_keys=True))
+    elif filter_type == 'NotFilter':
+        config = _canonical_filter(config)
+    elif filter_type == 'DateRangeFilter':
+        config = {key: format_planet_datetime(parse_planet_datetime(value)) for key, value in config.items()}
+    elif filter_type == 'RangeFilter':
+        config = {key: float(value) for key, value in config.items()}
+    elif filter_type == 'GeometryFilter':
+        config = canonical_geometry(config)
+    elif isinstance(config, list):
+        config = sorted(config, key=lambda value: json.dumps(value, sort_keys=True))
+
+    canonical = dict(search_filter)
+    canonical['config'] = config
+    return canonical
+
+
+def canonicalize_search_payload(search_payload):
+    """Forma canônica do payload de `build_search_payload` usada como chave de cache."""
+    canonical = dict(search_payload)
+    canonical['item_types'] = sorted(search_payload.get('item_types', []))
+    if search_payload.get('filter'):
+        canonical['filter'] = _canonical_filter(search_payload['filter'])
+    return canonical
+
+
+def search_cache_key(search_payload, namespace='search'):
+    """Hash SHA-256 do payload canônico."""
+    canonical = json.dumps(canonicalize_search_payload(search_payload), sort_keys=True, separators=(',', ':'))
+    return f"{namespace}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+# --- Cache persistente ---
+
+class SearchCache(SQLiteStore):
+    """
+    Cache de resultados de busca em SQLite, compartilhado por todos os workers.
+    Os valores são JSON comprimido com zlib; entradas expiram após `ttl`
+    segundos e, acima de `max_bytes`, as menos usadas recentemente são removidas.
+    """
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS search_cache (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache (accessed_at)",
+    )
+
+    def __init__(self, path, ttl=3600, max_bytes=256 * 1024 * 1024):
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def get(self, key):
+        now = time.time()
+        rows = self.query("SELECT value, created_at, accessed_at FROM search_cache WHERE key = ?", (key,))
+        if not rows:
+            return None
+        value, created_at, accessed_at = rows[0]
+        if now - created_at > self.ttl:
+            with self.connection() as conn:
+                conn.execute("DELETE FROM search_cache WHERE key = ? AND created_at = ?", (key, created_at))
+            return None
+        if now - accessed_at > TOUCH_INTERVAL:
+            with self.connection() as conn:
+                conn.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(zlib.decompress(value))
+
+    def set(self, key, value):
+        return self._store(key, zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'), 6))
+
+    def _store(self, key, blob):
+        if len(blob) > self.max_bytes:
+            return False
+        now = time.time()
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            self._evict(conn, now)
+        return True
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM search_cache WHERE created_at < ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM search_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM search_cache ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"Cache de buscas: {evicted} entradas removidas (LRU) para respeitar o limite de tamanho.")
+
+    def fill_through(self, key, features, max_features, max_entry_bytes):
+        """
+        Repassa as features de uma busca em andamento e, se a busca terminar sem
+        erros, com até `max_features` itens e até `max_entry_bytes` comprimidos,
+        grava o resultado no cache. As features são serializadas e comprimidas à
+        medida que passam, então só o JSON já comprimido fica em memória.
+        """
+        compressor = zlib.compressobj(6)
+        parts = [compressor.compress(b'[')]
+        size = count = 0
+        for feature in features:
+            if parts is not None:
+                data = json.dumps(feature, separators=(',', ':')).encode('utf-8')
+                chunk = compressor.compress(b',' + data if count else data)
+                parts.append(chunk)
+                size += len(chunk)
+                count += 1
+                if count > max_features or size > max_entry_bytes:
+                    logger.debug(f"Busca {key} grande demais para o cache ({count} features, {size} bytes comprimidos).")
+                    parts = compressor = None
+            yield feature
+        if parts is not None:
+            parts.append(compressor.compress(b']'))
+            parts.append(compressor.flush())
+            try:
+                self._store(key, b''.join(parts))
+            except Exception as e:
+                logger.warning(f"Falha ao gravar busca no cache: {e}")
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    """Retorna o cache de buscas do processo (ou None se desabilitado na configuração)."""
+    global _search_cache
+    if not current_app.config.get('SEARCH_CACHE_ENABLED', True):
+        return None
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = SearchCache(
+                    current_app.config['SEARCH_CACHE_PATH'],
+                    ttl=current_app.config['SEARCH_CACHE_TTL'],
+                    max_bytes=current_app.config['SEARCH_CACHE_MAX_BYTES'],
+                )
+    return _search_cache
@@ -0,0 +1,233 @@
+import collections
+import copy
+import functools
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+# Limite de janelas por busca: se necessário as janelas são alargadas para respeitá-lo
+MAX_SLICES = 48
+# Páginas que cada sub-busca do fan-out pode ter à frente do consumidor
+SLICE_QUEUE_PAGES = 2
+# Features em trânsito entre as threads dos blocos e o consumidor do stream
+TILE_QUEUE_SIZE = 1000
+
+
+def parse_planet_datetime(value):
+    """Converte 'YYYY-MM-DD' ou um timestamp RFC 3339 em datetime com fuso UTC."""
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        text = str(value).strip()
+        if text.endswith('Z'):
+            text = text[:-1] + '+00:00'
+        dt = datetime.fromisoformat(text)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def format_planet_datetime(dt):
+    """Formata um datetime UTC no padrão RFC 3339 aceito pela Data API."""
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def find_filter(search_filter, filter_type, field_name=None):
+    """Procura (recursivamente em AndFilter) o primeiro filtro do tipo/campo informado."""
+    if not isinstance(search_filter, dict):
+        return None
+    if search_filter.get('type') == filter_type and (
+        field_name is None or search_filter.get('field_name') == field_name
+    ):
+        return search_filter
+    if search_filter.get('type') == 'AndFilter':
+        for child in search_filter.get('config', []):
+            found = find_filter(child, filter_type, field_name)
+            if found is not None:
+                return found
+    return None
+
+
+def split_date_range(start, end, slice_days, max_slices=MAX_SLICES):
+    """
+    Divide [start, end] em janelas consecutivas de `slice_days` dias.
+    Retorna tuplas (inicio, fim, ultima) em ordem cronológica.
+    """
+    span = end - start
+    step = timedelta(days=max(1, int(slice_days)))
+    if span > step * max_slices:
+        step = span / max_slices
+    windows = []
+    cursor = start
+    while cursor + step < end:
+        windows.append((cursor, cursor + step, False))
+        cursor += step
+    windows.append((cursor, end, True))
+    return windows
+
+
+def split_search_payload(search_payload, slice_days, split_item_types=False, max_slices=MAX_SLICES):
+    """
+    Divide o payload de `build_search_payload` em sub-buscas por janela de data
+    (e opcionalmente por item type). Janelas intermediárias usam `lt` no limite
+    superior para não se sobreporem; a última preserva o `lte` original.
+
+    Retorna uma lista de grupos, do mais recente para o mais antigo (a mesma
+    ordem padrão da quick-search); cada grupo é uma lista de payloads da mesma janela.
+    """
+    date_filter = find_filter(search_payload.get('filter'), 'DateRangeFilter', 'acquired')
+    config = (date_filter or {}).get('config', {})
+    if 'gte' not in config or 'lte' not in config:
+        return [[search_payload]]
+
+    start = parse_planet_datetime(config['gte'])
+    end = parse_planet_datetime(config['lte'])
+    if end <= start:
+        return [[search_payload]]
+
+    item_type_groups = [[item_type] for item_type in search_payload.get('item_types', [])]
+    if not split_item_types or len(item_type_groups) < 2:
+        item_type_groups = [search_payload.get('item_types', [])]
+
+    groups = []
+    for window_start, window_end, is_last in reversed(split_date_range(start, end, slice_days, max_slices)):
+        group = []
+        for item_types in item_type_groups:
+            payload = copy.deepcopy(search_payload)
+            payload['item_types'] = item_types
+            window_filter = find_filter(payload['filter'], 'DateRangeFilter', 'acquired')
+            window_config = {k: v for k, v in window_filter['config'].items() if k not in ('gt', 'gte', 'lt', 'lte')}
+            window_config['gte'] = format_planet_datetime(window_start)
+            if is_last:
+                window_config['lte'] = config['lte']
+            else:
+                window_config['lt'] = format_planet_datetime(window_end)
+            window_filter['config'] = window_config
+            group.append(payload)
+        groups.append(group)
+    return groups
+
+
+def iter_fanout_search(client, search_payload, slice_days=30, max_workers=8,
+                       split_item_types=False, max_slices=MAX_SLICES):
+    """
+    Executa as sub-buscas em paralelo num pool limitado de threads e produz as
+    features sem duplicatas (por `id`), das janelas mais recentes para as mais
+    antigas. Cada sub-busca percorre suas páginas sob demanda e guarda no
+    máximo SLICE_QUEUE_PAGES páginas à frente do consumidor; só `max_workers`
+    sub-buscas ficam em andamento, e a seguinte começa quando o consumidor
+    termina de ler a mais antiga delas.
+    """
+    groups = split_search_payload(search_payload, slice_days, split_item_types, max_slices)
+    payloads = [payload for group in groups for payload in group]
+    workers = max(1, min(max_workers, len(payloads)))
+    logger.info(f"Busca em fan-out: {len(groups)} janelas, {len(payloads)} sub-buscas, {workers} threads.")
+
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='planet-search')
+    pending = iter(payloads)
+    in_flight = collections.deque()
+
+    def start_next():
+        payload = next(pending, None)
+        if payload is not None:
+            pages = queue.Queue(maxsize=SLICE_QUEUE_PAGES)
+            executor.submit(_produce, functools.partial(client.iter_search_pages, payload), pages, stop)
+            in_flight.append(pages)
+
+    try:
+        for _ in range(workers):
+            start_next()
+        seen_ids = set()
+        while in_flight:
+            for page in _drain(in_flight.popleft(), 1):
+                for feature in page:
+                    feature_id = feature.get('id')
+                    if feature_id in seen_ids:
+                        continue
+                    seen_ids.add(feature_id)
+                    yield feature
+            start_next()
+    finally:
+        # Se o cliente desconectar no meio do stream, as sub-buscas em andamento
+        # param na próxima página e as pendentes nem começam
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _produce(make_items, results, stop):
+    """
+    Consome o iterável de `make_items()` numa thread do pool e repassa cada item
+    pela fila limitada `results` como ('item', valor), seguido de ('error',
+    exceção) se falhar e sempre de ('done', None). Para assim que `stop` é sinalizado.
+    """
+    try:
+        for item in make_items():
+            if not _put(results, stop, ('item', item)):
+                return
+    except Exception as e:
+        _put(results, stop, ('error', e))
+    finally:
+        _put(results, stop, ('done', None))
+
+
+def _put(results, stop, entry):
+    """Coloca `entry` na fila, esperando espaço enquanto o consumidor não desistir do stream."""
+    while not stop.is_set():
+        try:
+            results.put(entry, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(results, producers):
+    """Itens da fila até que os `producers` produtores terminem; repassa a primeira exceção."""
+    while producers:
+        kind, value = results.get()
+        if kind == 'done':
+            producers -= 1
+        elif kind == 'error':
+            raise value
+        else:
+            yield value
+
+
+def iter_tiled_search(fetch, search_payload, tiles, max_workers=8):
+    """
+    Executa a mesma busca para cada bloco da AOI em paralelo (`fetch(payload)`
+    retorna um iterável de features) e repassa as features à medida que os
+    blocos as devolvem, sem duplicatas: cenas que cruzam a fronteira entre
+    blocos aparecem uma única vez. Só os ids já vistos ficam em memória; as
+    threads esperam quando o consumidor fica TILE_QUEUE_SIZE features atrás.
+    """
+    payloads = []
+    for tile in tiles:
+        payload = copy.deepcopy(search_payload)
+        find_filter(payload['filter'], 'GeometryFilter')['config'] = tile
+        payloads.append(payload)
+    logger.info(f"Busca dividida em {len(payloads)} blocos da AOI.")
+
+    results = queue.Queue(maxsize=TILE_QUEUE_SIZE)
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(payloads))),
+                                  thread_name_prefix='planet-tile')
+    try:
+        for payload in payloads:
+            executor.submit(_produce, functools.partial(fetch, payload), results, stop)
+        seen_ids = set()
+        for feature in _drain(results, len(payloads)):
+            feature_id = feature.get('id')
+            if feature_id in seen_ids:
+                continue
+            seen_ids.add(feature_id)
+            yield feature
+    finally:
+        # Consumidor interrompido ou erro: as threads param na próxima feature
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,63 @@
+import numpy as np
+
+# Intervalos aceitos pela Stats API da Planet
+STATS_INTERVALS = ('hour', 'day', 'week', 'month', 'year')
+
+_NUMPY_UNITS = {'hour': 'h', 'day': 'D', 'month': 'M', 'year': 'Y'}
+
+
+def _bucket_starts(acquired, interval):
+    """Trunca os instantes (datetime64[ms]) para o início do intervalo pedido."""
+    if interval == 'week':
+        days = acquired.astype('datetime64[D]')
+        # 1970-01-01 foi uma quinta-feira: desloca para a segunda-feira anterior
+        weekday = (days.astype(np.int64) + 3) % 7
+        return days - weekday.astype('timedelta64[D]')
+    return acquired.astype(f'datetime64[{_NUMPY_UNITS[interval]}]')
+
+
+def compute_local_stats(features, interval='day', max_cloud_cover=None, cloud_bins=10):
+    """
+    Calcula localmente, com NumPy, as mesmas contagens por intervalo da Stats
+    API da Planet, mais um histograma de cobertura de nuvens, a partir das
+    propriedades de features já em cache. Nenhuma chamada à Planet é feita.
+    """
+    acquired = []
+    cloud = []
+    for feature in features:
+        properties = feature.get('properties') or {}
+        if not properties.get('acquired'):
+            continue
+        acquired.append(properties['acquired'].rstrip('Z'))
+        cloud.append(properties.get('cloud_cover', np.nan))
+
+    acquired = np.array(acquired, dtype='datetime64[ms]')
+    cloud = np.array(cloud, dtype=np.float64)
+
+    if max_cloud_cover is not None and cloud.size:
+        keep = ~(cloud > max_cloud_cover)
+        acquired, cloud = acquired[keep], cloud[keep]
+
+    buckets = []
+    if acquired.size:
+        starts, counts = np.unique(_bucket_starts(acquired, interval), return_counts=True)
+        buckets = [
+            {'start_time': f"{np.datetime_as_string(start.astype('datetime64[us]'), unit='us')}Z", 'count': int(count)}
+            for start, count in zip(starts, counts)
+        ]
+
+    valid_cloud = cloud[~np.isnan(cloud)]
+    histogram, edges = np.histogram(valid_cloud, bins=cloud_bins, range=(0.0, 1.0))
+
+    return {
+        'interval': interval,
+        'utc_offset': '+0h',
+        'buckets': buckets,
+        'total': int(acquired.size),
+        'cloud_cover_histogram': {
+            'bin_edges': [round(float(edge), 4) for edge in edges],
+            'counts': [int(count) for count in histogram],
+            'mean': float(valid_cloud.mean()) if valid_cloud.size else None,
+        },
+        'source': 'local',
+    }
@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:  # Windows: coordenação só entre threads
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """Uma execução em andamento para uma chave; os seguidores esperam por `done`."""
+
+    def __init__(self, key):
+        self.key = key
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalescência de trabalho idêntico em andamento: chamadores concorrentes com
+    a mesma chave esperam por uma única execução (o "líder") e recebem o mesmo
+    resultado ou a mesma exceção.
+
+    Entre threads do processo a coordenação é feita com um `threading.Event`
+    por chave. Entre workers do gunicorn, o líder de cada processo ainda
+    disputa um `flock` num arquivo em `lock_dir`; quem o obtém depois de outro
+    worker chama `recheck()` (ex.: lê o cache compartilhado em disco) antes de
+    refazer o trabalho. As chaves são distribuídas em `LOCK_STRIPES` arquivos
+    fixos, para não criar um arquivo por chave.
+    """
+
+    LOCK_STRIPES = 1024
+    LOCK_POLL_INTERVAL = 0.05
+
+    def __init__(self, lock_dir=None, timeout=60):
+        self.lock_dir = lock_dir if fcntl else None
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._counters = {'leaders': 0, 'followers': 0}
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def lead(self, key):
+        """Torna o chamador líder de `key` e retorna o `Flight`, ou None se já houver um em andamento."""
+        with self._lock:
+            if key in self._flights:
+                return None
+            flight = self._flights[key] = Flight(key)
+            self._counters['leaders'] += 1
+            return flight
+
+    def finish(self, flight, result=None, error=None):
+        """Publica o resultado do líder e libera os seguidores."""
+        flight.result, flight.error = result, error
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        flight.done.set()
+
+    def wait(self, key):
+        """
+        Espera a execução em andamento de `key` terminar. Retorna o `Flight`
+        concluído, ou None se não havia execução ou o tempo limite passou.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._counters['followers'] += 1
+        if flight is None or not flight.done.wait(self.timeout):
+            return None
+        return flight
+
+    def do(self, key, fn, recheck=None, shared=True):
+        """
+        Executa `fn()` uma única vez por chave entre os chamadores concorrentes e
+        retorna o resultado. `shared=False` coordena só as threads do processo,
+        para resultados que não ficam num cache compartilhado entre workers.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight(key)
+                self._counters['leaders'] += 1
+            else:
+                self._counters['followers'] += 1
+
+        if not leader:
+            if not flight.done.wait(self.timeout):
+                # Líder lento demais: segue sem coalescer em vez de falhar
+                logger.warning(f"Tempo limite esperando o trabalho em andamento para {key}; executando novamente.")
+                return fn()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            result = self._run_locked(key, fn, recheck) if shared else fn()
+        except BaseException as e:
+            self.finish(flight, error=e)
+            raise
+        self.finish(flight, result=result)
+        return result
+
+    def _run_locked(self, key, fn, recheck):
+        with self._file_lock(key) as waited:
+            if waited and recheck is not None:
+                result = recheck()
+                if result is not None:
+                    return result
+            return fn()
+
+    @contextmanager
+    def _file_lock(self, key):
+        """`flock` exclusivo da faixa de `key`; indica se foi preciso esperar por outro worker."""
+        if not self.lock_dir:
+            yield False
+            return
+        stripe = int(hashlib.sha256(key.encode('utf-8')).hexdigest()[:8], 16) % self.LOCK_STRIPES
+        with open(os.path.join(self.lock_dir, f"{stripe:04d}.lock"), 'a+b') as f:
+            waited = False
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    locked = True
+                    break
+                except BlockingIOError:
+                    waited = True
+                    if time.monotonic() >= deadline:
+                        locked = False
+                        break
+                    time.sleep(self.LOCK_POLL_INTERVAL)
+            try:
+                yield waited
+            finally:
+                if locked:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def release_after(self, flight, items):
+        """Repassa os itens de um iterador e encerra `flight` quando ele termina, falha ou é fechado."""
+        try:
+            yield from items
+        finally:
+            self.finish(flight)
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, 'in_flight': len(self._flights)}
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """Retorna a coalescência de trabalho do processo."""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                config = current_app.config
+                _single_flight = SingleFlight(config['SINGLE_FLIGHT_LOCK_DIR'], timeout=config['SINGLE_FLIGHT_TIMEOUT'])
+    return _single_flight
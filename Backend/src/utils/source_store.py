@@ -0,0 +1,142 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from src.utils.disk_store import DiskStore
+from src.utils.raster import convert_to_cog
+from src.utils.render_pool import get_render_pool
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Pedidos do mesmo quad mais próximos que isso contam como uma única demanda
+# (ex.: os vários tiles de uma mesma visualização)
+DEMAND_DEBOUNCE = 30
+# Quantidade máxima de quads com demanda registrada em memória
+MAX_TRACKED_QUADS = 10000
+
+
+class SourceQuadStore:
+    """
+    Cache local dos GeoTIFFs originais dos quads, regravados como COG com
+    overviews, por mosaic_id/quad_id. Com o quad em disco, prévias em outros
+    tamanhos, tiles e composições são recalculados localmente, sem baixar de
+    novo da Planet. Os quads de um mosaico não mudam, então não há expiração:
+    só a cota de disco (LRU).
+
+    O GeoTIFF completo só é baixado quando o quad volta a ser pedido: depois
+    de `min_hits` demandas dentro de `demand_window` segundos. Uma visualização
+    única (ou o pré-carregamento) não dispara o download.
+    """
+
+    def __init__(self, directory, max_bytes, render_pool, workers=2, min_hits=2, demand_window=1800):
+        self.disk = DiskStore(directory, max_bytes, suffix='.tif')
+        self.render_pool = render_pool
+        self.min_hits = min_hits
+        self.demand_window = demand_window
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quad-source')
+        self._pending = set()
+        self._demand = OrderedDict()  # chave do quad -> (demandas, primeira, última)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(mosaic_id, quad_id):
+        return f"{mosaic_id}/{quad_id}"
+
+    def get_path(self, mosaic_id, quad_id):
+        """Caminho do COG local do quad, ou None se ele ainda não foi baixado."""
+        return self.disk.get_path(self.key(mosaic_id, quad_id))
+
+    def fetch(self, client, mosaic_id, quad_id, download_url):
+        """
+        Baixa o quad pelo pool de conexões do cliente, converte para COG no pool
+        de renderização e o grava no cache. Retorna o caminho local.
+        """
+        fd, download_path = tempfile.mkstemp(dir=self.disk.directory, prefix='.tmp-', suffix='.tif')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                response = client.download(download_url)
+                try:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                finally:
+                    response.close()
+            path = self.disk.put_file(
+                self.key(mosaic_id, quad_id),
+                lambda tmp_path: self.render_pool.run(convert_to_cog, download_path, tmp_path),
+            )
+        finally:
+            os.remove(download_path)
+        logger.info(f"Quad {quad_id} do mosaico {mosaic_id} armazenado localmente como COG.")
+        return path
+
+    def get_or_fetch(self, client, mosaic_id, quad_id, download_url):
+        return self.get_path(mosaic_id, quad_id) or self.fetch(client, mosaic_id, quad_id, download_url)
+
+    def _record_demand(self, key):
+        """Registra uma demanda pelo quad; True quando ele já foi pedido `min_hits` vezes dentro da janela."""
+        now = time.monotonic()
+        hits, first_at, last_at = self._demand.pop(key, (0, now, None))
+        if now - first_at > self.demand_window:
+            hits, first_at, last_at = 0, now, None
+        if last_at is None or now - last_at >= DEMAND_DEBOUNCE:
+            hits, last_at = hits + 1, now
+        if hits >= self.min_hits:
+            return True
+        self._demand[key] = (hits, first_at, last_at)
+        while len(self._demand) > MAX_TRACKED_QUADS:
+            self._demand.popitem(last=False)
+        return False
+
+    def fetch_in_background(self, client, mosaic_id, quad_id, download_url):
+        """
+        Registra uma demanda pelo quad e, quando ela se repete, agenda o
+        download (uma vez por quad, mesmo com pedidos simultâneos).
+        """
+        key = self.key(mosaic_id, quad_id)
+        with self._lock:
+            if key in self._pending or not self._record_demand(key):
+                return
+            self._pending.add(key)
+
+        def run():
+            try:
+                if self.get_path(mosaic_id, quad_id) is None:
+                    self.fetch(client, mosaic_id, quad_id, download_url)
+            except Exception as e:
+                logger.warning(f"Não foi possível armazenar localmente o quad {quad_id}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+        self._executor.submit(run)
+
+
+_source_store = None
+_source_store_lock = threading.Lock()
+
+
+def get_source_store():
+    """Retorna o cache local de quads do processo, ou None se estiver desativado."""
+    global _source_store
+    if not current_app.config['SOURCE_CACHE_ENABLED']:
+        return None
+    if _source_store is None:
+        with _source_store_lock:
+            if _source_store is None:
+                config = current_app.config
+                _source_store = SourceQuadStore(
+                    config['SOURCE_CACHE_DIR'],
+                    config['SOURCE_CACHE_MAX_BYTES'],
+                    render_pool=get_render_pool(),
+                    workers=config['SOURCE_CACHE_FETCH_WORKERS'],
+                    min_hits=config['SOURCE_CACHE_MIN_HITS'],
+                    demand_window=config['SOURCE_CACHE_DEMAND_WINDOW'],
+                )
+    return _source_store
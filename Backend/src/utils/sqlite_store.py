@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """
+    Base para armazenamentos locais em SQLite compartilhados entre os workers do
+    gunicorn. Cada thread mantém a própria conexão; o modo WAL permite leituras
+    concorrentes enquanto outro processo escreve.
+    """
+
+    schema = ()
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self.connection() as conn:
+            for statement in self.schema:
+                conn.execute(statement)
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def query(self, sql, params=()):
+        """Executa uma leitura fora de transação explícita e retorna todas as linhas (sem cursor aberto)."""
+        return self.connection().conn.execute(sql, params).fetchall()
+
+
+class _Transaction:
+    """Context manager que envolve um bloco em BEGIN IMMEDIATE/COMMIT."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+        return False
@@ -0,0 +1,95 @@
+import json
+import logging
+from itertools import chain
+
+logger = logging.getLogger(__name__)
+
+JSON_MIMETYPE = 'application/json'
+GEOJSON_MIMETYPE = 'application/geo+json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Tamanho aproximado de cada bloco enviado ao cliente (evita um write por feature)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def negotiate_search_mimetype(accept_mimetypes):
+    """
+    Escolhe o formato da resposta de busca a partir do cabeçalho Accept.
+    Sem preferência explícita (ex.: '*/*') o padrão continua sendo o JSON da FeatureCollection.
+    """
+    best = accept_mimetypes.best_match([JSON_MIMETYPE, GEOJSON_MIMETYPE, NDJSON_MIMETYPE])
+    return best or JSON_MIMETYPE
+
+
+def prime_iterator(iterable):
+    """
+    Consome o primeiro item do iterável antes de iniciar a resposta, para que
+    erros da primeira página (autenticação, cota, validação) ainda possam virar
+    um status HTTP adequado. Retorna um iterador equivalente ao original.
+    """
+    iterator = iter(iterable)
+    try:
+        first = next(iterator)
+    except StopIteration:
+        return iter(())
+    return chain((first,), iterator)
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def _buffered(parts):
+    """Agrupa pequenos pedaços de texto em blocos de ~STREAM_CHUNK_SIZE bytes."""
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_feature_collection(features, extra=None):
+    """
+    Serializa uma FeatureCollection GeoJSON de forma incremental.
+    Membros adicionais (`extra`) são escritos antes da lista de features.
+    Se a fonte falhar no meio do caminho, a coleção é fechada com um membro
+    "error" para que o cliente saiba que o resultado está incompleto.
+    """
+    def parts():
+        header = {'type': 'FeatureCollection'}
+        if extra:
+            header.update(extra)
+        yield _dumps(header)[:-1] + ',"features":['
+        count = 0
+        try:
+            for feature in features:
+                yield (',' if count else '') + _dumps(feature)
+                count += 1
+        except Exception as e:
+            logger.error(f"Busca interrompida durante o streaming após {count} features: {e}")
+            yield '],"error":' + _dumps(str(e)) + '}'
+            return
+        yield ']}'
+
+    return _buffered(parts())
+
+
+def iter_ndjson(features):
+    """Serializa as features como NDJSON (uma feature GeoJSON por linha)."""
+    def parts():
+        count = 0
+        try:
+            for feature in features:
+                yield _dumps(feature) + '\n'
+                count += 1
+        except Exception as e:
+            logger.error(f"Busca interrompida durante o streaming após {count} features: {e}")
+            yield _dumps({'type': 'Error', 'error': str(e)}) + '\n'
+
+    return _buffered(parts())
@@ -0,0 +1,32 @@
+import math
+
+# Metade da extensão do mundo em Web Mercator (EPSG:3857), em metros
+MERCATOR_HALF_WORLD = 20037508.342789244
+MAX_ZOOM = 24
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_bounds(z, x, y):
+    """Limites (oeste, sul, leste, norte) do tile XYZ em metros (EPSG:3857)."""
+    size = 2 * MERCATOR_HALF_WORLD / 2 ** z
+    west = -MERCATOR_HALF_WORLD + x * size
+    north = MERCATOR_HALF_WORLD - y * size
+    return west, north - size, west + size, north
+
+
+def _tile_lat(z, y):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / 2 ** z))))
+
+
+def tile_polygon(z, x, y):
+    """Polígono GeoJSON (WGS84) do tile XYZ."""
+    west = x / 2 ** z * 360 - 180
+    east = (x + 1) / 2 ** z * 360 - 180
+    north, south = _tile_lat(z, y), _tile_lat(z, y + 1)
+    return {
+        'type': 'Polygon',
+        'coordinates': [[[west, south], [east, south], [east, north], [west, north], [west, south]]],
+    }
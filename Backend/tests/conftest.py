@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# A configuração é lida na importação: o cache e a chave precisam existir antes
+os.environ.setdefault('PLANET_API_KEY', 'test-key')
+os.environ['CACHE_DIR'] = tempfile.mkdtemp(prefix='planet-explorer-tests-')
+# O log da aplicação vai para o diretório temporário, não para Backend/logs
+os.environ['LOG_DIR'] = os.path.join(os.environ['CACHE_DIR'], 'logs')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config  # noqa: E402
+
+# 'simple' não existe mais no Flask-Caching 2; o nome da classe funciona em todas as versões
+Config.CACHE_TYPE = 'SimpleCache'
+
+from src.main import app as flask_app  # noqa: E402
+from src.utils.planet_api import get_planet_client  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True)
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def planet(app, monkeypatch):
+    """
+    Substitui a sessão HTTP do cliente da Planet por `planet.handler(method, url, **kwargs)`,
+    definido pelo teste; as chamadas ficam em `planet.calls`.
+    """
+    class Planet:
+        handler = None
+
+        def __init__(self):
+            self.calls = []
+
+        def request(self, method, url, **kwargs):
+            self.calls.append((method, url, kwargs))
+            return self.handler(method, url, **kwargs)
+
+    fake = Planet()
+    with app.app_context():
+        planet_client = get_planet_client()
+    monkeypatch.setattr(planet_client.session, 'request', fake.request)
+    return fake
@@ -0,0 +1,27 @@
+import json
+
+import requests
+
+
+class FakeResponse:
+    """Resposta mínima compatível com o uso que o cliente da Planet faz de `requests.Response`."""
+
+    def __init__(self, status_code=200, data=None, headers=None, content=None):
+        self.status_code = status_code
+        self._data = data
+        self.headers = headers or {}
+        self.content = content if content is not None else json.dumps(data).encode('utf-8')
+        self.text = self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(response=self)
+
+    def iter_content(self, chunk_size=1):
+        yield self.content
+
+    def close(self):
+        pass
@@ -0,0 +1,54 @@
+from src.routes import basemap
+from src.utils.raster import is_planet_url
+
+PLANET_LINK = 'https://api.planet.com/basemaps/v1/mosaics/mosaic/quads/1-1/full'
+
+
+class RecordingPool:
+    def __init__(self):
+        self.sources = []
+
+    def run(self, fn, sources, *args):
+        self.sources.append(list(sources))
+        return b'image', (0.0, 0.0, 1.0, 1.0), 1, 1
+
+
+def test_composite_ignores_download_links_sent_by_the_client(client, monkeypatch):
+    pool = RecordingPool()
+    resolved = []
+
+    def with_quad_details(planet_client, mosaic_id, quads):
+        resolved.extend(quad['id'] for quad in quads)
+        return [{**quad, '_links': {'download': PLANET_LINK}} for quad in quads]
+
+    monkeypatch.setattr(basemap, 'get_render_pool', lambda: pool)
+    monkeypatch.setattr(basemap, 'get_source_store', lambda: None)
+    monkeypatch.setattr(basemap, '_with_quad_details', with_quad_details)
+
+    response = client.post('/api/basemap/composite', json={
+        'mosaic_id': 'mosaic-ssrf',
+        'quads': [{'id': '1-1', '_links': {'download': 'https://attacker.example/quad.tif'}}],
+    })
+
+    assert response.status_code == 200
+    assert resolved == ['1-1']
+    assert pool.sources == [[PLANET_LINK]]
+
+
+def test_api_key_only_goes_to_planet_hosts():
+    assert is_planet_url(PLANET_LINK)
+    assert is_planet_url('https://link.planet.com/quads/1-1')
+    assert not is_planet_url('https://attacker.example/quad.tif')
+    assert not is_planet_url('https://planet.com.attacker.example/quad.tif')
+    assert not is_planet_url('http://api.planet.com/quads/1-1')
+
+
+def test_composite_rejects_invalid_max_size_and_quads(client):
+    for payload in (
+        {'mosaic_id': 'mosaic', 'quads': ['1-1'], 'max_size': 'abc'},
+        {'mosaic_id': 'mosaic', 'quads': ['1-1'], 'max_size': [512]},
+        {'mosaic_id': 'mosaic', 'quads': [{'_links': {}}]},
+        {'mosaic_id': 'mosaic', 'quads': 'not-a-list'},
+    ):
+        response = client.post('/api/basemap/composite', json=payload)
+        assert response.status_code == 400, payload
@@ -0,0 +1,60 @@
+from src.utils import delta_search
+from src.utils.delta_search import DeltaSearchStore, decompose_search_payload
+from src.utils.planet_api import build_search_payload
+from src.utils.search_fanout import parse_planet_datetime
+
+GEOMETRY = {'type': 'Polygon', 'coordinates': [[[-48, -16], [-47, -16], [-47, -15], [-48, -15], [-48, -16]]]}
+
+
+def _payload(start, end):
+    return build_search_payload({
+        'geometry': GEOMETRY,
+        'item_types': ['PSScene'],
+        'start_date': f'{start}T00:00:00Z',
+        'end_date': f'{end}T23:59:59Z',
+    })
+
+
+def _fake_planet(calls):
+    """Uma cena por dia do intervalo pedido, da mais recente para a mais antiga."""
+    def fetch(payload):
+        date_range = next(f['config'] for f in payload['filter']['config'] if f['type'] == 'DateRangeFilter')
+        calls.append(date_range)
+        start, end = parse_planet_datetime(date_range['gte']), parse_planet_datetime(date_range['lte'])
+        for day in range(31, 0, -1):
+            acquired = f'2024-05-{day:02d}T12:00:00Z'
+            if start <= parse_planet_datetime(acquired) <= end:
+                yield {'id': f'scene_{day:02d}', 'properties': {'acquired': acquired, 'cloud_cover': 0}}
+    return fetch
+
+
+def _ids(features):
+    return [feature['id'] for feature in features]
+
+
+def test_gap_features_are_streamed_before_the_gap_finishes(tmp_path):
+    store = DeltaSearchStore(str(tmp_path / 'delta.db'))
+    payload = _payload('2024-05-01', '2024-05-10')
+    parts = decompose_search_payload(payload)
+    calls = []
+
+    features = store.iter_search(payload, _fake_planet(calls), parts=parts)
+    assert next(features)['id'] == 'scene_10'
+    # Consumidor interrompido: o intervalo não é marcado como coberto
+    features.close()
+    assert store.uncovered_intervals(parts['region'], parts['start'], parts['end'], parts['max_cloud'])
+
+    assert _ids(store.iter_search(payload, _fake_planet(calls), parts=parts)) == [f'scene_{d:02d}' for d in range(10, 0, -1)]
+    assert not store.uncovered_intervals(parts['region'], parts['start'], parts['end'], parts['max_cloud'])
+
+
+def test_only_new_interval_is_fetched_and_results_stay_ordered(tmp_path, monkeypatch):
+    monkeypatch.setattr(delta_search, 'READ_BATCH_SIZE', 3)
+    store = DeltaSearchStore(str(tmp_path / 'delta.db'))
+    calls = []
+    list(store.iter_search(_payload('2024-05-01', '2024-05-10'), _fake_planet(calls)))
+
+    calls.clear()
+    ids = _ids(store.iter_search(_payload('2024-05-01', '2024-05-20'), _fake_planet(calls)))
+    assert len(calls) == 1 and calls[0]['lte'].startswith('2024-05-20')
+    assert ids == [f'scene_{d:02d}' for d in range(20, 0, -1)]
@@ -0,0 +1,65 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+from werkzeug.datastructures import MIMEAccept, MultiDict
+
+from src.utils.encoding import encode_image, negotiate_image_encoding
+from src.utils.errors import ValidationError
+from src.utils.preview_cache import get_preview_cache
+from src.utils.previews import preview_cache_key
+
+BROWSER_ACCEPT = MIMEAccept([('image/avif', 1), ('image/webp', 1), ('image/apng', 1), ('*/*', 0.8)])
+NO_ACCEPT = MIMEAccept([('*/*', 1)])
+
+
+def _negotiate(args=None, accept=NO_ACCEPT, alpha=False):
+    return negotiate_image_encoding(MultiDict(args or {}), accept, alpha=alpha)
+
+
+def test_accept_header_picks_webp_then_jpeg_then_png():
+    assert _negotiate(accept=BROWSER_ACCEPT) == ('webp', 80, True)
+    assert _negotiate(accept=MIMEAccept([('image/jpeg', 1)])) == ('jpeg', 85, True)
+    # Com transparência, JPEG não serve: PNG
+    assert _negotiate(accept=MIMEAccept([('image/jpeg', 1)]), alpha=True) == ('png', None, True)
+    assert _negotiate() == ('png', None, True)
+
+
+def test_explicit_format_and_quality_win_over_accept():
+    encoding = _negotiate({'format': 'jpg', 'quality': '60'}, accept=BROWSER_ACCEPT)
+    assert encoding == ('jpeg', 60, False)
+    assert encoding.mimetype == 'image/jpeg'
+    assert encoding.cache_suffix == 'jpeg60'
+
+
+def test_invalid_format_or_quality_is_rejected():
+    with pytest.raises(ValidationError):
+        _negotiate({'format': 'gif'})
+    with pytest.raises(ValidationError):
+        _negotiate({'format': 'webp', 'quality': '101'})
+
+
+@pytest.mark.parametrize('image_format, mode', [('png', 'RGBA'), ('webp', 'RGBA'), ('jpeg', 'RGB')])
+def test_encoded_images_decode_back(image_format, mode):
+    image = np.zeros((32, 48, 4), dtype=np.uint8)
+    image[..., 0] = 200
+    image[:, :24, 3] = 255
+    decoded = Image.open(io.BytesIO(encode_image(image, image_format)))
+    assert decoded.format == image_format.upper()
+    assert decoded.size == (48, 32)
+    assert decoded.mode == mode
+
+
+def test_negotiated_previews_vary_on_accept(app, client):
+    encoding = _negotiate(accept=BROWSER_ACCEPT)
+    with app.app_context():
+        max_size = app.config['PREVIEW_MAX_SIZE']
+        get_preview_cache().set(preview_cache_key('mosaic-enc', '1-1', max_size, encoding), b'webp-bytes')
+
+    response = client.get('/api/basemap/quad/preview?mosaic_id=mosaic-enc&quad_id=1-1',
+                          headers={'Accept': 'image/avif,image/webp,*/*;q=0.8'})
+    assert response.status_code == 200
+    assert response.mimetype == 'image/webp'
+    assert response.get_data() == b'webp-bytes'
+    assert 'Accept' in response.headers['Vary']
@@ -0,0 +1,63 @@
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from src.utils.raster import enhance_rgb, histogram_percentiles, saturate
+
+
+def _bands(dtype=np.uint16, seed=7):
+    rng = np.random.default_rng(seed)
+    rows, cols = np.mgrid[0:256, 0:256]
+    base = np.stack([rows * 12 + cols * 4, rows * 6 + cols * 10, (rows + cols) * 7]).astype(np.float64)
+    bands = (base + rng.normal(0, 150, base.shape)).clip(0, 6000)
+    if dtype == np.uint8:
+        bands = bands * 255 / 6000
+    return bands.astype(dtype)
+
+
+def _reference_enhance(bands):
+    """Pipeline anterior: percentis por ordenação e os ImageEnhance do Pillow."""
+    def enhance_band(band):
+        p1, p99 = np.percentile(band, [1, 99])
+        clipped = np.clip(band, p1, p99)
+        normalized = (clipped - clipped.min()) / (clipped.max() - clipped.min())
+        corrected = np.clip(np.power(normalized, 1 / 1.2) * 1.1, 0, 1)
+        return (corrected * 255).astype(np.uint8)
+
+    img = Image.fromarray(np.dstack([enhance_band(band) for band in bands]), 'RGB')
+    img = ImageEnhance.Contrast(img).enhance(1.3)
+    img = ImageEnhance.Brightness(img).enhance(1.1)
+    img = ImageEnhance.Color(img).enhance(1.2)
+    return np.asarray(img).astype(np.int16)
+
+
+def test_lut_enhancement_matches_the_previous_pipeline():
+    bands = _bands()
+    diff = np.abs(enhance_rgb(bands, stride=1).astype(np.int16) - _reference_enhance(bands))
+    assert diff.mean() < 2
+    assert np.percentile(diff, 99) <= 6
+
+
+def test_float_bands_use_the_quantized_lut():
+    bands = _bands()
+    as_float = enhance_rgb(bands.astype(np.float32) / 10000, stride=1).astype(np.int16)
+    assert np.abs(as_float - enhance_rgb(bands, stride=1)).mean() < 2
+
+
+def test_histogram_percentiles_match_numpy():
+    values = _bands(np.uint8)[0].ravel()
+    histogram = np.bincount(values, minlength=256)
+    expected = np.percentile(values, [1, 50, 99], method='lower')
+    assert histogram_percentiles(histogram, (1, 50, 99)) == list(expected)
+
+
+def test_saturation_matches_pillow():
+    channels = list(_bands(np.uint8, seed=3))
+    expected = np.asarray(ImageEnhance.Color(Image.fromarray(np.dstack(channels), 'RGB')).enhance(1.2))
+    assert np.abs(saturate(channels, 1.2).astype(np.int16) - expected).max() <= 2
+
+
+def test_flat_bands_do_not_fail():
+    flat = np.full((3, 16, 16), 500, dtype=np.uint16)
+    image = enhance_rgb(flat)
+    assert image.shape == (16, 16, 3)
+    assert image.dtype == np.uint8
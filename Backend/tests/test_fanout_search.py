@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from src.utils.errors import APIError
+from src.utils.search_fanout import find_filter, iter_fanout_search, split_search_payload
+
+PAYLOAD = {
+    'item_types': ['PSScene'],
+    'filter': {
+        'type': 'AndFilter',
+        'config': [{
+            'type': 'DateRangeFilter',
+            'field_name': 'acquired',
+            'config': {'gte': '2024-01-01T00:00:00Z', 'lte': '2024-01-07T00:00:00Z'},
+        }],
+    },
+}
+
+
+class SlicedClient:
+    """Cada janela devolve duas páginas: uma cena própria e, na segunda, uma cena comum a todas."""
+
+    def __init__(self, fail_on=None):
+        self.started = []
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def iter_search_pages(self, payload):
+        start = find_filter(payload['filter'], 'DateRangeFilter', 'acquired')['config']['gte']
+        with self.lock:
+            self.started.append(start)
+        if start == self.fail_on:
+            raise APIError('falha na janela', status_code=502)
+        yield [{'id': f'{start}_a'}]
+        yield [{'id': f'{start}_b'}, {'id': 'shared_scene'}]
+
+
+def _window_starts():
+    return [
+        find_filter(group[0]['filter'], 'DateRangeFilter', 'acquired')['config']['gte']
+        for group in split_search_payload(PAYLOAD, 1)
+    ]
+
+
+def test_fanout_streams_windows_in_date_order_without_duplicates():
+    client = SlicedClient()
+    ids = [feature['id'] for feature in iter_fanout_search(client, PAYLOAD, slice_days=1, max_workers=2)]
+
+    expected = []
+    for start in _window_starts():
+        expected += [f'{start}_a', f'{start}_b']
+    expected.insert(2, 'shared_scene')
+    assert ids == expected
+
+
+def test_fanout_bounds_the_windows_in_flight():
+    client = SlicedClient()
+    features = iter_fanout_search(client, PAYLOAD, slice_days=1, max_workers=2)
+    next(features)
+
+    assert len(_window_starts()) > 2
+    assert len(client.started) <= 2
+    features.close()
+
+
+def test_fanout_propagates_window_errors():
+    starts = _window_starts()
+    with pytest.raises(APIError):
+        list(iter_fanout_search(SlicedClient(fail_on=starts[1]), PAYLOAD, slice_days=1, max_workers=2))
+
+
+def _date_configs(groups):
+    return [find_filter(group[0]['filter'], 'DateRangeFilter', 'acquired')['config'] for group in groups]
+
+
+def test_split_windows_do_not_overlap_and_keep_the_original_end():
+    configs = _date_configs(split_search_payload(PAYLOAD, 2))
+
+    # Da janela mais recente para a mais antiga; só a última mantém o `lte` original
+    assert configs[0] == {'gte': '2024-01-05T00:00:00.000000Z', 'lte': '2024-01-07T00:00:00Z'}
+    assert all(set(config) == {'gte', 'lt'} for config in configs[1:])
+    for newer, older in zip(configs, configs[1:]):
+        assert older['lt'] == newer['gte']
+    assert configs[-1]['gte'] == '2024-01-01T00:00:00.000000Z'
+
+
+def test_split_respects_max_slices_and_item_types():
+    payload = {**PAYLOAD, 'item_types': ['PSScene', 'SkySatCollect']}
+    groups = split_search_payload(payload, 1, split_item_types=True, max_slices=3)
+
+    assert len(groups) == 3
+    assert all([p['item_types'] for p in group] == [['PSScene'], ['SkySatCollect']] for group in groups)
+
+
+def test_payload_without_date_range_is_not_split():
+    payload = {'item_types': ['PSScene'], 'filter': {'type': 'AndFilter', 'config': []}}
+    assert split_search_payload(payload, 1) == [[payload]]
@@ -0,0 +1,43 @@
+import math
+
+from shapely.geometry import Point, shape
+
+from src.utils.geometry import count_vertices, preprocess_aoi, simplify_to_budget, split_into_tiles
+
+# Círculo com 2.000 vértices (~11 km de raio perto de Brasília)
+DETAILED = Point(-47.9, -15.8).buffer(0.1, quad_segs=500)
+
+
+def test_simplify_fits_the_vertex_budget_and_keeps_the_area():
+    simplified, tolerance = simplify_to_budget(DETAILED, 100)
+    assert count_vertices(DETAILED) > 100
+    assert count_vertices(simplified) <= 100
+    assert tolerance > 0
+    assert simplified.is_valid
+    assert math.isclose(simplified.area, DETAILED.area, rel_tol=0.01)
+
+
+def test_simplify_leaves_small_geometries_alone():
+    square = shape({'type': 'Polygon', 'coordinates': [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]})
+    assert simplify_to_budget(square, 100) == (square, 0.0)
+
+
+def test_large_aois_are_split_into_tiles_that_cover_them():
+    large = shape({'type': 'Polygon', 'coordinates': [[[-50, -5], [-47.5, -5], [-47.5, -2.5], [-50, -2.5], [-50, -5]]]})
+    tiles = split_into_tiles(large, 10000)
+    assert 1 < len(tiles) <= 16
+    assert math.isclose(sum(tile.area for tile in tiles), large.area, rel_tol=1e-9)
+
+
+def test_preprocess_reports_simplification_and_tiles():
+    geometry, tiles, report = preprocess_aoi(DETAILED.__geo_interface__, 100, tile_area_km2=100)
+    assert report['original_vertices'] == count_vertices(DETAILED)
+    assert report['vertices'] <= 100
+    assert report['area_changed_ratio'] < 0.01
+    assert report['tiles'] == len(tiles) > 1
+    assert shape(geometry).geom_type == 'Polygon'
+
+
+def test_preprocess_passes_points_through():
+    point = {'type': 'Point', 'coordinates': [-47.9, -15.8]}
+    assert preprocess_aoi(point, 100, tile_area_km2=100) == (point, None, None)
@@ -0,0 +1,42 @@
+from src.app import cache
+from src.utils.encoding import ImageEncoding
+from src.utils.http_cache import RENDER_VERSION, make_etag
+from tests.fakes import FakeResponse
+
+
+def test_series_etag_round_trip_answers_304_without_the_planet(app, client, planet):
+    with app.app_context():
+        cache.delete('basemap_series')
+    planet.handler = lambda method, url, **kwargs: FakeResponse(200, {'series': [{'id': 's1'}]})
+
+    first = client.get('/api/basemap/series')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+    assert first.get_json() == {'series': [{'id': 's1'}]}
+    assert first.headers['Cache-Control'] == f"public, max-age={app.config['METADATA_CACHE_MAX_AGE']}"
+
+    revalidated = client.get('/api/basemap/series', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b''
+    assert revalidated.headers['ETag'] == etag
+    assert len(planet.calls) == 1
+
+    # Outro ETag (conteúdo mudou ou é de outra versão): resposta completa
+    assert client.get('/api/basemap/series', headers={'If-None-Match': '"outro"'}).status_code == 200
+
+
+def test_preview_revalidation_is_answered_before_any_work(app, client, planet):
+    encoding = ImageEncoding('png', None, False)
+    etag = make_etag('preview', RENDER_VERSION, 'mosaic-etag', '1-1', app.config['PREVIEW_MAX_SIZE'],
+                     encoding.cache_suffix)
+
+    response = client.get('/api/basemap/quad/preview?mosaic_id=mosaic-etag&quad_id=1-1&format=png',
+                          headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+    assert planet.calls == []
+
+
+def test_etags_depend_on_every_identity_part():
+    assert make_etag('preview', '1', 'm', 'q', 512) == make_etag('preview', '1', 'm', 'q', 512)
+    assert make_etag('preview', '1', 'm', 'q', 512) != make_etag('preview', '1', 'm', 'q', 1024)
+    assert make_etag('a', 'bc') != make_etag('ab', 'c')
@@ -0,0 +1,90 @@
+import time
+
+from src.utils.mosaic_index import MosaicIndex, mosaic_month
+from src.utils.single_flight import SingleFlight
+from tests.fakes import FakeResponse
+
+
+def _mosaic(mosaic_id, name, first_acquired=None):
+    return {'id': mosaic_id, 'name': name, 'first_acquired': first_acquired, 'grid': {'quad_size': 4096}}
+
+
+class SeriesClient:
+    def __init__(self, *mosaics):
+        self.mosaics = list(mosaics)
+        self.calls = 0
+
+    def get_mosaics_for_series(self, series_id):
+        self.calls += 1
+        return {'mosaics': list(self.mosaics)}
+
+
+def _index(ttl=3600, miss_refresh_interval=300):
+    return MosaicIndex(SingleFlight(), ttl=ttl, miss_refresh_interval=miss_refresh_interval)
+
+
+def test_month_comes_from_the_name_or_the_first_acquisition():
+    assert mosaic_month({'name': 'global_monthly_2024_05_mosaic'}) == '2024-05'
+    assert mosaic_month({'name': 'planet_medres_normalized_analytic_2023-11_mosaic'}) == '2023-11'
+    assert mosaic_month({'name': 'custom', 'first_acquired': '2022-02-03T00:00:00Z'}) == '2022-02'
+    assert mosaic_month({'name': 'custom'}) is None
+
+
+def test_lookups_are_served_from_one_series_listing():
+    client = SeriesClient(
+        _mosaic('m1', 'global_monthly_2024_05_mosaic'),
+        _mosaic('m1b', 'global_monthly_2024_05_mosaic_v2'),
+        _mosaic('m2', 'global_monthly_2024_06_mosaic'),
+    )
+    index = _index()
+
+    assert index.lookup(client, 'series', 2024, 5)['id'] == 'm1'
+    assert index.lookup(client, 'series', '2024', '6')['id'] == 'm2'
+    assert [month['month'] for month in index.months(client, 'series')] == ['2024-05', '2024-06']
+    assert index.find(client, 'series', 'm1b')['quad_size'] == 4096
+    assert client.calls == 1
+
+
+def test_missing_month_rebuilds_at_most_once_per_interval():
+    client = SeriesClient(_mosaic('m1', 'global_monthly_2024_05_mosaic'))
+    index = _index(miss_refresh_interval=0)
+    index.get(client, 'series')
+
+    client.mosaics.append(_mosaic('m2', 'global_monthly_2024_06_mosaic'))
+    assert index.lookup(client, 'series', 2024, 6)['id'] == 'm2'
+    assert client.calls == 2
+
+    throttled = _index(miss_refresh_interval=3600)
+    assert throttled.lookup(client, 'series', 2030, 1) is None
+    assert throttled.lookup(client, 'series', 2030, 1) is None
+    assert client.calls == 3
+
+
+def test_stale_index_is_served_while_it_refreshes_in_the_background():
+    client = SeriesClient(_mosaic('m1', 'global_monthly_2024_05_mosaic'))
+    index = _index(ttl=0)
+    index.get(client, 'series')
+    client.mosaics = [_mosaic('m9', 'global_monthly_2024_05_mosaic')]
+
+    assert index.lookup(client, 'series', 2024, 5)['id'] == 'm1'
+    deadline = time.monotonic() + 5
+    while index._series['series'].by_month['2024-05']['id'] != 'm9':
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_mosaics_route_finds_the_month_across_planet_pages(client, planet):
+    next_url = 'https://api.planet.com/basemaps/v1/series/series-pages/mosaics?_page=2'
+
+    def handler(method, url, **kwargs):
+        if url == next_url:
+            return FakeResponse(200, {'mosaics': [_mosaic('m6', 'global_monthly_2021_06_mosaic')], '_links': {}})
+        return FakeResponse(200, {'mosaics': [_mosaic('m5', 'global_monthly_2021_05_mosaic')],
+                                  '_links': {'_next': next_url}})
+
+    planet.handler = handler
+    response = client.get('/api/basemap/mosaics?series_id=series-pages&year=2021&month=6')
+    assert response.status_code == 200
+    assert response.get_json()['mosaic_id'] == 'm6'
+    assert client.get('/api/basemap/mosaics?series_id=series-pages&year=2021&month=5').status_code == 200
+    assert len(planet.calls) == 2
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from src.utils import planet_api
+from src.utils.errors import APIError
+from src.utils.planet_api import get_planet_client
+from tests.fakes import FakeResponse
+
+RESULTS_URL = 'https://api.planet.com/basemaps/v1/searches/abc/quads'
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(planet_api.time, 'sleep', lambda seconds: None)
+
+
+def _quad_search(planet, results):
+    """POST → 302 para RESULTS_URL, cujas respostas saem em ordem de `results`."""
+    responses = iter(results)
+
+    def handler(method, url, **kwargs):
+        if method == 'POST':
+            return FakeResponse(302, headers={'Location': RESULTS_URL})
+        return next(responses)
+
+    planet.handler = handler
+
+
+def test_quad_search_retries_a_results_page_that_is_not_ready(app, planet):
+    _quad_search(planet, [
+        FakeResponse(404, {'message': 'not ready'}),
+        FakeResponse(503, {}),
+        FakeResponse(200, {'items': [{'id': '1-1'}], '_links': {'_next': f'{RESULTS_URL}?page=2'}}),
+        FakeResponse(200, {'items': [{'id': '1-2'}], '_links': {}}),
+    ])
+    with app.app_context():
+        quads = get_planet_client().get_quads_for_mosaic('mosaic', {'type': 'Point', 'coordinates': [0, 0]})
+
+    assert [quad['id'] for quad in quads] == ['1-1', '1-2']
+    assert [method for method, _, _ in planet.calls] == ['POST', 'GET', 'GET', 'GET', 'GET']
+    assert 'api_key=' in planet.calls[-1][1]
+
+
+def test_quad_search_does_not_retry_404_on_later_pages(app, planet):
+    _quad_search(planet, [
+        FakeResponse(200, {'items': [{'id': '1-1'}], '_links': {'_next': f'{RESULTS_URL}?page=2'}}),
+        FakeResponse(404, {'message': 'gone'}),
+    ])
+    with app.app_context():
+        with pytest.raises(APIError) as error:
+            get_planet_client().get_quads_for_mosaic('mosaic', {'type': 'Point', 'coordinates': [0, 0]})
+
+    assert error.value.status_code == 404
+    assert len(planet.calls) == 3
+
+
+def test_one_pooled_client_is_shared_by_every_thread(app):
+    clients = []
+
+    def worker():
+        with app.app_context():
+            clients.append(get_planet_client())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(client) for client in clients}) == 1
+    adapter = clients[0].session.get_adapter('https://api.planet.com')
+    assert adapter._pool_maxsize == app.config['PLANET_HTTP_POOL_MAXSIZE']
+
+
+def test_requests_and_downloads_use_their_own_timeouts(app, planet):
+    planet.handler = lambda method, url, **kwargs: FakeResponse(200, {'item_types': []})
+    with app.app_context():
+        client = get_planet_client()
+        client.get_item_types()
+        client.download('https://api.planet.com/basemaps/v1/mosaics/m/quads/1-1/full')
+
+    (_, _, api_kwargs), (_, _, download_kwargs) = planet.calls
+    assert api_kwargs['timeout'] == client.timeout
+    assert download_kwargs['timeout'] == client.download_timeout
+    assert download_kwargs['stream'] is True
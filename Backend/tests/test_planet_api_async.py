@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+
+from src.utils import planet_api_async
+from src.utils.errors import APIError
+from src.utils.planet_api_async import AsyncPlanetAPIClient
+
+
+def test_get_mosaics_for_series_follows_next_links(monkeypatch):
+    client = AsyncPlanetAPIClient('test-key')
+    base = 'https://api.planet.com/basemaps/v1/series/s1/mosaics'
+    pages = {
+        base: {'mosaics': [{'id': 'm1'}], '_links': {'_next': f'{base}?_page=2'}},
+        f'{base}?_page=2&api_key=test-key': {'mosaics': [{'id': 'm2'}], '_links': {}},
+    }
+    calls = []
+
+    async def fake_get_json(url, **kwargs):
+        calls.append((url, kwargs.get('params')))
+        return pages[url]
+
+    monkeypatch.setattr(client, '_get_json', fake_get_json)
+    result = asyncio.run(client.get_mosaics_for_series('s1'))
+
+    assert [m['id'] for m in result['mosaics']] == ['m1', 'm2']
+    assert calls == [(base, {'api_key': 'test-key'}), (f'{base}?_page=2&api_key=test-key', None)]
+
+
+class FakeAsyncResponse:
+    def __init__(self, status, data=None, headers=None):
+        self.status = status
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        self._body = json.dumps(data).encode('utf-8') if data is not None else b''
+
+    async def read(self):
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = iter(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        return next(self.responses)
+
+
+def _run_quad_search(monkeypatch, responses):
+    monkeypatch.setattr(planet_api_async, 'backoff_delay', lambda attempt, retry_after=None: 0)
+    client = AsyncPlanetAPIClient('test-key')
+    session = FakeSession(responses)
+
+    async def search():
+        client._semaphore = asyncio.Semaphore(4)
+        client.session = session
+        return await client.get_quads_for_mosaic('mosaic', {'type': 'Point', 'coordinates': [0, 0]})
+
+    return asyncio.run(search()), session
+
+
+def test_async_quad_search_retries_transient_results_page_errors(monkeypatch):
+    results_url = 'https://api.planet.com/basemaps/v1/searches/abc/quads'
+    quads, session = _run_quad_search(monkeypatch, [
+        FakeAsyncResponse(302, headers={'Location': results_url}),
+        FakeAsyncResponse(404, {'message': 'not ready'}),
+        FakeAsyncResponse(429, {}, headers={'Retry-After': '0'}),
+        FakeAsyncResponse(200, {'items': [{'id': '1-1'}], '_links': {}}),
+    ])
+
+    assert [quad['id'] for quad in quads] == ['1-1']
+    assert [method for method, _ in session.calls] == ['POST', 'GET', 'GET', 'GET']
+
+
+def test_async_quad_search_does_not_retry_404_on_later_pages(monkeypatch):
+    results_url = 'https://api.planet.com/basemaps/v1/searches/abc/quads'
+    with pytest.raises(APIError) as error:
+        _run_quad_search(monkeypatch, [
+            FakeAsyncResponse(302, headers={'Location': results_url}),
+            FakeAsyncResponse(200, {'items': [{'id': '1-1'}], '_links': {'_next': f'{results_url}?page=2'}}),
+            FakeAsyncResponse(404, {'message': 'gone'}),
+        ])
+    assert error.value.status_code == 404
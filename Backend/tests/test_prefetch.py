@@ -0,0 +1,51 @@
+import time
+
+from src.utils.encoding import ImageEncoding
+from src.utils.prefetch import PreviewPrefetcher
+
+ENCODING = ImageEncoding('webp', 80, True)
+QUADS = [{'id': f'{x}-100', 'bbox': [x, 0, x + 1, 1]} for x in range(5)]
+
+
+def _submit(prefetcher):
+    return prefetcher.submit(None, 'mosaic', QUADS, (2.5, 0.5), 512, ENCODING, {}, None, None)
+
+
+def _queued_jobs(prefetcher):
+    jobs = []
+    while not prefetcher._queue.empty():
+        jobs.append(prefetcher._queue.get_nowait()[2])
+    return jobs
+
+
+def test_cancel_from_another_worker_discards_the_batch(tmp_path):
+    # Dois pré-carregadores com o mesmo diretório de marcadores simulam dois workers do gunicorn
+    owner = PreviewPrefetcher(workers=0, max_pending=100, cancel_dir=str(tmp_path))
+    other = PreviewPrefetcher(workers=0, max_pending=100, cancel_dir=str(tmp_path))
+    batch_id, queued = _submit(owner)
+    assert queued == len(QUADS)
+
+    assert other.cancel(batch_id) == 0
+    assert not any(owner._take(job) for job in _queued_jobs(owner))
+    assert owner.stats()['pending'] == 0
+
+
+def test_cancel_ignores_invalid_ids(tmp_path):
+    prefetcher = PreviewPrefetcher(workers=0, max_pending=100, cancel_dir=str(tmp_path))
+    assert prefetcher.cancel('../../etc/passwd') == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_busy_pool_defers_the_job_without_blocking(tmp_path):
+    prefetcher = PreviewPrefetcher(workers=0, max_pending=100, retry_delay=0.05, cancel_dir=str(tmp_path))
+    _submit(prefetcher)
+    job = _queued_jobs(prefetcher)[0]
+
+    prefetcher._defer(1, job)
+    assert prefetcher._queue.empty()
+    assert 0 < prefetcher._release_delayed() <= 0.05
+    assert prefetcher._queue.empty()
+
+    time.sleep(0.06)
+    assert prefetcher._release_delayed() is None
+    assert _queued_jobs(prefetcher) == [job]
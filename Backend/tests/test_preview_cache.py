@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from src.utils.disk_store import DiskStore
+from src.utils.preview_cache import MemoryLRU, TieredCache
+
+
+def test_memory_lru_evicts_least_recently_used_by_bytes():
+    lru = MemoryLRU(max_bytes=10)
+    lru.set('a', b'1234')
+    lru.set('b', b'1234')
+    assert lru.get('a') == b'1234'
+    lru.set('c', b'1234')
+
+    assert 'b' not in lru
+    assert lru.get('a') == lru.get('c') == b'1234'
+    assert lru.size == 8
+    assert lru.evictions == 1
+    lru.set('grande', b'x' * 11)
+    assert 'grande' not in lru
+
+
+def test_disk_store_is_shared_between_workers(tmp_path):
+    first, second = DiskStore(str(tmp_path), 1 << 20), DiskStore(str(tmp_path), 1 << 20)
+    first.set('quad_preview_1', b'imagem')
+    assert second.get('quad_preview_1') == b'imagem'
+    assert second.get('ausente') is None
+
+
+def test_disk_store_keeps_the_quota_removing_least_recently_read(tmp_path):
+    store = DiskStore(str(tmp_path), max_bytes=300)
+    for index, key in enumerate(('antigo', 'lido', 'novo')):
+        store.set(key, b'x' * 100)
+        os.utime(store.path_for(key), (1000 + index, 1000 + index))
+    store.get('lido')  # leitura renova o mtime
+    store.set('extra', b'x' * 100)
+
+    # Acima da cota, a limpeza desce até LOW_WATERMARK (270 bytes): saem os dois menos usados
+    assert 'antigo' not in store and 'novo' not in store
+    assert 'lido' in store and 'extra' in store
+    assert store.usage() == (2, 200)
+    assert store.evictions == 2
+
+
+def test_failed_writes_leave_no_partial_file(tmp_path):
+    store = DiskStore(str(tmp_path), 1 << 20)
+
+    def produce(tmp_file):
+        with open(tmp_file, 'wb') as f:
+            f.write(b'metade')
+        raise IOError('disco cheio')
+
+    with pytest.raises(IOError):
+        store.put_file('quad', produce)
+    assert 'quad' not in store
+    assert store.usage() == (0, 0)
+    assert not any(name.startswith('.tmp-') for _, _, names in os.walk(tmp_path) for name in names)
+
+
+def test_tiered_cache_promotes_disk_hits_to_memory(tmp_path):
+    disk = DiskStore(str(tmp_path), 1 << 20)
+    disk.set('preview', b'png')
+    cache = TieredCache(MemoryLRU(1 << 10), disk)
+
+    assert cache.get('preview') == b'png'
+    assert 'preview' in cache.memory
+    assert cache.get('preview') == b'png'
+    assert cache.get('ausente') is None
+    stats = cache.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 1)
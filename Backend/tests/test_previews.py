@@ -0,0 +1,52 @@
+import os
+
+from rasterio.errors import RasterioIOError
+
+from src.utils.encoding import ImageEncoding
+from src.utils.previews import render_preview
+from tests.fakes import FakeResponse
+
+ENCODING = ImageEncoding('png', None, False)
+DOWNLOAD_URL = 'https://link.planet.com/quads/1-1/full'
+
+
+class FakeLimiter:
+    def acquire(self, endpoint):
+        pass
+
+
+class FakeClient:
+    api_key = 'key'
+    rate_limiter = FakeLimiter()
+
+    def __init__(self):
+        self.downloads = []
+
+    def download(self, url):
+        self.downloads.append(url)
+        return FakeResponse(200, content=b'GeoTIFF')
+
+
+class RangeReadFailsPool:
+    """Pool que falha na leitura por intervalos (URL remota) e lê arquivos locais."""
+
+    def __init__(self):
+        self.local_reads = []
+
+    def run(self, fn, url, *args):
+        if url.startswith('https://'):
+            raise RasterioIOError('HTTP range request failed')
+        with open(url, 'rb') as f:
+            self.local_reads.append((url, f.read()))
+        return b'image'
+
+
+def test_range_read_failure_downloads_through_the_planet_client():
+    client, pool = FakeClient(), RangeReadFailsPool()
+    image = render_preview(client, 'mosaic', '1-1', 512, ENCODING, pool, download_url=DOWNLOAD_URL)
+
+    assert image == b'image'
+    assert client.downloads == [DOWNLOAD_URL]
+    [(path, data)] = pool.local_reads
+    assert data == b'GeoTIFF'
+    assert not os.path.exists(path)
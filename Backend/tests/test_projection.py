@@ -0,0 +1,43 @@
+import pytest
+
+from src.utils.errors import ValidationError
+from src.utils.projection import MAX_FIELDS, make_projector, parse_fields, project_features
+
+FEATURE = {
+    'type': 'Feature',
+    'id': 'scene_1',
+    'geometry': {'type': 'Point', 'coordinates': [0, 0]},
+    'properties': {'acquired': '2024-01-01T00:00:00Z', 'cloud_cover': 0.1, 'gsd': 3.7},
+    '_links': {'thumbnail': 'https://tiles.planet.com/thumb', 'assets': 'https://api.planet.com/assets'},
+}
+
+
+def test_fields_keep_only_the_requested_members():
+    project = make_projector(parse_fields('id, cloud_cover,thumbnail'))
+    assert project(FEATURE) == {
+        'type': 'Feature',
+        'id': 'scene_1',
+        'geometry': None,
+        'properties': {'cloud_cover': 0.1, 'thumbnail': 'https://tiles.planet.com/thumb'},
+    }
+
+
+def test_footprint_only_keeps_id_and_geometry():
+    project = make_projector(footprint_only=True)
+    assert project(FEATURE) == {
+        'type': 'Feature', 'id': 'scene_1', 'geometry': FEATURE['geometry'], 'properties': {},
+    }
+
+
+def test_no_projection_passes_features_through():
+    assert make_projector() is None
+    features = [FEATURE]
+    assert project_features(features, None) is features
+
+
+def test_invalid_fields_are_rejected():
+    assert parse_fields(None) is None
+    with pytest.raises(ValidationError):
+        parse_fields(' , ')
+    with pytest.raises(ValidationError):
+        parse_fields(','.join(f'field_{index}' for index in range(MAX_FIELDS + 1)))
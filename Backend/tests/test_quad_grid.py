@@ -0,0 +1,88 @@
+import math
+
+import pytest
+
+from src.utils.quad_grid import QuadGrid
+from tests.fakes import FakeResponse
+
+# Metadados de grade dos mosaicos globais mensais da Planet (nível 15, quads de 4096 px)
+GLOBAL_MONTHLY = {
+    'coordinate_system': 'EPSG:3857',
+    'resolution': 4.777314267823516,
+    'quad_size': 4096,
+    'bbox': [-180, -85.051129, 180, 85.051129],
+}
+
+
+def _point_aoi(lon, lat, size=1e-4):
+    return {
+        'type': 'Polygon',
+        'coordinates': [[[lon, lat], [lon + size, lat], [lon + size, lat + size], [lon, lat + size], [lon, lat]]],
+    }
+
+
+def _planet_quad_id(lon, lat, quads_per_side):
+    """
+    Id do quad pela convenção da Planet (`x-y`, como nos nomes L15-xxxxE-yyyyN):
+    é o tile XYZ do mesmo nível com a linha invertida, contada a partir do sul.
+    """
+    x = math.floor((lon + 180) / 360 * quads_per_side)
+    lat_rad = math.radians(lat)
+    y_xyz = math.floor((1 - math.asinh(math.tan(lat_rad)) / math.pi) / 2 * quads_per_side)
+    return f"{x}-{quads_per_side - 1 - y_xyz}"
+
+
+def test_global_monthly_grid_has_2048_quads_per_side():
+    assert QuadGrid.from_mosaic(GLOBAL_MONTHLY).quads_per_side == 2048
+
+
+@pytest.mark.parametrize('lon, lat', [
+    (-47.8825, -15.7942),  # Brasília
+    (-60.0217, -3.1190),   # Manaus
+    (2.3522, 48.8566),     # Paris
+    (151.2093, -33.8688),  # Sydney
+])
+def test_quad_ids_follow_the_planet_convention(lon, lat):
+    grid = QuadGrid.from_mosaic(GLOBAL_MONTHLY)
+    quads = grid.quads_for_geometry(_point_aoi(lon, lat))
+    assert [quad['id'] for quad in quads] == [_planet_quad_id(lon, lat, 2048)]
+    west, south, east, north = quads[0]['bbox']
+    assert west <= lon <= east and south <= lat <= north
+
+
+def test_origin_is_south_west_and_rows_increase_northwards():
+    grid = QuadGrid.from_mosaic(GLOBAL_MONTHLY)
+    assert grid.quads_for_geometry(_point_aoi(-179.99, -85.0510))[0]['id'] == '0-0'
+    assert grid.quads_for_geometry(_point_aoi(179.98, 85.0510, size=1e-5))[0]['id'] == '2047-2047'
+    south = grid.quads_for_geometry(_point_aoi(-47.88, -15.80))[0]['id']
+    north = grid.quads_for_geometry(_point_aoi(-47.88, -14.80))[0]['id']
+    assert int(north.split('-')[1]) > int(south.split('-')[1])
+    assert north.split('-')[0] == south.split('-')[0]
+
+
+def test_quads_route_uses_the_grid_by_default_with_download_links(client, planet):
+    mosaic = {
+        'id': 'grid-mosaic', 'name': 'global_monthly_2024_05_mosaic', 'first_acquired': '2024-05-01T00:00:00Z',
+        'coordinate_system': 'EPSG:3857', 'bbox': GLOBAL_MONTHLY['bbox'],
+        'grid': {'quad_size': GLOBAL_MONTHLY['quad_size'], 'resolution': GLOBAL_MONTHLY['resolution']},
+    }
+
+    def handler(method, url, **kwargs):
+        assert url.endswith('/basemaps/v1/series/grid-series/mosaics'), 'a busca de quads não deve ser chamada'
+        return FakeResponse(200, {'mosaics': [mosaic], '_links': {}})
+
+    planet.handler = handler
+    response = client.post('/api/basemap/quads', json={
+        'mosaic_id': 'grid-mosaic', 'series_id': 'grid-series', 'prefetch': False,
+        'geometry': _point_aoi(-47.8825, -15.7942),
+    })
+
+    assert response.status_code == 200
+    assert response.headers['X-Quad-Source'] == 'grid'
+    [quad] = response.get_json()
+    quad_id = _planet_quad_id(-47.8825, -15.7942, 2048)
+    assert quad['id'] == quad_id
+    assert quad['_links']['download'] == (
+        f"https://api.planet.com/basemaps/v1/mosaics/grid-mosaic/quads/{quad_id}/full"
+    )
+    assert 'percent_covered' not in quad
@@ -0,0 +1,89 @@
+from shapely.geometry import box, mapping, shape
+
+from src.utils.quad_search_cache import QuadSearchCache
+
+
+def _quad(column, row):
+    """Quad de 1° x 1° com canto inferior esquerdo em (column, row)."""
+    return {'id': f'{column}-{row}', 'bbox': [column, row, column + 1, row + 1]}
+
+
+class QuadFetcher:
+    """Simula a busca na Planet: quads da grade de 1° que intersectam cada parte pedida."""
+
+    def __init__(self, whole):
+        self.whole = whole
+        self.requests = []
+
+    def __call__(self, parts):
+        self.requests.append(parts)
+        quads = {}
+        for part in [shape(part) for part in parts] if parts else [shape(self.whole)]:
+            min_x, min_y, max_x, max_y = part.bounds
+            for column in range(int(min_x // 1), int(-(-max_x // 1))):
+                for row in range(int(min_y // 1), int(-(-max_y // 1))):
+                    if box(column, row, column + 1, row + 1).intersects(part):
+                        quads[f'{column}-{row}'] = _quad(column, row)
+        return list(quads.values())
+
+
+def _ids(quads):
+    return sorted(quad['id'] for quad in quads)
+
+
+def test_aoi_inside_a_searched_area_is_answered_locally():
+    cache = QuadSearchCache(max_mosaics=4, ttl=3600)
+    large = mapping(box(0, 0, 4, 4))
+    fetch = QuadFetcher(large)
+    assert len(cache.search('mosaic', large, fetch)) == 16
+
+    inner = mapping(box(1.2, 1.2, 2.8, 2.3))
+    quads = cache.search('mosaic', inner, QuadFetcher(inner))
+    assert _ids(quads) == ['1-1', '1-2', '2-1', '2-2']
+    assert len(fetch.requests) == 1
+    assert cache.stats()['local'] == 1
+
+
+def test_partially_covered_aoi_fetches_only_the_remainder():
+    cache = QuadSearchCache(max_mosaics=4, ttl=3600)
+    cache.search('mosaic', mapping(box(0, 0, 2, 2)), QuadFetcher(mapping(box(0, 0, 2, 2))))
+
+    shifted = mapping(box(1.5, 0.5, 3, 1.5))
+    fetch = QuadFetcher(shifted)
+    quads = cache.search('mosaic', shifted, fetch)
+
+    [parts] = fetch.requests
+    # O restante é encolhido por COVERAGE_EPSILON para não repetir quads da borda
+    assert shape(parts[0]).symmetric_difference(box(2, 0.5, 3, 1.5)).area < 1e-6
+    assert _ids(quads) == ['1-0', '1-1', '2-0', '2-1']
+    assert cache.stats()['partial'] == 1
+
+
+def test_quads_without_bbox_do_not_mark_the_area_as_searched():
+    cache = QuadSearchCache(max_mosaics=4, ttl=3600)
+    aoi = mapping(box(0, 0, 1, 1))
+    calls = []
+
+    def fetch(parts):
+        calls.append(parts)
+        return [{'id': '0-0'}]
+
+    assert cache.search('mosaic', aoi, fetch) == [{'id': '0-0'}]
+    cache.search('mosaic', aoi, fetch)
+    assert calls == [None, None]
+
+
+def test_entries_are_limited_per_mosaic_and_by_age():
+    cache = QuadSearchCache(max_mosaics=1, ttl=3600)
+    aoi = mapping(box(0, 0, 1, 1))
+    fetch = QuadFetcher(aoi)
+    cache.search('mosaic-a', aoi, fetch)
+    cache.search('mosaic-b', aoi, fetch)
+    cache.search('mosaic-a', aoi, fetch)
+    assert len(fetch.requests) == 3
+
+    expiring = QuadSearchCache(max_mosaics=4, ttl=-1)
+    fetch = QuadFetcher(aoi)
+    expiring.search('mosaic', aoi, fetch)
+    expiring.search('mosaic', aoi, fetch)
+    assert len(fetch.requests) == 2
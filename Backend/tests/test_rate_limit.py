@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from src.utils import planet_api, rate_limit
+from src.utils.planet_api import get_planet_client
+from src.utils.rate_limit import AdaptiveRateLimiter, TokenBucket, parse_retry_after
+from tests.fakes import FakeResponse
+
+
+def test_reserving_several_tokens_waits_as_long_as_one_by_one():
+    batched, serial = TokenBucket(rate=10, capacity=2), TokenBucket(rate=10, capacity=2)
+    delay = batched.reserve(count=5)
+    delays = [serial.reserve() for _ in range(5)]
+    assert delay == pytest.approx(delays[-1], abs=0.01)
+    assert delay == pytest.approx(0.3, abs=0.01)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limit.time, 'monotonic', fake)
+    return fake
+
+
+def test_bucket_refills_at_its_rate_up_to_capacity(clock):
+    bucket = TokenBucket(rate=4, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.25)
+    clock.now += 10
+    # Capacidade limita o acúmulo: depois de muito tempo parado, só 2 tokens livres
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, pytest.approx(0.25)]
+
+
+def test_throttle_cuts_the_rate_and_successes_restore_it(clock):
+    bucket = TokenBucket(rate=10, increase=1.0, decrease=0.5)
+    bucket.on_throttle(retry_after=3)
+    assert bucket.rate == 5
+    assert bucket.reserve() == pytest.approx(3)
+    bucket.on_throttle()
+    bucket.on_throttle()
+    bucket.on_throttle()
+    assert bucket.rate == pytest.approx(0.625)
+    for _ in range(20):
+        bucket.on_success()
+    assert bucket.rate == 10
+
+
+def test_urls_are_classified_into_endpoint_budgets():
+    classify = AdaptiveRateLimiter.classify
+    assert classify('https://api.planet.com/data/v1/quick-search') == 'search'
+    assert classify('https://api.planet.com/data/v1/stats') == 'search'
+    assert classify('https://api.planet.com/basemaps/v1/mosaics/m/quads/1-1/full') == 'downloads'
+    assert classify('https://api.planet.com/basemaps/v1/series') == 'basemaps'
+    assert classify('https://api.planet.com/data/v1/item-types') == 'data'
+    assert classify('https://storage.googleapis.com/quad.tif') == 'downloads'
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert parse_retry_after('7') == 7
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert 0 < parse_retry_after(format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)) <= 60
+
+
+def test_client_backs_off_on_429_and_slows_the_endpoint(app, planet, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(planet_api.time, 'sleep', sleeps.append)
+    responses = iter([
+        FakeResponse(429, {}, headers={'Retry-After': '2'}),
+        FakeResponse(200, {'item_types': [{'id': 'PSScene'}]}),
+    ])
+    planet.handler = lambda method, url, **kwargs: next(responses)
+
+    with app.app_context():
+        client = get_planet_client()
+    # Limitador próprio do teste: o 429 não desacelera o cliente compartilhado
+    monkeypatch.setattr(client, 'rate_limiter', AdaptiveRateLimiter())
+    bucket = client.rate_limiter.bucket('data')
+    rate = bucket.rate
+
+    assert client.get_item_types() == [{'id': 'PSScene'}]
+    assert len(planet.calls) == 2
+    assert 2 <= sleeps[0] <= 2.5
+    assert bucket.rate < rate
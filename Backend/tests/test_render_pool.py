@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.errors import GatewayTimeoutError, ServiceUnavailableError
+from src.utils.render_pool import RenderPool
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(**kwargs):
+        pool = RenderPool(**{'max_workers': 1, 'max_queue': 0, 'timeout': 10, **kwargs})
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        if pool._executor is not None:
+            pool._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_pool_runs_jobs_in_another_process_and_returns_errors(make_pool):
+    pool = make_pool()
+    assert pool.run(pow, 2, 10) == 1024
+    with pytest.raises(ValueError):
+        pool.run(int, 'não é número')
+
+
+def test_full_pool_refuses_jobs_with_retry_after(make_pool):
+    pool = make_pool(retry_after=3)
+    pool.run(pow, 1, 1)  # inicia o processo antes de ocupar a vaga
+    busy = threading.Thread(target=pool.run, args=(time.sleep, 0.5))
+    busy.start()
+    time.sleep(0.1)
+    try:
+        with pytest.raises(ServiceUnavailableError) as error:
+            pool.run(pow, 2, 2)
+        assert error.value.status_code == 503
+        assert error.value.retry_after == 3
+    finally:
+        busy.join()
+    # A vaga volta quando o trabalho termina
+    assert pool.run(pow, 2, 2) == 4
+
+
+def test_slow_jobs_time_out(make_pool):
+    pool = make_pool(timeout=0.2)
+    with pytest.raises(GatewayTimeoutError):
+        pool.run(time.sleep, 1)
@@ -0,0 +1,37 @@
+import pytest
+
+from src.utils.result_store import SearchResultStore
+
+
+def _count(store, table):
+    return store.query(f"SELECT COUNT(*) FROM {table}")[0][0]
+
+
+def test_create_and_page(tmp_path):
+    store = SearchResultStore(str(tmp_path / 'results.db'))
+    result_id, total = store.create({'id': index} for index in range(1200))
+    assert total == 1200
+    features, total = store.page(result_id, 1100, 50)
+    assert [feature['id'] for feature in features] == list(range(1100, 1150))
+
+
+def test_failed_create_leaves_no_rows(tmp_path):
+    store = SearchResultStore(str(tmp_path / 'results.db'))
+
+    def features():
+        for index in range(700):
+            yield {'id': index}
+        raise RuntimeError('busca interrompida')
+
+    with pytest.raises(RuntimeError):
+        store.create(features())
+    assert _count(store, 'search_results') == 0
+    assert _count(store, 'search_result_features') == 0
+
+
+def test_expired_results_remove_their_features(tmp_path):
+    store = SearchResultStore(str(tmp_path / 'results.db'), ttl=0)
+    result_id, _ = store.create({'id': index} for index in range(10))
+    assert store.page(result_id, 0, 10) is None
+    store.create([])
+    assert _count(store, 'search_result_features') == 0
@@ -0,0 +1,48 @@
+import time
+
+from src.utils import search_cache
+from src.utils.search_cache import SearchCache
+
+
+def _features(count):
+    return [{'id': f'scene_{index}', 'properties': {'cloud_cover': index / count}} for index in range(count)]
+
+
+def _accessed_at(cache, key):
+    return cache.query("SELECT accessed_at FROM search_cache WHERE key = ?", (key,))[0][0]
+
+
+def test_fill_through_streams_and_stores_the_result(tmp_path):
+    cache = SearchCache(str(tmp_path / 'search.db'))
+    features = _features(1000)
+    assert list(cache.fill_through('k', iter(features), 5000, 1024 * 1024)) == features
+    assert cache.get('k') == features
+
+
+def test_fill_through_skips_results_above_the_limits(tmp_path):
+    cache = SearchCache(str(tmp_path / 'search.db'))
+    assert len(list(cache.fill_through('many', iter(_features(100)), 50, 1024 * 1024))) == 100
+    assert cache.get('many') is None
+    assert len(list(cache.fill_through('large', iter(_features(20000)), 50000, 1024))) == 20000
+    assert cache.get('large') is None
+
+
+def test_fill_through_does_not_store_interrupted_searches(tmp_path):
+    cache = SearchCache(str(tmp_path / 'search.db'))
+    stream = cache.fill_through('k', iter(_features(10)), 50, 1024 * 1024)
+    next(stream)
+    stream.close()
+    assert cache.get('k') is None
+
+
+def test_get_touches_accessed_at_at_most_once_per_interval(tmp_path, monkeypatch):
+    cache = SearchCache(str(tmp_path / 'search.db'))
+    cache.set('k', [1, 2, 3])
+    stored_at = _accessed_at(cache, 'k')
+    assert cache.get('k') == [1, 2, 3]
+    assert _accessed_at(cache, 'k') == stored_at
+
+    monkeypatch.setattr(search_cache, 'TOUCH_INTERVAL', 0)
+    time.sleep(0.01)
+    cache.get('k')
+    assert _accessed_at(cache, 'k') > stored_at
@@ -0,0 +1,76 @@
+from src.utils.search_stats import compute_local_stats
+from tests.fakes import FakeResponse
+
+
+def _feature(acquired, cloud_cover):
+    return {'id': acquired, 'properties': {'acquired': acquired, 'cloud_cover': cloud_cover}}
+
+
+FEATURES = [
+    _feature('2024-01-01T10:00:00Z', 0.05),
+    _feature('2024-01-01T15:30:00Z', 0.35),
+    _feature('2024-01-03T08:00:00Z', 0.95),
+    _feature('2024-02-10T12:00:00Z', 0.15),
+    {'id': 'sem_data', 'properties': {}},
+]
+
+
+def test_local_stats_count_scenes_per_interval():
+    daily = compute_local_stats(FEATURES, 'day')
+    assert daily['total'] == 4
+    assert daily['buckets'] == [
+        {'start_time': '2024-01-01T00:00:00.000000Z', 'count': 2},
+        {'start_time': '2024-01-03T00:00:00.000000Z', 'count': 1},
+        {'start_time': '2024-02-10T00:00:00.000000Z', 'count': 1},
+    ]
+    # Semanas começam na segunda-feira, como na Stats API (2024-01-01 foi uma segunda)
+    weekly = compute_local_stats(FEATURES, 'week')
+    assert [bucket['count'] for bucket in weekly['buckets']] == [3, 1]
+    assert weekly['buckets'][1]['start_time'] == '2024-02-05T00:00:00.000000Z'
+    monthly = compute_local_stats(FEATURES, 'month')
+    assert [bucket['count'] for bucket in monthly['buckets']] == [3, 1]
+
+
+def test_local_stats_filter_clouds_and_build_the_histogram():
+    stats = compute_local_stats(FEATURES, 'day', max_cloud_cover=0.5, cloud_bins=2)
+    assert stats['total'] == 3
+    assert stats['cloud_cover_histogram']['bin_edges'] == [0.0, 0.5, 1.0]
+    assert stats['cloud_cover_histogram']['counts'] == [3, 0]
+    assert stats['source'] == 'local'
+
+
+def test_stats_without_cached_search_use_one_combined_planet_call(client, planet):
+    planet.handler = lambda method, url, **kwargs: FakeResponse(200, {'interval': 'day', 'buckets': []})
+    body = {
+        'geometry': {'type': 'Point', 'coordinates': [-47.9, -15.8]},
+        'item_types': ['PSScene'],
+        'start_date': '2022-07-01T00:00:00Z',
+        'end_date': '2022-07-31T00:00:00Z',
+        'max_cloud_cover': 20,
+    }
+    assert client.post('/api/planet/stats', json=body).status_code == 200
+    assert client.post('/api/planet/stats', json=body).status_code == 200
+
+    [(method, url, kwargs)] = planet.calls
+    assert url.endswith('/data/v1/stats')
+    filters = {f['type']: f['config'] for f in kwargs['json']['filter']['config']}
+    assert kwargs['json']['filter']['type'] == 'AndFilter'
+    assert filters['RangeFilter'] == {'lte': 0.2}
+    assert set(filters) == {'DateRangeFilter', 'RangeFilter', 'GeometryFilter'}
+
+
+def test_stats_of_a_cached_search_are_computed_locally(client, planet):
+    planet.handler = lambda method, url, **kwargs: FakeResponse(200, {'features': FEATURES[:2], '_links': {}})
+    body = {
+        'geometry': {'type': 'Point', 'coordinates': [-47.9, -15.8]},
+        'item_types': ['PSScene'],
+        'start_date': '2024-01-01T00:00:00Z',
+        'end_date': '2024-01-02T00:00:00Z',
+    }
+    client.post('/api/planet/search?delta=false', json=body).get_data()
+    calls = len(planet.calls)
+
+    stats = client.post('/api/planet/stats', json=body).get_json()
+    assert len(planet.calls) == calls
+    assert stats['source'] == 'local'
+    assert stats['buckets'] == [{'start_time': '2024-01-01T00:00:00.000000Z', 'count': 2}]
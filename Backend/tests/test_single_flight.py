@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+THREADS = 8
+
+
+def _run_concurrently(target):
+    results = [None] * THREADS
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, target())) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def _wait_for_followers(flight, count):
+    deadline = time.monotonic() + 5
+    while flight.stats()['followers'] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def render():
+        calls.append(1)
+        assert release.wait(5)
+        return b'image'
+
+    threads, results = _run_concurrently(lambda: flight.do('preview', render))
+    _wait_for_followers(flight, THREADS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [b'image'] * THREADS
+    assert flight.stats() == {'leaders': 1, 'followers': THREADS - 1, 'in_flight': 0}
+
+
+def test_followers_receive_the_leader_error():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        assert release.wait(5)
+        raise ValueError('Planet fora do ar')
+
+    def call():
+        try:
+            flight.do('preview', failing)
+        except ValueError as e:
+            errors.append(e)
+
+    threads, _ = _run_concurrently(call)
+    _wait_for_followers(flight, THREADS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == THREADS
+    assert len({id(error) for error in errors}) == 1
+
+
+def test_other_worker_rechecks_the_shared_cache_after_waiting(tmp_path):
+    # Duas instâncias com o mesmo diretório de locks fazem o papel de dois workers
+    first, second = SingleFlight(str(tmp_path)), SingleFlight(str(tmp_path))
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        assert release.wait(5)
+        return 'rendered'
+
+    leader = threading.Thread(target=first.do, args=('preview', slow))
+    leader.start()
+    assert started.wait(5)
+    result = []
+    other = threading.Thread(target=lambda: result.append(
+        second.do('preview', lambda: pytest.fail('o trabalho não deveria ser refeito'), recheck=lambda: 'cached')
+    ))
+    other.start()
+    time.sleep(0.1)
+    release.set()
+    leader.join()
+    other.join()
+
+    assert result == ['cached']
+
+
+def test_streamed_results_release_followers_when_closed():
+    flight = SingleFlight()
+    leader = flight.lead('search')
+    assert flight.lead('search') is None
+
+    items = flight.release_after(leader, iter([1, 2, 3]))
+    assert next(items) == 1
+    items.close()
+    assert flight.wait('search') is None
+    assert flight.lead('search') is not None
@@ -0,0 +1,65 @@
+import pytest
+
+from src.utils import source_store
+from src.utils.source_store import SourceQuadStore
+from tests.fakes import FakeResponse
+
+
+class FakeExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def _store(tmp_path, monkeypatch, fetched, min_hits=2):
+    store = SourceQuadStore(str(tmp_path / 'quads'), 1024 * 1024, render_pool=None, min_hits=min_hits)
+    store._executor = FakeExecutor()
+    monkeypatch.setattr(store, 'fetch', lambda client, mosaic_id, quad_id, url: fetched.append(quad_id))
+    return store
+
+
+def test_first_request_does_not_download_the_quad(tmp_path, monkeypatch):
+    fetched = []
+    store = _store(tmp_path, monkeypatch, fetched)
+    store.fetch_in_background(None, 'mosaic', '1-1', 'https://example.com/1-1')
+    assert fetched == []
+
+
+def test_repeat_demand_downloads_once(tmp_path, monkeypatch):
+    fetched = []
+    store = _store(tmp_path, monkeypatch, fetched)
+    monkeypatch.setattr(source_store, 'DEMAND_DEBOUNCE', 0)
+    for _ in range(3):
+        store.fetch_in_background(None, 'mosaic', '1-1', 'https://example.com/1-1')
+    assert fetched == ['1-1']
+
+
+def test_requests_within_the_debounce_count_as_one_demand(tmp_path, monkeypatch):
+    fetched = []
+    store = _store(tmp_path, monkeypatch, fetched)
+    for _ in range(5):
+        store.fetch_in_background(None, 'mosaic', '1-1', 'https://example.com/1-1')
+    assert fetched == []
+
+
+def test_download_response_is_closed_on_failure(tmp_path):
+    class FailingResponse(FakeResponse):
+        closed = False
+
+        def iter_content(self, chunk_size=1):
+            yield b'partial'
+            raise IOError('conexão interrompida')
+
+        def close(self):
+            self.closed = True
+
+    response = FailingResponse(200, content=b'')
+
+    class Client:
+        def download(self, url):
+            return response
+
+    store = SourceQuadStore(str(tmp_path / 'quads'), 1024 * 1024, render_pool=None)
+    with pytest.raises(IOError):
+        store.fetch(Client(), 'mosaic', '1-1', 'https://example.com/1-1')
+    assert response.closed
+    assert store.get_path('mosaic', '1-1') is None
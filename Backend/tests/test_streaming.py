@@ -0,0 +1,73 @@
+import json
+
+import pytest
+from werkzeug.datastructures import MIMEAccept
+
+from src.utils.streaming import (
+    NDJSON_MIMETYPE, JSON_MIMETYPE, iter_feature_collection, iter_ndjson, negotiate_search_mimetype, prime_iterator
+)
+from tests.fakes import FakeResponse
+
+
+def _features(count, fail_after=None):
+    for index in range(count):
+        if index == fail_after:
+            raise RuntimeError('conexão perdida')
+        yield {'type': 'Feature', 'id': f'scene_{index}', 'properties': {}}
+
+
+def test_feature_collection_is_valid_json_with_extra_members():
+    body = ''.join(iter_feature_collection(_features(3), extra={'aoi': {'vertices': 5}}))
+    collection = json.loads(body)
+    assert collection['type'] == 'FeatureCollection'
+    assert collection['aoi'] == {'vertices': 5}
+    assert [feature['id'] for feature in collection['features']] == ['scene_0', 'scene_1', 'scene_2']
+
+
+def test_feature_collection_closes_with_an_error_when_the_source_fails():
+    collection = json.loads(''.join(iter_feature_collection(_features(5, fail_after=2))))
+    assert len(collection['features']) == 2
+    assert collection['error'] == 'conexão perdida'
+
+
+def test_ndjson_writes_one_feature_per_line_and_reports_errors():
+    lines = ''.join(iter_ndjson(_features(3, fail_after=2))).splitlines()
+    assert [json.loads(line).get('id') for line in lines[:2]] == ['scene_0', 'scene_1']
+    assert json.loads(lines[2]) == {'type': 'Error', 'error': 'conexão perdida'}
+
+
+def test_prime_iterator_raises_first_page_errors_before_streaming():
+    with pytest.raises(RuntimeError):
+        prime_iterator(_features(3, fail_after=0))
+    primed = prime_iterator(_features(2))
+    assert [feature['id'] for feature in primed] == ['scene_0', 'scene_1']
+    assert list(prime_iterator(iter(()))) == []
+
+
+def test_negotiation_defaults_to_json():
+    assert negotiate_search_mimetype(MIMEAccept([('*/*', 1)])) == JSON_MIMETYPE
+    assert negotiate_search_mimetype(MIMEAccept([(NDJSON_MIMETYPE, 1)])) == NDJSON_MIMETYPE
+
+
+def test_search_streams_every_planet_page(client, planet):
+    next_url = 'https://api.planet.com/data/v1/searches/abc/results?_page=2'
+
+    def handler(method, url, **kwargs):
+        if method == 'POST':
+            features = [{'id': 'scene_1', 'properties': {}}]
+            return FakeResponse(200, {'features': features, '_links': {'_next': next_url}})
+        return FakeResponse(200, {'features': [{'id': 'scene_2', 'properties': {}}], '_links': {}})
+
+    planet.handler = handler
+    response = client.post('/api/planet/search?delta=false', json={
+        'geometry': {'type': 'Point', 'coordinates': [-47.9, -15.8]},
+        'item_types': ['PSScene'],
+        'start_date': '2023-03-01T00:00:00Z',
+        'end_date': '2023-03-02T00:00:00Z',
+    }, headers={'Accept': NDJSON_MIMETYPE})
+
+    assert response.status_code == 200
+    assert response.mimetype == NDJSON_MIMETYPE
+    ids = [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()]
+    assert ids == ['scene_1', 'scene_2']
+    assert [method for method, _, _ in planet.calls] == ['POST', 'GET']
@@ -0,0 +1,106 @@
+import json
+import threading
+
+import pytest
+from shapely.geometry import shape
+
+from src.utils.errors import APIError
+from src.utils.search_fanout import find_filter, iter_tiled_search
+from tests.fakes import FakeResponse
+
+# ~2,5° x 2,5° no equador (~77.000 km²): acima de AOI_TILE_AREA_KM2, a busca é dividida em blocos
+LARGE_AOI = {
+    'type': 'Polygon',
+    'coordinates': [[[-50.0, -5.0], [-47.5, -5.0], [-47.5, -2.5], [-50.0, -2.5], [-50.0, -5.0]]],
+}
+
+
+def _quick_search(planet):
+    """Responde cada quick-search com uma cena própria do bloco e uma cena comum a todos."""
+    threads = set()
+
+    def handler(method, url, **kwargs):
+        threads.add(threading.current_thread().name)
+        assert url.endswith('/data/v1/quick-search')
+        filters = {f['type']: f['config'] for f in kwargs['json']['filter']['config']}
+        centroid = shape(filters['GeometryFilter']).centroid
+        acquired = filters['DateRangeFilter']['gte']
+        features = [
+            {'id': f'tile_{centroid.x:.3f}_{centroid.y:.3f}', 'properties': {'acquired': acquired}},
+            {'id': 'shared_scene', 'properties': {'acquired': acquired}},
+        ]
+        return FakeResponse(200, {'type': 'FeatureCollection', 'features': features, '_links': {}})
+
+    planet.handler = handler
+    return threads
+
+
+def _search(client, query, start_date):
+    body = {
+        'geometry': LARGE_AOI,
+        'item_types': ['PSScene'],
+        'start_date': f'{start_date}T00:00:00Z',
+        'end_date': f'{start_date}T23:59:59Z',
+    }
+    return client.post(f'/api/planet/search?{query}', json=body)
+
+
+def test_tiled_search_streams_merged_features(client, planet):
+    threads = _quick_search(planet)
+    response = _search(client, 'delta=false', '2024-05-01')
+    assert response.status_code == 200
+    collection = json.loads(response.get_data())
+
+    ids = [feature['id'] for feature in collection['features']]
+    assert len(planet.calls) > 1
+    assert all(name.startswith('planet-tile') for name in threads)
+    assert ids.count('shared_scene') == 1
+    assert len(ids) == len(planet.calls) + 1
+
+
+def test_tiled_search_with_request_options(client, planet):
+    # fanout/slice_days/delta são lidos da requisição, fora das threads dos blocos
+    _quick_search(planet)
+    response = _search(client, 'fanout=true&slice_days=1&limit=2', '2024-05-02')
+    assert response.status_code == 200
+    page = response.get_json()
+    assert len(planet.calls) > 1
+    assert len(page['features']) == 2
+    assert page['total'] == len(planet.calls) + 1
+
+
+def _tiled_payload():
+    return {
+        'item_types': ['PSScene'],
+        'filter': {'type': 'AndFilter', 'config': [{'type': 'GeometryFilter', 'field_name': 'geometry', 'config': None}]},
+    }
+
+
+def test_tiled_search_yields_before_every_tile_finishes():
+    release = threading.Event()
+
+    def fetch(payload):
+        tile = find_filter(payload['filter'], 'GeometryFilter')['config']
+        if tile == 'slow':
+            # Só termina depois que o consumidor já recebeu a cena do bloco rápido
+            assert release.wait(5)
+            return iter([{'id': 'slow_scene'}, {'id': 'shared_scene'}])
+        return iter([{'id': 'fast_scene'}, {'id': 'shared_scene'}])
+
+    features = iter_tiled_search(fetch, _tiled_payload(), ['fast', 'slow'], max_workers=2)
+    first = next(features)
+    release.set()
+    ids = [first['id']] + [feature['id'] for feature in features]
+
+    assert first['id'] in ('fast_scene', 'shared_scene')
+    assert sorted(ids) == ['fast_scene', 'shared_scene', 'slow_scene']
+
+
+def test_tiled_search_propagates_tile_errors():
+    def fetch(payload):
+        if find_filter(payload['filter'], 'GeometryFilter')['config'] == 'broken':
+            raise APIError('falha no bloco', status_code=502)
+        return iter([{'id': 'scene'}])
+
+    with pytest.raises(APIError):
+        list(iter_tiled_search(fetch, _tiled_payload(), ['ok', 'broken'], max_workers=2))
@@ -0,0 +1,60 @@
+import io
+
+import numpy as np
+import pytest
+import rasterio
+from PIL import Image
+from rasterio.transform import from_bounds
+
+from src.utils.raster import render_tile
+from src.utils.tiles import MERCATOR_HALF_WORLD, is_valid_tile, tile_bounds, tile_polygon
+
+
+def test_tile_bounds_follow_the_xyz_scheme():
+    assert tile_bounds(0, 0, 0) == pytest.approx(
+        (-MERCATOR_HALF_WORLD, -MERCATOR_HALF_WORLD, MERCATOR_HALF_WORLD, MERCATOR_HALF_WORLD)
+    )
+    west, south, east, north = tile_bounds(1, 1, 0)
+    assert (west, south, north) == pytest.approx((0, 0, MERCATOR_HALF_WORLD))
+    ring = tile_polygon(1, 0, 1)['coordinates'][0]
+    assert ring[0] == pytest.approx([-180, -85.0511], abs=1e-4)
+    assert ring[2] == pytest.approx([0, 0])
+
+
+def test_tile_coordinates_are_validated():
+    assert is_valid_tile(3, 7, 7)
+    assert not is_valid_tile(3, 8, 0)
+    assert not is_valid_tile(-1, 0, 0)
+    assert not is_valid_tile(25, 0, 0)
+
+
+def _write_quad(path, bounds):
+    """GeoTIFF RGB em EPSG:3857 com um gradiente, cobrindo `bounds`."""
+    rows, cols = np.mgrid[0:128, 0:128]
+    bands = np.stack([rows * 2, cols * 2, (rows + cols)]).astype(np.uint8)
+    profile = {
+        'driver': 'GTiff', 'width': 128, 'height': 128, 'count': 3, 'dtype': 'uint8',
+        'crs': 'EPSG:3857', 'transform': from_bounds(*bounds, 128, 128),
+    }
+    with rasterio.open(path, 'w', **profile) as dst:
+        dst.write(bands)
+    return str(path)
+
+
+def test_tile_is_rendered_from_the_part_of_the_quad_it_covers(tmp_path):
+    bounds = tile_bounds(12, 1000, 2000)
+    west, south, east, north = bounds
+    # O quad cobre só a metade oeste do tile
+    quad = _write_quad(tmp_path / 'quad.tif', (west - (east - west), south, (west + east) / 2, north))
+
+    image = Image.open(io.BytesIO(render_tile(bounds, [quad], image_format='png')))
+    alpha = np.asarray(image)[..., 3]
+
+    assert image.size == (256, 256)
+    assert (alpha[:, :126] == 255).all()
+    assert (alpha[:, 130:] == 0).all()
+
+
+def test_tile_endpoint_rejects_invalid_and_low_zoom_tiles(client):
+    assert client.get('/api/basemap/tiles/mosaic/3/8/0.png').status_code == 400
+    assert client.get('/api/basemap/tiles/mosaic/2/1/1.png').status_code == 404
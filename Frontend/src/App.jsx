@@ -1,4 +1,4 @@
-import { useState, useEffect, useMemo, useCallback } from 'react'
+import { useState, useEffect, useMemo, useCallback, useRef } from 'react'
 import { Button } from '@/components/ui/button.jsx'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle, CardFooter } from '@/components/ui/card.jsx'
 import { Input } from '@/components/ui/input.jsx'
@@ -42,6 +42,7 @@ function App() {
   const [basemapSeries, setBasemapSeries] = useState([]);
   const [selectedSeriesId, setSelectedSeriesId] = useState('');
   const [basemapQuads, setBasemapQuads] = useState([]);
+  const prefetchIdRef = useRef(null);
   const [basemapLoading, setBasemapLoading] = useState(false);
   const [selectedYear, setSelectedYear] = useState(new Date().getFullYear());
   const [selectedMonth, setSelectedMonth] = useState(new Date().getMonth() + 1);
@@ -130,6 +131,12 @@ function App() {
           throw new Error('Nenhum mosaico correspondente encontrado para a série e período selecionados.');
         }
 
+        // Cancela o pré-carregamento de prévias da busca anterior
+        if (prefetchIdRef.current) {
+          fetch(`${API_BASE_URL}/api/basemap/prefetch/${prefetchIdRef.current}`, { method: 'DELETE' }).catch(() => {});
+          prefetchIdRef.current = null;
+        }
+
         const quadsResponse = await fetch(`${API_BASE_URL}/api/basemap/quads`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
@@ -144,6 +151,7 @@ function App() {
            const errorData = await quadsResponse.json();
           throw new Error(errorData.error || 'Falha ao buscar os quads do basemap.');
         }
+        prefetchIdRef.current = quadsResponse.headers.get('X-Prefetch-Id');
         finalResults = await quadsResponse.json();
         setBasemapQuads(finalResults);
 
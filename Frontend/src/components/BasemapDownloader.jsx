@@ -9,7 +9,7 @@ function BasemapDownloader({ quads, onShowOnMap, basemapPreviewItems }) {
     // então idealmente isso também chamaria um endpoint do backend.
     // Por enquanto, podemos abrir o link em uma nova aba,
     // o navegador pode pedir login, mas funciona para teste.
-    const downloadLink = quad._links.download;
+    const downloadLink = quad._links?.download;
     if (downloadLink) {
         window.open(downloadLink, '_blank');
     } else {
@@ -37,7 +37,9 @@ function BasemapDownloader({ quads, onShowOnMap, basemapPreviewItems }) {
                 </div>
                 <div>
                   <p className="font-semibold">Quad ID: {quad.id}</p>
-                  <p className="text-sm text-muted-foreground">Cobertura: {quad.percent_covered}%</p>
+                  {quad.percent_covered != null && (
+                    <p className="text-sm text-muted-foreground">Cobertura: {quad.percent_covered}%</p>
+                  )}
                 </div>
               </div>
               <div className="flex space-x-2">